@@ -0,0 +1,26 @@
+"""product image variants
+
+Revision ID: 1d6f0b8e4c93
+Revises: e27b94d0c6a1
+Create Date: 2026-10-17 18:22:50.671338
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1d6f0b8e4c93'
+down_revision = 'e27b94d0c6a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('img_variants', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('img_variants')
@@ -0,0 +1,76 @@
+"""stock movements
+
+Revision ID: 3c8e1f5a9d47
+Revises: f09a3c6d1e52
+Create Date: 2026-10-18 16:02:11.304587
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8e1f5a9d47'
+down_revision = 'f09a3c6d1e52'
+branch_labels = None
+depends_on = None
+
+PENDING_UNITS = """
+    SELECT order_details.product_id, order_details.order_id, order_details.quantity, orders.date
+    FROM order_details JOIN orders ON orders.id = order_details.order_id
+    WHERE orders.status = 'pending'
+"""
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('reserved', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('low_stock_threshold', sa.Integer(), nullable=True))
+
+    op.create_table('stock_movements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('kind', sa.String(length=12), nullable=False),
+    sa.Column('stock_delta', sa.Integer(), nullable=False),
+    sa.Column('reserved_delta', sa.Integer(), nullable=False),
+    sa.Column('note', sa.String(length=200), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stock_movements', schema=None) as batch_op:
+        batch_op.create_index('ix_stock_movements_product_id', ['product_id', 'id'], unique=False)
+        batch_op.create_index('ix_stock_movements_order_id', ['order_id'], unique=False)
+
+    # Saldo inicial: el stock actual más lo que ya apartaron las órdenes pendientes,
+    # seguido de una reserva por cada una, para que el libro sume el stock actual
+    op.execute(f"""
+        INSERT INTO stock_movements (product_id, kind, stock_delta, reserved_delta, note, created_at)
+        SELECT products.id, 'adjustment',
+               COALESCE(products.stock, 0) + COALESCE((SELECT SUM(pending.quantity) FROM ({PENDING_UNITS}) pending
+                                                       WHERE pending.product_id = products.id), 0),
+               0, 'saldo inicial', CURRENT_TIMESTAMP
+        FROM products
+    """)
+    op.execute(f"""
+        INSERT INTO stock_movements (product_id, order_id, kind, stock_delta, reserved_delta, created_at)
+        SELECT pending.product_id, pending.order_id, 'reservation', -pending.quantity, pending.quantity, pending.date
+        FROM ({PENDING_UNITS}) pending
+    """)
+    op.execute("""
+        UPDATE products SET reserved = (SELECT COALESCE(SUM(reserved_delta), 0) FROM stock_movements
+                                        WHERE stock_movements.product_id = products.id)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('stock_movements', schema=None) as batch_op:
+        batch_op.drop_index('ix_stock_movements_order_id')
+        batch_op.drop_index('ix_stock_movements_product_id')
+
+    op.drop_table('stock_movements')
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('low_stock_threshold')
+        batch_op.drop_column('reserved')
@@ -0,0 +1,42 @@
+"""catalog indexes
+
+Revision ID: 4b7e2d9c1a05
+Revises: 922dea808f77
+Create Date: 2026-10-17 10:12:41.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e2d9c1a05'
+down_revision = '922dea808f77'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_index('ix_products_price_id', ['price', 'id'], unique=False)
+        batch_op.create_index('ix_products_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_products_name_id', ['name', 'id'], unique=False)
+        batch_op.create_index('ix_products_discount', ['discount', 'discount_expiration'], unique=False)
+        batch_op.create_index('ix_products_stock', ['stock'], unique=False)
+
+    with op.batch_alter_table('product_category', schema=None) as batch_op:
+        batch_op.create_index('ix_product_category_category_product', ['category_id', 'product_id'], unique=False)
+        batch_op.create_index('ix_product_category_product', ['product_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product_category', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_category_product')
+        batch_op.drop_index('ix_product_category_category_product')
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index('ix_products_stock')
+        batch_op.drop_index('ix_products_discount')
+        batch_op.drop_index('ix_products_name_id')
+        batch_op.drop_index('ix_products_created_at_id')
+        batch_op.drop_index('ix_products_price_id')
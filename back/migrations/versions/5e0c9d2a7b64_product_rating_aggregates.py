@@ -0,0 +1,53 @@
+"""product rating aggregates
+
+Revision ID: 5e0c9d2a7b64
+Revises: b38e5a7f2c19
+Create Date: 2026-10-18 09:14:37.480192
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0c9d2a7b64'
+down_revision = 'b38e5a7f2c19'
+branch_labels = None
+depends_on = None
+
+COUNTERS = ['rating_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        for column in COUNTERS:
+            batch_op.add_column(sa.Column(column, sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('rating_avg', sa.Float(), nullable=False, server_default='0'))
+        batch_op.create_index('ix_products_rating_avg_id', ['rating_avg', 'id'], unique=False)
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_index('ix_reviews_product_id', ['product_id', 'id'], unique=False)
+
+    # Carga inicial desde las reseñas existentes
+    op.execute("""
+        UPDATE products SET
+            rating_count = (SELECT COUNT(*) FROM reviews WHERE reviews.product_id = products.id),
+            rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE reviews.product_id = products.id),
+            rating_1 = (SELECT COUNT(*) FROM reviews WHERE reviews.product_id = products.id AND rating = 1),
+            rating_2 = (SELECT COUNT(*) FROM reviews WHERE reviews.product_id = products.id AND rating = 2),
+            rating_3 = (SELECT COUNT(*) FROM reviews WHERE reviews.product_id = products.id AND rating = 3),
+            rating_4 = (SELECT COUNT(*) FROM reviews WHERE reviews.product_id = products.id AND rating = 4),
+            rating_5 = (SELECT COUNT(*) FROM reviews WHERE reviews.product_id = products.id AND rating = 5)
+    """)
+    op.execute("UPDATE products SET rating_avg = rating_sum * 1.0 / rating_count WHERE rating_count > 0")
+
+
+def downgrade():
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index('ix_reviews_product_id')
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index('ix_products_rating_avg_id')
+        batch_op.drop_column('rating_avg')
+        for column in reversed(COUNTERS):
+            batch_op.drop_column(column)
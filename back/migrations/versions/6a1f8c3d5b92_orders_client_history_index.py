@@ -0,0 +1,27 @@
+"""orders client history index
+
+Revision ID: 6a1f8c3d5b92
+Revises: 9d4b2a6e0f31
+Create Date: 2026-10-18 19:12:40.573106
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a1f8c3d5b92'
+down_revision = '9d4b2a6e0f31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_client_id_date', ['client_id', sa.text('date DESC'), sa.text('id DESC')],
+                              unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_client_id_date')
@@ -0,0 +1,32 @@
+"""order listing indexes
+
+Revision ID: 7a92c4f1d5e0
+Revises: 1d6f0b8e4c93
+Create Date: 2026-10-17 19:31:08.226740
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a92c4f1d5e0'
+down_revision = '1d6f0b8e4c93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_date_id', ['date', 'id'], unique=False)
+
+    with op.batch_alter_table('order_details', schema=None) as batch_op:
+        batch_op.create_index('ix_order_details_order_id', ['order_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('order_details', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_details_order_id')
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_date_id')
@@ -0,0 +1,35 @@
+"""product search index
+
+Revision ID: 8f3a61c2e9b7
+Revises: 4b7e2d9c1a05
+Create Date: 2026-10-17 11:40:03.902114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3a61c2e9b7'
+down_revision = '4b7e2d9c1a05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Solo PostgreSQL tiene tsvector; en MySQL/SQLite se usa el índice en memoria de search.py
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX ix_products_search ON products USING gin "
+        "(to_tsvector('spanish', coalesce(name, '') || ' ' || coalesce(description, '')))"
+    )
+    op.execute("CREATE INDEX ix_products_name_trgm ON products USING gin (name gin_trgm_ops)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_products_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_products_search")
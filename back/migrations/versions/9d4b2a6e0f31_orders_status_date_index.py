@@ -0,0 +1,26 @@
+"""orders status date index
+
+Revision ID: 9d4b2a6e0f31
+Revises: 3c8e1f5a9d47
+Create Date: 2026-10-18 17:45:03.218764
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4b2a6e0f31'
+down_revision = '3c8e1f5a9d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_status_date', ['status', 'date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_status_date')
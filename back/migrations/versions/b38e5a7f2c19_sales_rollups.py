@@ -0,0 +1,60 @@
+"""sales rollups
+
+Revision ID: b38e5a7f2c19
+Revises: 7a92c4f1d5e0
+Create Date: 2026-10-17 21:03:44.915260
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b38e5a7f2c19'
+down_revision = '7a92c4f1d5e0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('product_sales',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id')
+    )
+    with op.batch_alter_table('product_sales', schema=None) as batch_op:
+        batch_op.create_index('ix_product_sales_units', ['units'], unique=False)
+
+    op.create_table('category_sales',
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('category_id')
+    )
+    op.create_table('coupon_usage',
+    sa.Column('coupon_id', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('discount_total', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['coupon_id'], ['coupons.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('coupon_id')
+    )
+
+
+def downgrade():
+    op.drop_table('coupon_usage')
+    op.drop_table('category_sales')
+    with op.batch_alter_table('product_sales', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_sales_units')
+
+    op.drop_table('product_sales')
+    op.drop_table('daily_sales')
@@ -0,0 +1,45 @@
+"""product search unaccent
+
+Revision ID: b7d2e4f9a163
+Revises: 6a1f8c3d5b92
+Create Date: 2026-10-19 10:05:21.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e4f9a163'
+down_revision = '6a1f8c3d5b92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Los términos buscados ya llegan sin tildes (search.tokenize); el documento indexado también
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() es STABLE y no sirve en un índice; con el diccionario explícito es inmutable
+    op.execute(
+        "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+        "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+    )
+    op.execute("DROP INDEX IF EXISTS ix_products_search")
+    op.execute(
+        "CREATE INDEX ix_products_search ON products USING gin "
+        "(to_tsvector('spanish', f_unaccent(coalesce(name, '') || ' ' || coalesce(description, ''))))"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_products_search")
+    op.execute(
+        "CREATE INDEX ix_products_search ON products USING gin "
+        "(to_tsvector('spanish', coalesce(name, '') || ' ' || coalesce(description, '')))"
+    )
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
@@ -0,0 +1,26 @@
+"""client role version
+
+Revision ID: c51d0e7a3f28
+Revises: 8f3a61c2e9b7
+Create Date: 2026-10-17 14:05:27.330871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c51d0e7a3f28'
+down_revision = '8f3a61c2e9b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('clients', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('role_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('clients', schema=None) as batch_op:
+        batch_op.drop_column('role_version')
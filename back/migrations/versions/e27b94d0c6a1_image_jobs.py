@@ -0,0 +1,50 @@
+"""image jobs
+
+Revision ID: e27b94d0c6a1
+Revises: c51d0e7a3f28
+Create Date: 2026-10-17 16:48:12.004519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e27b94d0c6a1'
+down_revision = 'c51d0e7a3f28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(length=10), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('payload', sa.String(length=255), nullable=False),
+    sa.Column('folder', sa.String(length=50), nullable=True),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('image_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_image_jobs_status_next_attempt', ['status', 'next_attempt_at'], unique=False)
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        # Los productos existentes ya tienen su imagen subida
+        batch_op.add_column(sa.Column('img_status', sa.String(length=10), nullable=True, server_default='ready'))
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('img_status')
+
+    with op.batch_alter_table('image_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_image_jobs_status_next_attempt')
+
+    op.drop_table('image_jobs')
@@ -0,0 +1,27 @@
+"""unique product name
+
+Revision ID: f09a3c6d1e52
+Revises: a64f1e3b8d27
+Create Date: 2026-10-18 12:37:55.129404
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f09a3c6d1e52'
+down_revision = 'a64f1e3b8d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Falla si ya hay nombres repetidos: hay que renombrarlos antes de migrar
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_products_name', ['name'])
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_products_name', type_='unique')
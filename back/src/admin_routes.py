@@ -0,0 +1,465 @@
+"""Rutas de administración: productos, imágenes, carga masiva, órdenes, inventario y reportes.
+
+Van en un blueprint aparte para que los workers de solo lectura (APP_BLUEPRINTS=public)
+no carguen la cola de imágenes ni el resto de este código.
+"""
+import os
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from datetime import date
+from models import db, Product, Category, Client, Order, Coupon, DailySales, ProductSales, CategorySales, CouponUsage
+from sqlalchemy.exc import IntegrityError
+from decorators import admin_required, publish_role_version
+from config import allowed_files
+from pagination import page_size, decode_cursor, keyset_page
+from search import search_index
+from cache import invalidate
+from jobs import image_jobs
+from images import sniff_image_type
+from orders import filter_orders, newest_first, order_cursor, export_orders
+from analytics import record_status_change
+from bulk import BulkError, upsert_categories, upsert_products, read_rows, import_products, export_products
+from inventory import InventoryError, apply_status_change, adjust, low_stock_query, reconcile
+
+admin_api = Blueprint("admin", __name__)
+
+ #### CLIENTE
+@admin_api.route('/admin/clients/<int:id>/role', methods=['PUT'])
+@admin_required
+def update_client_role(id):
+    client = Client.query.get(id)
+    if not client:
+        return jsonify({"error": "Cliente no encontrado"}), 404
+
+    data = request.get_json()
+    if not data or not isinstance(data.get('admin'), bool):
+        return jsonify({"error": "Falta el campo admin"}), 400
+
+    if client.admin != data['admin']:
+        client.admin = data['admin']
+        client.role_version = (client.role_version or 0) + 1
+        db.session.commit()
+        publish_role_version(client)
+    return jsonify({"message": "Rol actualizado", "client": client.serialize()}), 200
+
+
+
+#### PRODUCTOS
+@admin_api.route('/products', methods=['POST'])
+@admin_required
+def new_product():
+
+    if 'name' not in request.form or not request.form['name']:
+        return jsonify({"error":"El nombre es obligatorio"}), 400
+    if  'description' not in request.form or not request.form['description'] :
+        return jsonify({"error":"La descripción es obligatoria"}), 400
+    if 'price' not in request.form or not request.form['price']:
+        return jsonify({"error":"El precio es obligatorio"}), 400
+    
+    image=request.files.get('photo')
+    if image is not None:
+        if image.filename == "":
+            return jsonify({"error":"Nombre del archivo vacío"}), 400
+        if not allowed_files(image.filename) or not sniff_image_type(image.stream):
+            return jsonify({"error":"Formato de archivo no permitido"}), 400
+    
+    spooled = None
+    committed = False
+    try:
+        new_product = Product(
+            name=request.form['name'],
+            description=request.form['description'],
+            price=float(request.form['price']),
+            img=None
+        )
+        db.session.add(new_product)
+        # La imagen se sube a cloudinary en segundo plano; mientras tanto queda en estado pending
+        spooled = image_jobs.spool(image) if image else None
+        job = image_jobs.queue_upload(new_product, spooled) if image else None
+        db.session.commit()
+        committed = True  # Desde aquí el archivo es del trabajo
+        image_jobs.submit(job)
+        search_index.update(new_product)
+        return jsonify({
+            "msg":"Producto creado",
+            "product":new_product.serialize()
+            }), 201
+    except ValueError:
+        db.session.rollback()
+        return jsonify({"error":"Precio o stock inválido"}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error":"Ya existe un producto con este nombre"}), 409
+    except Exception as e:  # Otros errores de BD
+        db.session.rollback()
+        return jsonify({"error": f"Error en la base de datos: {str(e)}"}), 500
+    finally:
+        if not committed:
+            image_jobs.discard_spooled(spooled)
+
+    
+
+
+
+
+@admin_api.route('/products/<int:id>', methods= ['PUT'])
+@admin_required
+def edit_product(id):
+    product = Product.query.get(id)
+
+    if not product:
+        return jsonify({"error":"Producto no encontrado"}), 404
+    
+    # JSON, o formulario si viene una imagen nueva
+    data =request.get_json(silent=True) or request.form
+    if not data and 'image_file' not in request.files:
+        return jsonify({"error":"Datos no proporcionados"}), 400
+    job = None
+    spooled = None
+    committed = False
+    try:
+        if 'name' in data:
+            product.name =data['name']
+
+        if 'description' in data:
+            product.description = data['description']
+
+        if 'price' in data:
+            try:
+                product.price = float(data['price'])
+            except ValueError:
+                return jsonify({"error":"El precio debe ser un número válido"}), 400
+
+        if 'image_file' in request.files:
+            file = request.files['image_file']
+            if not allowed_files(file.filename) or not sniff_image_type(file.stream):
+                return jsonify({"error":"Formato de archivo no permitido"}), 400
+            spooled = image_jobs.spool(file)
+            job = image_jobs.queue_upload(product, spooled)
+
+        db.session.commit()
+        committed = True
+        image_jobs.submit(job)
+        search_index.update(product)
+        return jsonify({
+            "message":"Se realizon los cambios",
+            "product": product.serialize()
+        }), 200
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error":"Ya existe un producto con este nombre"}),409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error":"No se pudieron realizar los cambios:"+str(e)}), 500
+    finally:
+        if not committed:
+            image_jobs.discard_spooled(spooled)
+
+@admin_api.route('/products/<int:id>', methods= ['DELETE'])
+@admin_required
+def delete_product(id):
+    product = Product.query.get(id)
+
+    if not product:
+        return jsonify({"error":"No se encontro el producto"}), 404
+    
+    try:
+        # El borrado en cloudinary queda en la cola, fuera de la petición
+        jobs = [image_jobs.queue_destroy(url) for url in product.image_urls()]
+        db.session.delete(product)
+        db.session.commit()
+        image_jobs.submit(*jobs)
+        search_index.remove(id)
+        return jsonify({"msg":"Producto eliminado correctamente"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error":"No se pudo eliminar producto:" + str(e)}),500
+
+####CATEGORIAS
+@admin_api.route('/categories', methods=['POST'])
+@admin_required
+def new_category():
+    data = request.get_json()
+
+    if not data or 'name' not in data:
+        return jsonify({"error":"El nombre es obligatorio"}), 400
+    
+    try:
+        category = Category(
+            name=data['name'],
+            description=data.get('description','')
+        )
+
+        db.session.add(category)
+        db.session.commit()
+        return jsonify({
+            "message":"Categoría creada",
+            "category":category.serialize()
+        }), 201 
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error":"Esta categoria ya existe"}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error":str(e)}), 500
+
+@admin_api.route('/categories/<int:id>', methods=['PUT'])
+@admin_required
+def edit_category(id):
+    category = Category.query.get(id)
+
+    if not category:
+        return jsonify({"error":"Categoría no encontrada"}), 404
+    
+    data = request.get_json() #Donde guardar los datos nuevos
+    if not data:
+        return jsonify({"error":"Datos no proporcionados"}), 400
+    try:
+        if 'name' in data:
+            category.name = data['name']
+
+        if 'description' in data:
+            category.description = data['description']
+
+        db.session.commit()
+        return jsonify({
+            "message":"Se pudo realizar los cambios exitosamente.",
+            "category":category.serialize()
+            }), 200
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error":"Ya existe una categoria con este nombre"}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error":"No se pudo realizar cambios:"+str(e)}), 500
+    
+
+@admin_api.route('/categories/<int:id>', methods=['DELETE'])
+@admin_required
+def delete_category(id):
+    category = Category.query.get(id)
+
+    if not category:
+        return jsonify({"error":"Categoría no encontrada"}), 404
+    
+    try:
+        db.session.delete(category)  
+        db.session.commit()
+        return jsonify({"message": "Categoría eliminada correctamente"}), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "No se pudo eliminar: " + str(e)}), 500
+
+#####CARGA MASIVA (upsert por nombre, en pocas sentencias)
+@admin_api.route('/admin/categories/bulk', methods=['PUT'])
+@admin_required
+def bulk_upsert_categories():
+    data = request.get_json()
+    try:
+        count = upsert_categories((data or {}).get('categories'))
+        db.session.commit()
+    except BulkError as e:
+        db.session.rollback()
+        return jsonify({"error": e.message}), e.status
+    invalidate("categories", "products")
+    return jsonify({"message": "Categorías guardadas", "count": count}), 200
+
+@admin_api.route('/admin/products/bulk', methods=['PUT'])
+@admin_required
+def bulk_upsert_products():
+    data = request.get_json()
+    try:
+        count = upsert_products((data or {}).get('products'))
+        reconcile()  # El stock fijado por la carga queda anotado como ajuste en el libro
+        db.session.commit()
+    except BulkError as e:
+        db.session.rollback()
+        return jsonify({"error": e.message}), e.status
+    invalidate("products")
+    search_index.clear()  # Se reconstruye en la próxima búsqueda
+    return jsonify({"message": "Productos guardados", "count": count}), 200
+
+@admin_api.route('/admin/products/import', methods=['POST'])
+@admin_required
+def import_products_file():
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({"error": "Falta el archivo"}), 400
+    # El formato viene en ?format= o se deduce de la extensión
+    fmt = request.args.get('format') or os.path.splitext(file.filename)[1].lower().lstrip('.')
+    if fmt == 'jsonl':
+        fmt = 'ndjson'
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"error": "Formato no soportado, usa csv o ndjson"}), 400
+
+    try:
+        report = import_products(read_rows(file.stream, fmt))
+        reconcile()  # El stock de los productos nuevos queda anotado como ajuste en el libro
+        db.session.commit()
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({"error": "El archivo debe estar en UTF-8"}), 400
+    finally:
+        # Los lotes confirmados ya cambiaron el catálogo aunque falle uno posterior
+        invalidate("products")
+        search_index.clear()
+    return jsonify(report), 200
+
+@admin_api.route('/admin/products/export', methods=['GET'])
+@admin_required
+def export_products_file():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"error": "Formato no soportado, usa csv o ndjson"}), 400
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv'
+    return Response(stream_with_context(export_products(fmt)), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename=products.{fmt}"})
+
+
+
+        #####ORDERS
+@admin_api.route('/orders/<int:id>/status', methods=['PUT'])
+@admin_required
+def update_order_status(id):
+    # Bloqueada hasta el commit: el barrido de vencidas (expiry.py) no la cancela a la vez
+    order = Order.query.filter_by(id=id).with_for_update().first()
+    if not order:
+        return jsonify({"error": "Orden no encontrada"}), 404
+
+    new_status = request.json.get('status')
+    if new_status not in ['pending', 'paid', 'shipped', 'cancelled']:
+        return jsonify({"error": "Estado inválido"}), 400
+
+    old_status = order.status
+    order.status = new_status
+    try:
+        # Cancelar libera lo reservado; reactivar una orden cancelada lo vuelve a reservar
+        stock_changed = apply_status_change(order, old_status, new_status)
+    except InventoryError:
+        db.session.rollback()
+        return jsonify({"error": "No hay stock suficiente para reactivar la orden"}), 409
+    record_status_change(order, old_status, new_status)
+    db.session.commit()
+    if stock_changed:
+        invalidate("products")
+
+    return jsonify({"message": f"Estado actualizado a '{new_status}'"}), 200
+
+@admin_api.route('/admin/orders', methods=['GET'])
+@admin_required
+def get_all_orders():
+    cursor = request.args.get('cursor')
+    last = decode_cursor(cursor)
+    if cursor and not last:
+        return jsonify({"error": "Cursor inválido"}), 400
+    try:
+        query = newest_first(filter_orders(Order.query, request.args), last)
+    except (ValueError, TypeError, IndexError):
+        return jsonify({"error": "Filtros inválidos"}), 400
+
+    # ?format=ndjson|csv exporta todo el historial filtrado sin paginar, en streaming
+    fmt = request.args.get('format')
+    if fmt in ('ndjson', 'csv'):
+        mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv'
+        return Response(stream_with_context(export_orders(query, fmt)), mimetype=mimetype,
+                        headers={"Content-Disposition": f"attachment; filename=orders.{fmt}"})
+
+    orders, next_cursor = keyset_page(query, page_size(), order_cursor)
+    return jsonify({
+        "orders": [order.serialize() for order in orders],
+        "next_cursor": next_cursor
+    }), 200
+
+####INVENTARIO
+@admin_api.route('/admin/products/<int:id>/stock', methods=['POST'])
+@admin_required
+def adjust_stock(id):
+    data = request.get_json() or {}
+    if not db.session.query(Product.id).filter(Product.id == id).scalar():
+        return jsonify({"error": "Producto no encontrado"}), 404
+    try:
+        adjust(id, data.get('quantity'), data.get('kind', 'restock'), data.get('note'))
+        db.session.commit()
+    except InventoryError as e:
+        db.session.rollback()
+        return jsonify({"error": e.message}), e.status
+    invalidate("products")
+    stock, reserved = db.session.query(Product.stock, Product.reserved).filter(Product.id == id).one()
+    return jsonify({"message": "Stock actualizado", "stock": stock, "reserved": reserved}), 200
+
+@admin_api.route('/admin/inventory/low-stock', methods=['GET'])
+@admin_required
+def low_stock():
+    cursor = request.args.get('cursor')
+    last = decode_cursor(cursor)
+    if cursor and not last:
+        return jsonify({"error": "Cursor inválido"}), 400
+    try:
+        query = low_stock_query(after=last)
+    except (ValueError, TypeError, IndexError):
+        return jsonify({"error": "Cursor inválido"}), 400
+    rows, next_cursor = keyset_page(query, page_size(), lambda row: (row.stock, row.id))
+    return jsonify({
+        "products": [{
+            "id": row.id,
+            "name": row.name,
+            "stock": row.stock,
+            "reserved": row.reserved,
+            "threshold": row.threshold
+        } for row in rows],
+        "next_cursor": next_cursor
+    }), 200
+
+####REPORTES (solo leen las tablas de resumen de analytics.py)
+@admin_api.route('/admin/analytics/daily', methods=['GET'])
+@admin_required
+def daily_sales_report():
+    query = DailySales.query.filter(DailySales.orders > 0).order_by(DailySales.day)
+    try:
+        if request.args.get('date_from'):
+            query = query.filter(DailySales.day >= date.fromisoformat(request.args['date_from']))
+        if request.args.get('date_to'):
+            query = query.filter(DailySales.day <= date.fromisoformat(request.args['date_to']))
+    except ValueError:
+        return jsonify({"error": "Fecha inválida"}), 400
+    return jsonify([day.serialize() for day in query.all()]), 200
+
+@admin_api.route('/admin/analytics/products', methods=['GET'])
+@admin_required
+def top_products_report():
+    column = ProductSales.revenue if request.args.get('by') == 'revenue' else ProductSales.units
+    rows = db.session.query(ProductSales, Product.name)\
+                     .join(Product, Product.id == ProductSales.product_id)\
+                     .order_by(column.desc()).limit(page_size()).all()
+    return jsonify([{
+        "product_id": sales.product_id,
+        "name": name,
+        "units": sales.units,
+        "revenue": sales.revenue
+    } for sales, name in rows]), 200
+
+@admin_api.route('/admin/analytics/categories', methods=['GET'])
+@admin_required
+def category_sales_report():
+    rows = db.session.query(CategorySales, Category.name)\
+                     .join(Category, Category.id == CategorySales.category_id)\
+                     .order_by(CategorySales.revenue.desc()).all()
+    return jsonify([{
+        "category_id": sales.category_id,
+        "name": name,
+        "units": sales.units,
+        "revenue": sales.revenue
+    } for sales, name in rows]), 200
+
+@admin_api.route('/admin/analytics/coupons', methods=['GET'])
+@admin_required
+def coupon_usage_report():
+    rows = db.session.query(CouponUsage, Coupon.code)\
+                     .join(Coupon, Coupon.id == CouponUsage.coupon_id)\
+                     .order_by(CouponUsage.orders.desc()).all()
+    return jsonify([{
+        "coupon_id": usage.coupon_id,
+        "code": code,
+        "orders": usage.orders,
+        "discount_total": usage.discount_total
+    } for usage, code in rows]), 200
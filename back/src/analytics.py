@@ -0,0 +1,139 @@
+from collections import defaultdict
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from models import (db, product_category, Order, OrderDetail, DailySales, ProductSales,
+                    CategorySales, CouponUsage)
+
+# Estados en que la orden ya cuenta como venta
+PAID_STATUSES = {'paid', 'shipped'}
+ROLLUPS = (DailySales, ProductSales, CategorySales, CouponUsage)
+
+
+def _increment(model, key, deltas):
+    """Suma los deltas a la fila del resumen, creándola si no existe"""
+    where = [getattr(model, column) == value for column, value in key.items()]
+    values = {column: getattr(model, column) + delta for column, delta in deltas.items()}
+    statement = update(model).where(*where).values(**values).execution_options(synchronize_session=False)
+    if db.session.execute(statement).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(model).values(**key, **deltas))
+    except IntegrityError:
+        # Otra transacción creó la fila entre el UPDATE y el INSERT
+        db.session.execute(statement)
+
+
+def _category_ids(product_ids):
+    rows = db.session.query(product_category.c.product_id, product_category.c.category_id)\
+                     .filter(product_category.c.product_id.in_(product_ids)).all()
+    categories = defaultdict(list)
+    for product_id, category_id in rows:
+        categories[product_id].append(category_id)
+    return categories
+
+
+def apply_order(order, sign=1):
+    """Suma (sign=1) o resta (sign=-1) una orden de todos los resúmenes"""
+    units = sum(detail.quantity for detail in order.details)
+    _increment(DailySales, {"day": order.date.date()},
+               {"orders": sign, "units": sign * units, "revenue": sign * order.total})
+
+    by_product = defaultdict(lambda: [0, 0.0])
+    for detail in order.details:
+        by_product[detail.product_id][0] += detail.quantity
+        by_product[detail.product_id][1] += detail.quantity * detail.unit_price
+    by_category = defaultdict(lambda: [0, 0.0])
+    for product_id, categories in _category_ids(list(by_product)).items():
+        for category_id in categories:
+            by_category[category_id][0] += by_product[product_id][0]
+            by_category[category_id][1] += by_product[product_id][1]
+
+    for product_id, (product_units, revenue) in by_product.items():
+        _increment(ProductSales, {"product_id": product_id}, {"units": sign * product_units, "revenue": sign * revenue})
+    for category_id, (category_units, revenue) in by_category.items():
+        _increment(CategorySales, {"category_id": category_id}, {"units": sign * category_units, "revenue": sign * revenue})
+    if order.coupon_id:
+        _increment(CouponUsage, {"coupon_id": order.coupon_id},
+                   {"orders": sign, "discount_total": sign * (order.discount_applied or 0)})
+
+
+def record_status_change(order, old_status, new_status):
+    """Actualiza los resúmenes en la misma transacción del cambio de estado"""
+    was_paid = old_status in PAID_STATUSES
+    is_paid = new_status in PAID_STATUSES
+    if was_paid != is_paid:
+        apply_order(order, 1 if is_paid else -1)
+
+
+def backfill(batch_size=1000, echo=None):
+    """Reconstruye todos los resúmenes desde el historial de órdenes pagadas.
+
+    Lee las órdenes por lotes de ids y agrega cada lote en SQL; los resúmenes son
+    pequeños, así que se acumulan en memoria y se escriben en una sola transacción.
+    """
+    daily = defaultdict(lambda: [0, 0, 0.0])
+    products = defaultdict(lambda: [0, 0.0])
+    categories = defaultdict(lambda: [0, 0.0])
+    coupons = defaultdict(lambda: [0, 0.0])
+    subtotal = func.sum(OrderDetail.quantity * OrderDetail.unit_price)
+    last_id, processed = 0, 0
+
+    while True:
+        orders = db.session.query(Order.id, Order.date, Order.total, Order.coupon_id, Order.discount_applied)\
+                           .filter(Order.status.in_(PAID_STATUSES), Order.id > last_id)\
+                           .order_by(Order.id).limit(batch_size).all()
+        if not orders:
+            break
+        ids = [row.id for row in orders]
+        last_id = ids[-1]
+
+        units = dict(db.session.query(OrderDetail.order_id, func.sum(OrderDetail.quantity))
+                     .filter(OrderDetail.order_id.in_(ids)).group_by(OrderDetail.order_id))
+        for row in orders:
+            day = daily[row.date.date()]
+            day[0] += 1
+            day[1] += units.get(row.id) or 0
+            day[2] += row.total
+            if row.coupon_id:
+                coupons[row.coupon_id][0] += 1
+                coupons[row.coupon_id][1] += row.discount_applied or 0
+
+        for product_id, quantity, revenue in db.session.query(OrderDetail.product_id, func.sum(OrderDetail.quantity), subtotal)\
+                .filter(OrderDetail.order_id.in_(ids)).group_by(OrderDetail.product_id):
+            products[product_id][0] += quantity
+            products[product_id][1] += revenue
+        for category_id, quantity, revenue in db.session.query(product_category.c.category_id, func.sum(OrderDetail.quantity), subtotal)\
+                .join(product_category, product_category.c.product_id == OrderDetail.product_id)\
+                .filter(OrderDetail.order_id.in_(ids)).group_by(product_category.c.category_id):
+            categories[category_id][0] += quantity
+            categories[category_id][1] += revenue
+
+        processed += len(ids)
+        if echo:
+            echo(f"{processed} órdenes procesadas")
+
+    for model in ROLLUPS:
+        db.session.execute(delete(model))
+    rows = (
+        (DailySales, [{"day": k, "orders": v[0], "units": v[1], "revenue": v[2]} for k, v in daily.items()]),
+        (ProductSales, [{"product_id": k, "units": v[0], "revenue": v[1]} for k, v in products.items()]),
+        (CategorySales, [{"category_id": k, "units": v[0], "revenue": v[1]} for k, v in categories.items()]),
+        (CouponUsage, [{"coupon_id": k, "orders": v[0], "discount_total": v[1]} for k, v in coupons.items()]),
+    )
+    for model, values in rows:
+        if values:
+            db.session.execute(insert(model), values)
+    db.session.commit()
+    return processed
+
+
+@click.command('analytics-backfill')
+@click.option('--batch-size', default=1000, show_default=True, help='Órdenes leídas por lote')
+@with_appcontext
+def backfill_command(batch_size):
+    """Reconstruye las tablas de resumen de ventas"""
+    total = backfill(batch_size, echo=click.echo)
+    click.echo(f"Resúmenes reconstruidos con {total} órdenes pagadas")
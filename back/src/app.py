@@ -1,41 +1,112 @@
-import cloudinary
-import os
+import threading
 from flask import Flask, jsonify
-from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from models import db
-from routes import api
-from dotenv import load_dotenv
-from datetime import timedelta
+from cache import init_cache
+from inventory import reconcile_command
+from expiry import order_sweeper, expire_command
+from security import login_throttle
+from metrics import init_metrics
+from serializers import init_json
+from settings import get_config, engine_options
 
-load_dotenv()
+jwt = JWTManager()
 
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
-)
 
-app = Flask(__name__)
-app.config['DEBUG'] = True 
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL') 
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET') 
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=2)
+def running_flask_cli():
+    """True si la app la carga el comando flask (flask db, flask run...), no un servidor"""
+    import click
+    from flask.cli import FlaskGroup
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and isinstance(ctx.find_root().command, FlaskGroup)
 
-db.init_app(app)
-Migrate(app, db)
-jwt = JWTManager(app)
-CORS(app) 
 
-@app.route('/')
-def main():
-    return jsonify({"message": "REST API FLASK"}), 200
+def init_admin(app, start=True):
+    """Rutas de administración y lo que solo ellas usan: la cola de imágenes (y con ella
+    Cloudinary, que igual se importa recién en la primera subida) y los reportes.
 
-app.register_blueprint(api, url_prefix="/api")
+    Devuelve la cola de imágenes para arrancarla después si start=False.
+    """
+    from admin_routes import admin_api
+    from jobs import image_jobs
+    from analytics import backfill_command
+
+    image_jobs.init_app(app, start)
+    app.register_blueprint(admin_api, url_prefix="/api")
+    app.cli.add_command(backfill_command)
+    return image_jobs
+
+
+def start_on_first_request(app, services):
+    """Arranca los hilos de fondo con la primera petición (flask run), nunca en flask db ni en otros comandos"""
+    pending = list(services)
+    lock = threading.Lock()
+
+    @app.before_request
+    def start_background():
+        if pending:
+            with lock:
+                while pending:
+                    pending.pop().start()
+
+
+def create_app(config_name=None, **overrides):
+    """Crea la app con la configuración de APP_ENV (o config_name) más los overrides.
+
+    APP_BLUEPRINTS elige qué rutas se registran: "public" (catálogo, clientes y compras)
+    y/o "admin". Un worker solo de catálogo (APP_BLUEPRINTS=public) no importa las rutas
+    de administración ni la cola de imágenes, y Flask-Migrate (Alembic) solo se carga
+    desde el comando flask.
+    """
+    app = Flask(__name__)
+    config = get_config(config_name)
+    app.config.from_object(config)
+    app.config.update(overrides)
+    missing = [key for key in getattr(config, 'REQUIRED', ()) if not app.config.get(key)]
+    if missing:
+        raise RuntimeError(f"Falta configurar: {', '.join(missing)}")
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'],
+                                                             app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    blueprints = {name.strip() for name in app.config['APP_BLUEPRINTS'].split(',') if name.strip()}
+    unknown = blueprints - {'public', 'admin'}
+    if unknown:
+        raise RuntimeError(f"APP_BLUEPRINTS desconocido: {', '.join(sorted(unknown))} (usa public, admin)")
+
+    if app.config.get('PROXY_FIX_X_FOR'):
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
+    db.init_app(app)
+    init_json(app)
+    init_metrics(app)
+    init_cache(app)
+    login_throttle.init_app(app)
+    jwt.init_app(app)
+    CORS(app)
+    # Desde el comando flask no se levantan hilos de fondo hasta que llegue una petición
+    cli = running_flask_cli()
+    order_sweeper.init_app(app, start=not cli)
+    background = [order_sweeper]
+    if cli:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    @app.route('/')
+    def main():
+        return jsonify({"message": "REST API FLASK"}), 200
+
+    if 'public' in blueprints:
+        from routes import api
+        app.register_blueprint(api, url_prefix="/api")
+    if 'admin' in blueprints:
+        background.append(init_admin(app, start=not cli))
+    if cli:
+        start_on_first_request(app, background)
+    app.cli.add_command(reconcile_command)
+    app.cli.add_command(expire_command)
+    return app
 
 
 if __name__ == '__main__':
-    app.run()
\ No newline at end of file
+    create_app().run()
@@ -0,0 +1,7 @@
+"""Catálogo de solo lectura asíncrono (async_catalog.py): APP_ENV=production uvicorn asgi:app --workers 2
+
+Con gunicorn: gunicorn -k uvicorn.workers.UvicornWorker -w 2 asgi:app
+"""
+from async_catalog import CatalogApp
+
+app = CatalogApp()
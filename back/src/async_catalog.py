@@ -0,0 +1,220 @@
+"""Camino de lectura asíncrono (ASGI) para /, /api/products, /api/products/<id> y /api/categories.
+
+Usa las mismas tablas de models.py, los filtros de catalog.py y la serialización por
+filas de serializers.py que las vistas de Flask, pero sobre SQLAlchemy asíncrono
+(aiosqlite, asyncpg o aiomysql): mientras una consulta espera a la BD, el mismo
+proceso atiende otras conexiones en vez de tener un hilo bloqueado por cada una.
+Las escrituras siguen en la app WSGI. Los encabezados CORS son los mismos que pone
+CORS(app) en la app de Flask, así que el sitio puede llamar a cualquiera de las dos.
+La caché y sus claves son las de cache.py, así
+que con CACHE_URL las invalidaciones de la app WSGI también llegan aquí; con la caché
+en memoria cada proceso depende del TTL.
+
+    uvicorn asgi:app --workers 2 --port 8001
+"""
+import asyncio
+import hashlib
+import json
+import re
+from urllib.parse import parse_qsl
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.datastructures import MultiDict
+
+from models import Product, Category
+from catalog import PRODUCT_SORTS, filter_products, sort_products, product_cursor
+from pagination import page_size, decode_cursor, encode_cursor
+from pricing import PriceBook
+from serializers import CATEGORY, PRODUCT_COLUMNS, categories_statement, group_categories, serialize_product
+from cache import MemoryCache, RedisCache
+from settings import get_config, engine_options
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+# Métodos que flask_cors anuncia en un preflight con su configuración por defecto
+CORS_METHODS = b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+
+try:
+    import orjson
+
+    def dumps(payload):
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    def dumps(payload):
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def async_database_url(url):
+    """Misma BD que DATABASE_URL, con el driver asíncrono equivalente"""
+    scheme, _, rest = url.partition("://")
+    driver = ASYNC_DRIVERS.get(scheme.split("+")[0])
+    if not driver:
+        raise RuntimeError(f"No hay driver asíncrono para {scheme}")
+    return f"{driver}://{rest}"
+
+
+def cors_headers(request_headers, method):
+    """Como CORS(app): cualquier origen; se devuelve el del pedido (con Vary) o "*" si no viene"""
+    origin = request_headers.get(b"origin")
+    if not origin:
+        return [(b"access-control-allow-origin", b"*")]
+    headers = [(b"access-control-allow-origin", origin)]
+    if method == "OPTIONS" and b"access-control-request-method" in request_headers:
+        requested = sorted(name.strip() for name in request_headers.get(b"access-control-request-headers", b"").split(b",")
+                           if name.strip())
+        if requested:
+            headers.append((b"access-control-allow-headers", b", ".join(requested)))
+        headers.append((b"access-control-allow-methods", CORS_METHODS))
+    headers.append((b"vary", b"Origin"))
+    return headers
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/").strip('"') == etag for tag in header.split(","))
+
+
+class CatalogApp:
+    """Aplicación ASGI mínima: unas pocas rutas GET, sin framework"""
+
+    def __init__(self, config_name=None, **overrides):
+        config = get_config(config_name)
+        self.config = {key: getattr(config, key) for key in dir(config) if key.isupper()}
+        self.config.update(overrides)
+        uri = self.config.get("SQLALCHEMY_DATABASE_URI")
+        if not uri:
+            raise RuntimeError("Falta configurar: SQLALCHEMY_DATABASE_URI")
+        self.engine = create_async_engine(async_database_url(uri),
+                                          **engine_options(uri, self.config["SQLALCHEMY_ENGINE_OPTIONS"]))
+        ttl = self.config.get("CACHE_TTL", 300)
+        if self.config.get("CACHE_URL"):
+            import redis  # dependencia opcional, solo si se configura CACHE_URL
+            self.cache = RedisCache(redis.Redis.from_url(self.config["CACHE_URL"]), default_ttl=ttl)
+        else:
+            self.cache = MemoryCache(self.config.get("CACHE_MAX_ENTRIES", 1024), ttl)
+        # (patrón, vista, espacio de la caché)
+        self.routes = [
+            (re.compile(r"/"), self.health, None),
+            (re.compile(r"/api/products"), self.get_products, "products"),
+            (re.compile(r"/api/products/(\d+)"), self.get_product, "products"),
+            (re.compile(r"/api/categories"), self.get_categories, "categories"),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        status, body, headers = await self.handle(scope)
+        headers = headers + cors_headers(dict(scope["headers"]), scope["method"])
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _cache(self, method, *args):
+        # Redis hace E/S de red: fuera del event loop. La caché en memoria es inmediata
+        if isinstance(self.cache, RedisCache):
+            return await asyncio.to_thread(getattr(self.cache, method), *args)
+        return getattr(self.cache, method)(*args)
+
+    async def handle(self, scope):
+        json_headers = [(b"content-type", b"application/json")]
+        if scope["method"] not in ("GET", "HEAD", "OPTIONS"):
+            return 405, dumps({"error": "Método no permitido"}), json_headers
+        path = scope["path"].rstrip("/") or "/"
+        for pattern, view, namespace in self.routes:
+            match = pattern.fullmatch(path)
+            if match:
+                break
+        else:
+            return 404, dumps({"error": "No encontrado"}), json_headers
+        if scope["method"] == "OPTIONS":  # Preflight CORS: los encabezados los agrega __call__
+            return 200, b"", [(b"allow", b"GET, HEAD, OPTIONS")]
+
+        query_string = scope["query_string"].decode("latin-1")
+        args = MultiDict(parse_qsl(query_string, keep_blank_values=True))
+        if namespace is None:
+            status, payload, _ = await view(args, *match.groups())
+            return status, dumps(payload), json_headers
+
+        # Misma clave que cached_response: request.full_path siempre lleva el "?"
+        generation = await self._cache("generation", namespace)
+        key = f"{namespace}:{generation}:{scope['path']}?{query_string}"
+        entry = await self._cache("get", key)
+        if entry is None:
+            status, payload, ttl = await view(args, *match.groups())
+            body = dumps(payload)
+            if status != 200:
+                return status, body, json_headers
+            entry = {"body": body.decode(), "etag": hashlib.sha256(body).hexdigest(), "mimetype": "application/json"}
+            await self._cache("set", key, entry, min(ttl, self.cache.default_ttl) if ttl else None)
+
+        headers = [(b"content-type", entry["mimetype"].encode()), (b"etag", f'"{entry["etag"]}"'.encode())]
+        request_headers = dict(scope["headers"])
+        if etag_matches(request_headers.get(b"if-none-match", b"").decode("latin-1"), entry["etag"]):
+            return 304, b"", headers
+        return 200, entry["body"].encode(), headers
+
+    async def health(self, args):
+        return 200, {"message": "REST API FLASK"}, None
+
+    async def _serialize_products(self, connection, rows):
+        """Como catalog.serialize_products; devuelve también el TTL hasta el próximo vencimiento"""
+        prices = PriceBook(rows)
+        ids = [row.id for row in rows]
+        categories = group_categories(await connection.execute(categories_statement(ids))) if ids else {}
+        products = [serialize_product(row, prices[row.id], categories.get(row.id, [])) for row in rows]
+        return products, prices.seconds_until_change()
+
+    async def get_products(self, args):
+        limit = page_size(args)
+        sort = args.get("sort", "id")
+        if sort not in PRODUCT_SORTS:
+            return 400, {"error": "Orden inválido"}, None
+        cursor = args.get("cursor")
+        last = decode_cursor(cursor)
+        if cursor and not last:
+            return 400, {"error": "Cursor inválido"}, None
+        try:
+            query = sort_products(filter_products(select(*PRODUCT_COLUMNS), args), sort, last)
+        except (ValueError, TypeError, IndexError):
+            return 400, {"error": "Filtros inválidos"}, None
+
+        async with self.engine.connect() as connection:
+            rows = (await connection.execute(query.limit(limit + 1))).all()
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(*product_cursor(sort)(rows[-1]))
+            products, ttl = await self._serialize_products(connection, rows)
+        return 200, {"products": products, "next_cursor": next_cursor}, ttl
+
+    async def get_product(self, args, product_id):
+        async with self.engine.connect() as connection:
+            row = (await connection.execute(select(*PRODUCT_COLUMNS).where(Product.id == int(product_id)))).first()
+            if row is None:
+                return 404, {"error": "Producto no encontrado"}, None
+            products, ttl = await self._serialize_products(connection, [row])
+        return 200, products[0], ttl
+
+    async def get_categories(self, args):
+        async with self.engine.connect() as connection:
+            rows = await connection.execute(select(*CATEGORY.columns))
+            return 200, [CATEGORY(row) for row in rows], None
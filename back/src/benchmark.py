@@ -0,0 +1,323 @@
+"""Benchmark repetible de las rutas más usadas de la API.
+
+Llena una BD de prueba con volúmenes configurables y mide get_products, get_product,
+login, create_order y get_all_orders de dos formas: con el test client de Flask (una
+petición a la vez, sin red) y con carga HTTP concurrente contra un servidor local.
+Reporta req/s, latencias p50/p95/p99 y consultas por petición (del header
+Server-Timing que agrega metrics.py).
+
+    # BD SQLite temporal, volúmenes por defecto, guarda la línea base
+    python benchmark.py --save bench_baseline.json
+
+    # Después de un cambio: misma semilla y volúmenes, compara con la línea base
+    python benchmark.py --compare bench_baseline.json
+
+    # PostgreSQL (se borran y recrean TODAS las tablas de esa BD)
+    python benchmark.py --database postgresql://localhost/bench --allow-drop --products 20000
+
+--compare termina con código 1 si alguna ruta empeora más que --tolerance, para
+usarlo en CI.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from models import (db, product_category, Product, Category, Client, Order, OrderDetail, Review)
+from cache import cache, invalidate
+from inventory import reconcile
+from settings import Config
+from pricing import utc_now
+from loadtest import Client as HTTPClient, percentile, run_scenario
+
+BATCH = 1000
+PASSWORD = "benchmark-password"
+ADMIN_EMAIL = "admin@benchmark.local"
+QUERIES_RE = re.compile(r'desc="(\d+) consultas"')
+ORDER_STATUSES = ("pending", "paid", "shipped", "cancelled")
+
+
+def _insert(model, rows):
+    table = model if hasattr(model, "c") else model.__table__
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(insert(table), rows[start:start + BATCH])
+
+
+def seed(volumes, rnd, hash_method):
+    """Borra y recrea las tablas y las llena; todas las filas salen de `rnd`"""
+    db.drop_all()
+    db.create_all()
+    now = utc_now()
+
+    _insert(Category, [{"id": i, "name": f"categoria-{i}", "description": "Categoría de benchmark"}
+                       for i in range(1, volumes["categories"] + 1)])
+
+    # Un solo hash para todos: calcular miles de scrypt solo alargaría la carga
+    password_hash = generate_password_hash(PASSWORD, hash_method)
+    clients = [{"id": 1, "name": "Admin", "email": ADMIN_EMAIL, "password_hash": password_hash,
+                "admin": True, "role_version": 0, "subscribe": False}]
+    clients += [{"id": i, "name": f"Cliente {i}", "email": f"cliente{i}@benchmark.local",
+                 "password_hash": password_hash, "admin": False, "role_version": 0, "subscribe": True}
+                for i in range(2, volumes["clients"] + 2)]
+    _insert(Client, clients)
+
+    products = []
+    for i in range(1, volumes["products"] + 1):
+        on_sale = rnd.random() < 0.3
+        products.append({
+            "id": i, "name": f"Producto {i}", "description": "Producto de benchmark " * 5,
+            "price": rnd.randint(1000, 90000), "stock": 10 ** 6,
+            "discount": rnd.choice((10, 20, 30)) if on_sale else 0,
+            "discount_expiration": now + timedelta(days=rnd.randint(1, 30)) if on_sale else None,
+            "img": f"https://example.com/productos/{i}.jpg", "img_status": "ready",
+            "created_at": now - timedelta(minutes=i),
+            "rating_count": 0, "rating_sum": 0, "rating_avg": 0,
+            "rating_1": 0, "rating_2": 0, "rating_3": 0, "rating_4": 0, "rating_5": 0,
+        })
+
+    # Reseñas con el resumen de cada producto ya calculado, como lo dejaría reviews.py
+    reviews, reviewed = [], set()
+    for _ in range(volumes["reviews"]):
+        product_id = rnd.randint(1, volumes["products"])
+        client_id = rnd.randint(2, volumes["clients"] + 1)
+        if (product_id, client_id) in reviewed:
+            continue
+        reviewed.add((product_id, client_id))
+        rating = rnd.randint(1, 5)
+        reviews.append({"product_id": product_id, "client_id": client_id, "rating": rating,
+                        "comment": "Reseña de benchmark", "created_at": now})
+        product = products[product_id - 1]
+        product["rating_count"] += 1
+        product["rating_sum"] += rating
+        product[f"rating_{rating}"] += 1
+        product["rating_avg"] = product["rating_sum"] / product["rating_count"]
+    _insert(Product, products)
+    _insert(product_category, [{"product_id": product["id"], "category_id": category_id}
+                               for product in products
+                               for category_id in rnd.sample(range(1, volumes["categories"] + 1),
+                                                             min(2, volumes["categories"]))])
+    _insert(Review, reviews)
+
+    orders, details = [], []
+    for order_id in range(1, volumes["orders"] + 1):
+        lines = {rnd.randint(1, volumes["products"]): rnd.randint(1, 3) for _ in range(volumes["details"])}
+        total = 0
+        for product_id, quantity in lines.items():
+            unit_price = products[product_id - 1]["price"]
+            total += unit_price * quantity
+            details.append({"order_id": order_id, "product_id": product_id,
+                            "quantity": quantity, "unit_price": unit_price})
+        orders.append({"id": order_id, "client_id": rnd.randint(2, volumes["clients"] + 1),
+                       "date": now - timedelta(minutes=rnd.randint(1, 365 * 24 * 60)), "total": total,
+                       "status": rnd.choice(ORDER_STATUSES), "shipping_address": "Av. Benchmark 123",
+                       "discount_applied": 0, "payment_method": "transferencia"})
+    _insert(Order, orders)
+    _insert(OrderDetail, details)
+    reconcile()  # Stock inicial de cada producto como ajuste en el libro de movimientos
+    db.session.commit()
+    cache.clear()
+
+
+def scenarios(volumes, admin_token):
+    """(método, ruta, cuerpo, headers, estados correctos) para cada ruta medida"""
+    sorts = ("id", "newest", "price_asc", "price_desc", "name", "rating")
+    admin = {"Authorization": f"Bearer {admin_token}"}
+    products = volumes["products"]
+    return {
+        "get_products": lambda rnd: ("GET", f"/api/products?limit=20&sort={rnd.choice(sorts)}"
+                                            f"&category={rnd.randint(1, volumes['categories'])}", None, {}, {200}),
+        "get_product": lambda rnd: ("GET", f"/api/products/{rnd.randint(1, products)}", None, {}, {200}),
+        "login": lambda rnd: ("POST", "/api/login", {
+            "email": f"cliente{rnd.randint(2, volumes['clients'] + 1)}@benchmark.local", "password": PASSWORD
+        }, {}, {200}),
+        "create_order": lambda rnd: ("POST", "/api/orders", {
+            "shipping_address": "Av. Benchmark 123",
+            "items": [{"product_id": product_id, "quantity": 1}
+                      for product_id in rnd.sample(range(1, products + 1), rnd.randint(1, 3))]
+        }, {}, {201}),
+        "get_all_orders": lambda rnd: ("GET", f"/api/admin/orders?limit=50&status={rnd.choice(ORDER_STATUSES)}",
+                                       None, admin, {200}),
+    }
+
+
+def summarize(latencies, queries, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "queries_per_request": round(statistics.mean(queries), 2) if queries else None,
+    }
+
+
+def _queries(server_timing):
+    match = QUERIES_RE.search(server_timing or "")
+    return int(match.group(1)) if match else None
+
+
+def run_test_client(app, make_request, iterations, rnd, cold):
+    """Una petición a la vez con el test client: mide la app sin red ni concurrencia"""
+    client = app.test_client()
+    latencies, queries, errors = [], [], 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        method, path, body, headers, ok = make_request(rnd)
+        if cold:
+            invalidate("products", "categories")
+        request_started = time.perf_counter()
+        response = client.open(path, method=method, json=body, headers=headers)
+        latencies.append(time.perf_counter() - request_started)
+        count = _queries(response.headers.get("Server-Timing"))
+        if count is not None:
+            queries.append(count)
+        if response.status_code not in ok:
+            errors += 1
+    return summarize(latencies, queries, errors, time.perf_counter() - started)
+
+
+def run_http(base_url, make_request, concurrency, duration, seed_value):
+    """Carga concurrente por HTTP con loadtest.run_scenario, contando las consultas de Server-Timing"""
+    queries = []
+
+    def count_queries(headers):
+        count = _queries(headers.get("Server-Timing"))
+        if count is not None:
+            queries.append(count)
+
+    ok = make_request(random.Random(seed_value))[4]  # Los estados correctos son fijos por ruta
+    result = run_scenario(HTTPClient(base_url, timeout=30), lambda rnd: make_request(rnd)[:4],
+                          concurrency, duration, seed_value, ok, on_response=count_queries)
+    result["queries_per_request"] = round(statistics.mean(queries), 2) if queries else None
+    return result
+
+
+def start_server(app):
+    from werkzeug.serving import make_server
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="benchmark-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def compare(baseline, results, tolerance):
+    """Lista de (ruta, métrica, antes, después, cambio %, ¿regresión?)"""
+    rows = []
+    for mode, scenarios_results in results.items():
+        for name, current in scenarios_results.items():
+            previous = baseline.get("results", {}).get(mode, {}).get(name)
+            if not previous:
+                continue
+            for metric, higher_is_better in (("rps", True), ("p95_ms", False), ("queries_per_request", False)):
+                before, after = previous.get(metric), current.get(metric)
+                if before is None or after is None:
+                    continue
+                change = (after - before) / before * 100 if before else 0
+                if metric == "queries_per_request":
+                    # Una consulta más por petición ya es una regresión (p. ej. un N+1 nuevo)
+                    regression = after > before
+                else:
+                    regression = (-change if higher_is_better else change) > tolerance
+                rows.append((f"{mode}/{name}", metric, before, after, round(change, 1), regression))
+    return rows
+
+
+def print_results(results):
+    print(f"{'modo/ruta':<28}{'peticiones':>11}{'errores':>9}{'req/s':>10}{'p50 ms':>9}"
+          f"{'p95 ms':>9}{'p99 ms':>9}{'consultas':>11}")
+    for mode, scenarios_results in results.items():
+        for name, r in scenarios_results.items():
+            print(f"{mode + '/' + name:<28}{r['requests']:>11}{r['errors']:>9}{r['rps']:>10}{r['p50_ms']:>9}"
+                  f"{r['p95_ms']:>9}{r['p99_ms']:>9}{str(r['queries_per_request']):>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las rutas principales de la API")
+    parser.add_argument("--database", help="URL de la BD de prueba (por defecto SQLite temporal)")
+    parser.add_argument("--allow-drop", action="store_true", help="Permite borrar las tablas de una BD que no es SQLite")
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--details", type=int, default=3, help="Detalles por orden")
+    parser.add_argument("--reviews", type=int, default=5000)
+    parser.add_argument("--scenario", action="append", help="Solo estas rutas (se puede repetir)")
+    parser.add_argument("--iterations", type=int, default=200, help="Peticiones por ruta con el test client")
+    parser.add_argument("--cold", action="store_true", help="Invalida la caché antes de cada petición del test client")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clientes HTTP concurrentes (0 = sin HTTP)")
+    parser.add_argument("--duration", type=float, default=10, help="Segundos de carga HTTP por ruta")
+    parser.add_argument("--hash-method", default=Config.PASSWORD_HASH_METHOD)
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--save", metavar="ARCHIVO", help="Guarda los resultados como línea base")
+    parser.add_argument("--compare", metavar="ARCHIVO", help="Compara con una línea base guardada")
+    parser.add_argument("--tolerance", type=float, default=10, help="Empeoramiento tolerado en %% (req/s y p95)")
+    args = parser.parse_args()
+
+    database = args.database or "sqlite:///" + os.path.join(tempfile.gettempdir(), "insomnia_benchmark.db")
+    if not database.startswith("sqlite") and not args.allow_drop:
+        raise SystemExit("El benchmark borra todas las tablas de la BD: agrega --allow-drop si es una BD de prueba")
+    logging.getLogger("metrics").setLevel(logging.ERROR)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    volumes = {key: getattr(args, key) for key in ("categories", "products", "clients", "orders", "details", "reviews")}
+    app = create_app("testing", SQLALCHEMY_DATABASE_URI=database,
+                     SQLALCHEMY_ENGINE_OPTIONS=Config.SQLALCHEMY_ENGINE_OPTIONS,
+                     PASSWORD_HASH_METHOD=args.hash_method, SLOW_QUERY_MS=None,
+                     # Sin límite de intentos: el benchmark hace muchos logins desde la misma IP
+                     LOGIN_EMAIL_BURST=10 ** 9, LOGIN_IP_BURST=10 ** 9)
+    with app.app_context():
+        started = time.perf_counter()
+        seed(volumes, random.Random(args.random_seed), args.hash_method)
+        print(f"BD lista en {time.perf_counter() - started:.1f}s: {volumes}", file=sys.stderr)
+        token = app.test_client().post("/api/login", json={"email": ADMIN_EMAIL, "password": PASSWORD}).get_json()["access_token"]
+
+    selected = {name: make_request for name, make_request in scenarios(volumes, token).items()
+                if not args.scenario or name in args.scenario}
+    results = {"test_client": {}}
+    for name, make_request in selected.items():
+        results["test_client"][name] = run_test_client(app, make_request, args.iterations,
+                                                       random.Random(args.random_seed), args.cold)
+    if args.concurrency:
+        server, base_url = start_server(app)
+        results["http"] = {}
+        try:
+            for name, make_request in selected.items():
+                results["http"][name] = run_http(base_url, make_request, args.concurrency, args.duration,
+                                                 args.random_seed)
+        finally:
+            server.shutdown()
+
+    print_results(results)
+    report = {"volumes": volumes, "iterations": args.iterations, "concurrency": args.concurrency,
+              "duration": args.duration, "database": database.split("://")[0], "cold": args.cold,
+              "results": results}
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump(report, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("volumes") != volumes:
+            print("Aviso: la línea base usó otros volúmenes", file=sys.stderr)
+        rows = compare(baseline, results, args.tolerance)
+        print(f"\n{'modo/ruta':<28}{'métrica':<22}{'antes':>10}{'después':>10}{'cambio %':>10}")
+        for route, metric, before, after, change, regression in rows:
+            print(f"{route:<28}{metric:<22}{before:>10}{after:>10}{change:>10}{'  REGRESIÓN' if regression else ''}")
+        if any(row[-1] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Compara el catálogo asíncrono (asgi.py + uvicorn) con el WSGI con hilos (gunicorn gthread).
+
+Llena la BD con benchmark.seed, levanta cada servidor en un subproceso con la misma
+cantidad de procesos y le aplica la misma carga HTTP concurrente (benchmark.run_http)
+en /, /api/products, /api/products/<id> y /api/categories:
+
+    python benchmark_async.py --concurrency 64 --workers 2
+    python benchmark_async.py --cold          # caché de una entrada: casi todo va a la BD
+    python benchmark_async.py --database postgresql://localhost/bench --allow-drop
+
+Con SQLite cada consulta es local y rápida, así que la diferencia se nota sobre todo
+con una BD en red (PostgreSQL) y muchas conexiones concurrentes.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from app import create_app
+from benchmark import seed, run_http, print_results
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"El servidor terminó con código {process.returncode}")
+        try:
+            with urllib.request.urlopen(base_url + "/", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("El servidor no respondió a tiempo")
+
+
+def server_commands(port, workers, threads):
+    return {
+        "wsgi": ([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+                 {"BIND": f"127.0.0.1:{port}", "WEB_WORKERS": str(workers), "WEB_THREADS": str(threads)}),
+        "asgi": ([sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port),
+                  "--workers", str(workers), "--log-level", "warning", "--no-access-log"], {}),
+    }
+
+
+def scenarios(volumes):
+    return {
+        "health": lambda rnd: ("GET", "/", None, {}, {200}),
+        "get_products": lambda rnd: ("GET", f"/api/products?limit=20&sort={rnd.choice(('id', 'newest', 'price_asc'))}"
+                                            f"&category={rnd.randint(1, volumes['categories'])}", None, {}, {200}),
+        "get_product": lambda rnd: ("GET", f"/api/products/{rnd.randint(1, volumes['products'])}", None, {}, {200}),
+        "get_categories": lambda rnd: ("GET", "/api/categories", None, {}, {200}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del catálogo asíncrono contra WSGI con hilos")
+    parser.add_argument("--database", help="URL de la BD de prueba (por defecto SQLite temporal)")
+    parser.add_argument("--allow-drop", action="store_true", help="Permite borrar las tablas de una BD que no es SQLite")
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=2, help="Procesos de cada servidor")
+    parser.add_argument("--threads", type=int, default=4, help="Hilos por worker de gunicorn")
+    parser.add_argument("--concurrency", type=int, default=64, help="Clientes HTTP concurrentes")
+    parser.add_argument("--duration", type=float, default=10, help="Segundos de carga por ruta")
+    parser.add_argument("--cold", action="store_true", help="Sin caché efectiva en ninguno de los dos servidores")
+    parser.add_argument("--server", action="append", choices=("wsgi", "asgi"), help="Solo estos servidores")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--json", metavar="ARCHIVO", help="Guarda los resultados en un archivo")
+    args = parser.parse_args()
+
+    database = args.database or "sqlite:///" + os.path.join(tempfile.gettempdir(), "insomnia_benchmark_async.db")
+    if not database.startswith("sqlite") and not args.allow_drop:
+        raise SystemExit("El benchmark borra todas las tablas de la BD: agrega --allow-drop si es una BD de prueba")
+    logging.getLogger("metrics").setLevel(logging.ERROR)
+
+    volumes = {"categories": args.categories, "products": args.products, "clients": 1,
+               "orders": 0, "details": 0, "reviews": args.products}
+    with create_app("testing", SQLALCHEMY_DATABASE_URI=database, SLOW_QUERY_MS=None).app_context():
+        seed(volumes, random.Random(args.random_seed), "pbkdf2:sha256:1000")
+
+    env = dict(os.environ, APP_ENV="production", DATABASE_URL=database,
+               JWT_SECRET=os.getenv("JWT_SECRET", "benchmark-secret-key-de-al-menos-32-bytes"),
+               IMAGE_UPLOADER="stub", IMAGE_JOB_WORKERS="0", ORDER_SWEEP_INTERVAL="0", SLOW_QUERY_MS="0",
+               DB_POOL_SIZE=str(max(5, args.threads)))
+    if args.cold:
+        env["CACHE_MAX_ENTRIES"] = "1"
+
+    results = {}
+    port = free_port()
+    for name, (command, extra_env) in server_commands(port, args.workers, args.threads).items():
+        if args.server and name not in args.server:
+            continue
+        process = subprocess.Popen(command, cwd=HERE, env=dict(env, **extra_env),
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            wait_ready(base_url, process)
+            results[name] = {route: run_http(base_url, make_request, args.concurrency, args.duration, args.random_seed)
+                             for route, make_request in scenarios(volumes).items()}
+        finally:
+            process.terminate()
+            process.wait(30)
+
+    print(f"{args.workers} procesos por servidor, {args.concurrency} clientes concurrentes, "
+          f"BD {database.split('://')[0]}{', sin caché' if args.cold else ''}")
+    print_results(results)
+    if "wsgi" in results and "asgi" in results:
+        print()
+        for route, wsgi in results["wsgi"].items():
+            asgi = results["asgi"][route]
+            ratio = asgi["rps"] / wsgi["rps"] if wsgi["rps"] else 0
+            print(f"{route:<16} asgi/wsgi req/s: {ratio:.2f}x  p95 {wsgi['p95_ms']} -> {asgi['p95_ms']} ms")
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({"volumes": volumes, "workers": args.workers, "threads": args.threads,
+                       "concurrency": args.concurrency, "cold": args.cold, "results": results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
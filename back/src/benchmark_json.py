@@ -0,0 +1,125 @@
+"""Compara la serialización de objetos del ORM con la de filas (serializers.py).
+
+Llena una BD SQLite temporal con el catálogo de benchmark.py y arma el catálogo
+completo por los dos caminos, midiendo por separado la consulta, el armado de los
+dicts y la codificación JSON:
+
+    orm:   Product + selectinload(categories) -> Product.serialize -> json de Flask
+    filas: with_entities + categorías en una consulta -> serialize_product -> orjson
+
+    python benchmark_json.py                      # 10.000 productos, 20 repeticiones
+    python benchmark_json.py --products 50000 --repeat 5
+
+Antes de medir verifica que ambos caminos devuelvan el mismo JSON.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import selectinload
+
+from app import create_app
+from models import db, Product
+from catalog import serialize_products
+from pricing import PriceBook
+from serializers import OrjsonProvider, product_rows
+from benchmark import seed
+
+
+def orm_path(app, encoder):
+    products = Product.query.options(selectinload(Product.categories)).order_by(Product.id).all()
+    loaded = time.perf_counter()
+    prices = PriceBook(products)
+    payload = [product.serialize(prices[product.id]) for product in products]
+    built = time.perf_counter()
+    body = encoder.dumps(payload)
+    return payload, body, loaded, built
+
+
+def row_path(app, encoder):
+    products = product_rows(Product.query).order_by(Product.id).all()
+    loaded = time.perf_counter()
+    payload = serialize_products(products)
+    built = time.perf_counter()
+    body = encoder.dumps(payload)
+    return payload, body, loaded, built
+
+
+def measure(app, path, encoder, repeat):
+    stages = {"query_ms": [], "serialize_ms": [], "json_ms": [], "total_ms": []}
+    size = 0
+    for _ in range(repeat):
+        # Sesión nueva en cada vuelta: el mapa de identidad no debe reutilizar objetos
+        db.session.remove()
+        with app.test_request_context():
+            started = time.perf_counter()
+            _, body, loaded, built = path(app, encoder)
+            finished = time.perf_counter()
+        size = len(body)
+        stages["query_ms"].append((loaded - started) * 1000)
+        stages["serialize_ms"].append((built - loaded) * 1000)
+        stages["json_ms"].append((finished - built) * 1000)
+        stages["total_ms"].append((finished - started) * 1000)
+    result = {stage: round(statistics.median(values), 1) for stage, values in stages.items()}
+    result["bytes"] = size
+    return result
+
+
+def same_output(app):
+    """Ambos caminos deben dar el mismo catálogo (las categorías sin importar el orden)"""
+    def normalized(payload):
+        for product in payload:
+            product["categories"] = sorted(product["categories"], key=lambda category: category["id"])
+        return payload
+
+    with app.test_request_context():
+        db.session.remove()
+        orm = orm_path(app, app.json)[0]
+        db.session.remove()
+        rows = row_path(app, app.json)[0]
+    return normalized(orm) == normalized(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización del catálogo")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--json", metavar="ARCHIVO", help="Guarda los resultados en un archivo")
+    args = parser.parse_args()
+
+    logging.getLogger("metrics").setLevel(logging.ERROR)
+    database = "sqlite:///" + os.path.join(tempfile.gettempdir(), "insomnia_benchmark_json.db")
+    app = create_app("testing", SQLALCHEMY_DATABASE_URI=database, SLOW_QUERY_MS=None, JSON_PROVIDER="default")
+    volumes = {"categories": args.categories, "products": args.products, "clients": 1,
+               "orders": 0, "details": 0, "reviews": args.products}
+
+    with app.app_context():
+        seed(volumes, random.Random(args.random_seed), "pbkdf2:sha256:1000")
+        if not same_output(app):
+            raise SystemExit("Los dos caminos no producen el mismo JSON")
+        results = {
+            "orm + json": measure(app, orm_path, DefaultJSONProvider(app), args.repeat),
+            "filas + json": measure(app, row_path, DefaultJSONProvider(app), args.repeat),
+            "filas + orjson": measure(app, row_path, OrjsonProvider(app), args.repeat),
+        }
+
+    print(f"{args.products} productos, mediana de {args.repeat} repeticiones")
+    print(f"{'camino':<16}{'consulta ms':>13}{'dicts ms':>10}{'json ms':>9}{'total ms':>10}{'bytes':>11}")
+    for name, r in results.items():
+        print(f"{name:<16}{r['query_ms']:>13}{r['serialize_ms']:>10}{r['json_ms']:>9}{r['total_ms']:>10}{r['bytes']:>11}")
+    baseline = results["orm + json"]["total_ms"]
+    print(f"\nfilas + orjson es {baseline / results['filas + orjson']['total_ms']:.1f}x más rápido que orm + json")
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({"products": args.products, "repeat": args.repeat, "results": results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Mide el arranque de la app: tiempo de imports, tiempo total de create_app y memoria.
+
+Cada medición corre en un proceso nuevo (python -X importtime) para que no haya
+módulos ya cargados, con todas las rutas y con APP_BLUEPRINTS=public:
+
+    python benchmark_startup.py --repeat 7
+    python benchmark_startup.py --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MODES = {
+    "full": "public,admin",
+    "public": "public",
+}
+
+# Módulos pesados que el arranque perezoso debería evitar
+HEAVY_MODULES = ("cloudinary", "alembic", "flask_migrate", "PIL", "admin_routes", "jobs", "bulk", "analytics")
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+create_app()
+elapsed = time.perf_counter() - start
+rss = None
+try:
+    with open("/proc/self/status") as status:
+        rss = next(int(line.split()[1]) for line in status if line.startswith("VmRSS:"))
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "rss_kb": rss,
+                  "loaded": [name for name in %r if name in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def import_time_us(stderr):
+    """Suma el tiempo propio de cada módulo en la salida de -X importtime"""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        total += int(line.split(":", 1)[1].split("|")[0])
+    return total
+
+
+def measure(blueprints):
+    env = dict(os.environ, APP_ENV="testing", APP_BLUEPRINTS=blueprints,
+               IMAGE_UPLOADER="stub", IMAGE_JOB_WORKERS="0", ORDER_SWEEP_INTERVAL="0")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE], cwd=HERE, env=env,
+                            capture_output=True, text=True, check=True)
+    sample = json.loads(result.stdout.strip().splitlines()[-1])
+    sample["import_ms"] = import_time_us(result.stderr) / 1000
+    return sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del arranque de la app")
+    parser.add_argument("--repeat", type=int, default=5, help="Procesos por modo (se informa la mediana)")
+    parser.add_argument("--mode", action="append", choices=MODES, help="Solo estos modos")
+    parser.add_argument("--json", metavar="ARCHIVO", help="Guarda los resultados en un archivo")
+    args = parser.parse_args()
+
+    results = {}
+    for name, blueprints in MODES.items():
+        if args.mode and name not in args.mode:
+            continue
+        samples = [measure(blueprints) for _ in range(args.repeat)]
+        results[name] = {
+            "blueprints": blueprints,
+            "startup_ms": round(statistics.median(sample["seconds"] for sample in samples) * 1000, 1),
+            "import_ms": round(statistics.median(sample["import_ms"] for sample in samples), 1),
+            "rss_mb": round(statistics.median(sample["rss_kb"] for sample in samples) / 1024, 1),
+            "loaded": samples[-1]["loaded"],
+        }
+
+    print(f"{'modo':<8} {'arranque ms':>12} {'imports ms':>11} {'RSS MB':>8}  módulos pesados")
+    for name, result in results.items():
+        print(f"{name:<8} {result['startup_ms']:>12} {result['import_ms']:>11} {result['rss_mb']:>8}  "
+              f"{', '.join(result['loaded']) or '-'}")
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({"repeat": args.repeat, "results": results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import csv
+import io
+import json
+import math
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import selectinload
+from models import db, product_category, Product, Category, ImageJob
+from pricing import as_utc
+
+UPSERT_CHUNK = 500
+IMPORT_CHUNK = 500
+MAX_REPORTED_ERRORS = 1000
+# Columnas de la importación y exportación; las categorías van separadas por "|"
+CATALOG_COLUMNS = ["name", "description", "price", "stock", "discount", "discount_expiration",
+                   "categories", "image_url"]
+PRODUCT_FIELDS = ("description", "price", "stock", "discount", "discount_expiration")
+
+
+class BulkError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _insert_for_dialect():
+    name = db.engine.dialect.name
+    if name == "postgresql":
+        return postgresql.insert
+    if name in ("mysql", "mariadb"):
+        return mysql.insert
+    if name == "sqlite":
+        return sqlite.insert
+    raise BulkError(f"Upsert no soportado para {name}", 500)
+
+
+def upsert(model, rows, key, columns):
+    """INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE por lotes.
+
+    Todas las filas deben traer las mismas columnas. Solo se actualizan `columns` en
+    las filas que ya existen según la restricción única de `key`. No hace commit.
+    """
+    if not rows:
+        return 0
+    insert = _insert_for_dialect()
+    statement = insert(model.__table__)
+    if db.engine.dialect.name in ("mysql", "mariadb"):
+        statement = statement.on_duplicate_key_update({column: statement.inserted[column] for column in columns})
+    elif columns:
+        statement = statement.on_conflict_do_update(index_elements=[key],
+                                                    set_={column: statement.excluded[column] for column in columns})
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=[key])
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        db.session.execute(statement, rows[start:start + UPSERT_CHUNK])
+    return len(rows)
+
+
+def _grouped(rows):
+    # executemany necesita que todas las filas tengan las mismas columnas
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return groups.items()
+
+
+def upsert_categories(items):
+    if not isinstance(items, list):
+        raise BulkError("Se esperaba una lista de categorías")
+    rows = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get("name"):
+            raise BulkError(f"Fila {index}: el nombre es obligatorio")
+        row = {"name": item["name"]}
+        if "description" in item:
+            row["description"] = item["description"]
+        rows[row["name"]] = row  # Si el nombre se repite gana la última fila
+    for columns, group in _grouped(rows.values()):
+        upsert(Category, group, "name", [column for column in columns if column != "name"])
+    return len(rows)
+
+
+def _product_values(item):
+    """Convierte y valida los campos de producto que trae la fila (upsert e importación).
+
+    Solo incluye los campos presentes; un valor vacío deja la descripción, el stock, el
+    descuento o su vencimiento en su valor por defecto.
+    """
+    values = {field: item[field] for field in PRODUCT_FIELDS if field in item}
+    if not isinstance(values.get("description") or "", str):
+        raise ValueError("la descripción debe ser texto")
+    try:
+        if "description" in values:
+            values["description"] = values["description"] or None
+        if "price" in values:
+            values["price"] = float(values["price"])
+        if "stock" in values:
+            values["stock"] = int(values["stock"] or 0)
+        if "discount" in values:
+            values["discount"] = float(values["discount"] or 0)
+        if "discount_expiration" in values:
+            expiration = values["discount_expiration"]
+            values["discount_expiration"] = as_utc(datetime.fromisoformat(expiration)) if expiration else None
+    except (TypeError, ValueError):
+        raise ValueError("precio, stock, descuento o fecha inválidos")
+    # float() acepta "nan" e "inf": NaN rompe el NOT NULL de la BD e inf quedaría guardado
+    if not all(math.isfinite(values[field]) for field in ("price", "discount") if field in values):
+        raise ValueError("el precio y el descuento deben ser números finitos")
+    if values.get("price", 0) < 0 or values.get("stock", 0) < 0:
+        raise ValueError("el precio y el stock no pueden ser negativos")
+    return values
+
+
+def upsert_products(items):
+    if not isinstance(items, list):
+        raise BulkError("Se esperaba una lista de productos")
+    rows = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get("name"):
+            raise BulkError(f"Fila {index}: el nombre es obligatorio")
+        row = {"name": item["name"]}
+        try:
+            row.update(_product_values(item))
+        except ValueError as e:
+            raise BulkError(f"Fila {index}: {e}")
+        rows[row["name"]] = row
+    for columns, group in _grouped(rows.values()):
+        if "price" not in columns:
+            # Un producto nuevo necesita precio; sin él solo se puede actualizar
+            raise BulkError("Todas las filas deben incluir el precio")
+        upsert(Product, group, "name", [column for column in columns if column != "name"])
+    return len(rows)
+
+
+def read_rows(stream, fmt):
+    """Lee el archivo fila a fila sin cargarlo entero: entrega (línea, fila o mensaje de error)"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, "JSON inválido"
+            continue
+        yield line_no, row if isinstance(row, dict) else "Se esperaba un objeto por línea"
+
+
+def _parse_row(row):
+    """Valida una fila y devuelve (columnas del producto, nombres de categorías, url de imagen)"""
+    name = row.get("name") or ""
+    if not isinstance(name, str):
+        raise ValueError("el nombre debe ser texto")
+    name = name.strip()
+    if not name:
+        raise ValueError("el nombre es obligatorio")
+    if "price" not in row:
+        raise ValueError("precio, stock, descuento o fecha inválidos")
+    values = {"name": name, "description": None, "stock": 0, "discount": 0.0, "discount_expiration": None}
+    values.update(_product_values(row))
+
+    categories = row.get("categories") or []
+    if isinstance(categories, str):
+        categories = categories.split("|")
+    if not isinstance(categories, list) or not all(isinstance(category, str) for category in categories):
+        raise ValueError("categories debe ser texto separado por | o una lista de textos")
+    categories = [category.strip() for category in categories if category and category.strip()]
+    image_url = row.get("image_url") or ""
+    if not isinstance(image_url, str):
+        raise ValueError("image_url debe ser texto")
+    image_url = image_url.strip() or None
+    if image_url and (not image_url.startswith(("http://", "https://")) or len(image_url) > 255):
+        raise ValueError("image_url debe ser una URL http(s) de hasta 255 caracteres")
+    return values, categories, image_url
+
+
+def _import_chunk(chunk, errors):
+    parsed = []
+    for line_no, row in chunk:
+        try:
+            if isinstance(row, str):
+                raise ValueError(row)
+            parsed.append((line_no,) + _parse_row(row))
+        # Una fila con tipos inesperados se informa igual que una mal formada
+        except (TypeError, ValueError) as e:
+            errors.append({"line": line_no, "error": str(e)})
+
+    # Una consulta por lote para las categorías y otra para los nombres ya usados
+    names = {category for _, _, categories, _ in parsed for category in categories}
+    category_ids = dict(db.session.query(Category.name, Category.id).filter(Category.name.in_(names))) if names else {}
+    product_names = [values["name"] for _, values, _, _ in parsed]
+    taken = {name for name, in db.session.query(Product.name).filter(Product.name.in_(product_names))} if product_names else set()
+
+    valid = []
+    for line_no, values, categories, image_url in parsed:
+        missing = [category for category in categories if category not in category_ids]
+        if missing:
+            errors.append({"line": line_no, "error": f"categorías desconocidas: {', '.join(missing)}"})
+        elif values["name"] in taken:
+            errors.append({"line": line_no, "error": f"ya existe un producto llamado {values['name']}"})
+        else:
+            taken.add(values["name"])
+            values["img_status"] = "pending" if image_url else "ready"
+            valid.append((values, categories, image_url))
+    if not valid:
+        return 0
+
+    mappings = [values for values, _, _ in valid]
+    # return_defaults trae los ids generados para poder insertar las relaciones
+    db.session.bulk_insert_mappings(Product, mappings, return_defaults=True)
+    links = [{"product_id": values["id"], "category_id": category_ids[category]}
+             for values, categories, _ in valid for category in set(categories)]
+    if links:
+        db.session.execute(product_category.insert(), links)
+    jobs = [{"action": "fetch", "product_id": values["id"], "payload": image_url, "folder": "products"}
+            for values, _, image_url in valid if image_url]
+    if jobs:
+        db.session.bulk_insert_mappings(ImageJob, jobs)
+    db.session.commit()
+    return len(valid)
+
+
+def import_products(rows, chunk_size=IMPORT_CHUNK):
+    """Crea productos desde un iterable de (línea, fila), confirmando un lote a la vez.
+
+    Las filas inválidas no detienen la carga: se informan con su número de línea.
+    Las imágenes por URL quedan en image_jobs y las descarga el worker.
+    """
+    imported, errors, chunk = 0, [], []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            imported += _import_chunk(chunk, errors)
+            chunk = []
+    if chunk:
+        imported += _import_chunk(chunk, errors)
+    # Cada lote anota primero las filas mal formadas y después las que chocan con la BD
+    errors.sort(key=lambda error: error["line"])
+    return {"imported": imported, "failed": len(errors), "errors": errors[:MAX_REPORTED_ERRORS]}
+
+
+def _catalog_row(product):
+    return {
+        "name": product.name,
+        "description": product.description,
+        "price": product.price,
+        "stock": product.stock,
+        "discount": product.discount,
+        "discount_expiration": product.discount_expiration.isoformat() if product.discount_expiration else None,
+        "categories": sorted(category.name for category in product.categories),
+        "image_url": product.img,
+    }
+
+
+def export_products(fmt):
+    """Exporta el catálogo por lotes con las mismas columnas que acepta la importación.
+
+    El orden es fijo (primera categoría por nombre, luego id) para que dos exportaciones
+    del mismo catálogo sean idénticas; los productos sin categoría van primero.
+    """
+    first_category = select(func.coalesce(func.min(Category.name), ""))\
+        .join(product_category, product_category.c.category_id == Category.id)\
+        .where(product_category.c.product_id == Product.id)\
+        .scalar_subquery()
+    products = Product.query.options(selectinload(Product.categories))\
+                            .order_by(first_category, Product.id).yield_per(IMPORT_CHUNK)
+    if fmt == "ndjson":
+        for product in products:
+            yield json.dumps(_catalog_row(product), ensure_ascii=False) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CATALOG_COLUMNS)
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writeheader()
+    yield flush()
+    for product in products:
+        row = _catalog_row(product)
+        row["categories"] = "|".join(row["categories"])
+        writer.writerow(row)
+        yield flush()
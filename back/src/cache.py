@@ -0,0 +1,178 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, request
+from sqlalchemy import event
+from models import db, Product, Category, Coupon
+
+# Qué cachés quedan obsoletas al escribir cada modelo (el producto incluye sus categorías)
+INVALIDATES = {
+    Product: ("products",),
+    Category: ("categories", "products"),
+    Coupon: ("coupons",),
+}
+
+
+class MemoryCache:
+    """Caché en memoria del proceso con TTL y expulsión LRU.
+
+    Cada worker tiene la suya: la invalidación solo llega al proceso que hizo la
+    escritura y en el resto el TTL limita cuánto tiempo se sirve una respuesta vieja.
+    """
+
+    def __init__(self, max_entries=1024, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, namespace):
+        return self._generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        # Las claves viejas quedan inalcanzables y salen por LRU o TTL
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+class RedisCache:
+    """Misma interfaz sobre cualquier cliente compatible con Redis (get/setex/incr).
+
+    Redis se encarga del TTL y de la expulsión LRU (maxmemory-policy allkeys-lru) y la
+    invalidación es compartida por todos los workers.
+    """
+
+    def __init__(self, client, default_ttl=300, prefix="insomnia:"):
+        self.client = client
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.setex(self.prefix + key, int(ttl or self.default_ttl), json.dumps(value))
+
+    def generation(self, namespace):
+        return int(self.client.get(f"{self.prefix}gen:{namespace}") or 0)
+
+    def bump(self, namespace):
+        self.client.incr(f"{self.prefix}gen:{namespace}")
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+class CacheProxy:
+    """Permite importar `cache` en los módulos antes de que init_cache elija el backend"""
+
+    def __init__(self):
+        self.backend = MemoryCache()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+cache = CacheProxy()
+
+
+def invalidate(*namespaces):
+    for namespace in namespaces:
+        cache.bump(namespace)
+
+
+def _track_writes(session, flush_context):
+    pending = session.info.setdefault("cache_invalidate", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        pending.update(INVALIDATES.get(type(obj), ()))
+
+
+def _flush_invalidations(session):
+    invalidate(*session.info.pop("cache_invalidate", ()))
+
+
+def _discard_invalidations(session):
+    session.info.pop("cache_invalidate", None)
+
+
+def init_cache(app, client=None):
+    """Elige el backend según CACHE_URL (redis://...) o usa el cliente recibido"""
+    ttl = app.config.get("CACHE_TTL", 300)
+    url = app.config.get("CACHE_URL")
+    if client is None and url:
+        import redis  # dependencia opcional, solo si se configura CACHE_URL
+        client = redis.Redis.from_url(url)
+    if client is not None:
+        cache.backend = RedisCache(client, default_ttl=ttl)
+    else:
+        cache.backend = MemoryCache(app.config.get("CACHE_MAX_ENTRIES", 1024), ttl)
+
+    if not event.contains(db.session, "after_flush", _track_writes):
+        event.listen(db.session, "after_flush", _track_writes)
+        event.listen(db.session, "after_commit", _flush_invalidations)
+        event.listen(db.session, "after_rollback", _discard_invalidations)
+
+
+def cached_response(namespace):
+    """Cachea las respuestas 200 de una vista pública con ETag fuerte.
+
+    Con la respuesta en caché, un If-None-Match que coincide devuelve 304 sin tocar la BD.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            key = f"{namespace}:{cache.generation(namespace)}:{request.full_path}"
+            entry = cache.get(key)
+            if entry is None:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                entry = {
+                    "body": body.decode(),
+                    "etag": hashlib.sha256(body).hexdigest(),
+                    "mimetype": response.mimetype,
+                }
+                # La vista puede acortar el TTL (p. ej. hasta que vence un descuento)
+                ttl = g.pop("cache_ttl", None)
+                cache.set(key, entry, min(ttl, cache.default_ttl) if ttl else None)
+
+            if request.if_none_match.contains(entry["etag"]):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.response_class(entry["body"], mimetype=entry["mimetype"])
+            response.set_etag(entry["etag"])
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,105 @@
+from datetime import datetime
+from flask import g
+from sqlalchemy import or_, tuple_
+from models import Product, product_category
+from pricing import PriceBook, utc_now
+from serializers import categories_by_product, serialize_product
+
+# Orden -> (columna, descendente, conversión del valor guardado en el cursor)
+# Cada orden usa el id como desempate y tiene su índice compuesto (columna, id)
+PRODUCT_SORTS = {
+    "id": (Product.id, False, int),
+    "newest": (Product.created_at, True, datetime.fromisoformat),
+    "price_asc": (Product.price, False, float),
+    "price_desc": (Product.price, True, float),
+    "name": (Product.name, False, str),
+    "rating": (Product.rating_avg, True, float),
+}
+
+
+def parse_bool(value):
+    """"true"/"false" (sin importar mayúsculas); cualquier otro valor es un filtro inválido"""
+    if value is None:
+        return None
+    value = value.lower()
+    if value not in ("true", "false"):
+        raise ValueError(f"Se esperaba true o false: {value}")
+    return value == "true"
+
+
+def on_sale_clause(now):
+    return (Product.discount > 0) & or_(Product.discount_expiration.is_(None),
+                                        Product.discount_expiration > now)
+
+
+def filter_products(query, args):
+    """Aplica los filtros del catálogo recibidos por query string.
+
+    Lanza ValueError si algún parámetro tiene un formato inválido.
+    """
+    category_id = args.get("category", type=int)
+    if category_id is not None:
+        query = query.join(product_category, product_category.c.product_id == Product.id)\
+                     .filter(product_category.c.category_id == category_id)
+
+    on_sale = parse_bool(args.get("on_sale"))
+    if on_sale is not None:
+        clause = on_sale_clause(utc_now())
+        query = query.filter(clause if on_sale else ~clause)
+
+    in_stock = parse_bool(args.get("in_stock"))
+    if in_stock is not None:
+        query = query.filter(Product.stock > 0 if in_stock else or_(Product.stock.is_(None), Product.stock <= 0))
+
+    min_rating = args.get("min_rating")
+    if min_rating is not None:
+        query = query.filter(Product.rating_avg >= float(min_rating))
+
+    # El rango filtra por precio de lista, que es lo que está indexado
+    for name, compare in (("min_price", Product.price.__ge__), ("max_price", Product.price.__le__)):
+        value = args.get(name)
+        if value is not None:
+            query = query.filter(compare(float(value)))
+    return query
+
+
+def sort_products(query, sort, last):
+    """Ordena la consulta y la posiciona después del cursor (valor, id)"""
+    column, descending, parse = PRODUCT_SORTS[sort]
+    if column is Product.id:
+        if last:
+            query = query.filter(Product.id > int(last[0]))
+        return query.order_by(Product.id)
+
+    if last:
+        key = tuple_(column, Product.id)
+        after = (parse(last[0]), int(last[1]))
+        query = query.filter(key < after if descending else key > after)
+    if descending:
+        return query.order_by(column.desc(), Product.id.desc())
+    return query.order_by(column, Product.id)
+
+
+def product_cursor(sort):
+    column = PRODUCT_SORTS[sort][0]
+    if column is Product.id:
+        return lambda product: (product.id,)
+
+    def values(product):
+        value = getattr(product, column.key)
+        return (value.isoformat() if isinstance(value, datetime) else value, product.id)
+    return values
+
+
+def serialize_products(products):
+    """Serializa filas de product_rows() con un único cálculo de precios.
+
+    Las categorías de todas las filas se leen en una sola consulta. Deja en
+    g.cache_ttl los segundos hasta que vence el próximo descuento, para que la caché
+    no guarde la página más allá de ese momento.
+    """
+    prices = PriceBook(products)
+    g.cache_ttl = prices.seconds_until_change()
+    categories = categories_by_product([product.id for product in products])
+    return [serialize_product(product, prices[product.id], categories.get(product.id, []))
+            for product in products]
@@ -0,0 +1,76 @@
+from collections import defaultdict
+from models import db, Product, Order, OrderDetail
+from pricing import PriceBook
+from coupons import check_coupon, redeem
+from inventory import InventoryError, reserve
+
+
+class CheckoutError(Exception):
+    """Error de la compra que se devuelve tal cual al cliente"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def parse_items(items):
+    """Agrupa los items por producto: {product_id: cantidad}"""
+    if not isinstance(items, list) or not items:
+        raise CheckoutError("No hay productos en la compra")
+    quantities = defaultdict(int)
+    for item in items:
+        try:
+            product_id = int(item['product_id'])
+            quantity = int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise CheckoutError("Producto o cantidad inválidos")
+        if quantity <= 0:
+            raise CheckoutError(f"Cantidad inválida para el producto {product_id}")
+        quantities[product_id] += quantity
+    return dict(quantities)
+
+
+def place_order(client_id, shipping_address, quantities, coupon_code=None):
+    """Crea la orden, sus detalles y reserva el stock en una sola transacción.
+
+    La reserva es un UPDATE condicional (stock >= cantidad) para todos los productos,
+    atómico aunque dos compras lleguen a la vez, y queda anotada en el libro de
+    inventario con el id de la orden. No hace commit: la ruta confirma o deshace todo junto.
+    """
+    # Una consulta para todos los productos; FOR UPDATE bloquea las filas en PostgreSQL/MySQL
+    products = Product.query.filter(Product.id.in_(quantities))\
+                            .order_by(Product.id).with_for_update().all()
+    by_id = {product.id: product for product in products}
+    for product_id, quantity in quantities.items():
+        product = by_id.get(product_id)
+        if not product or (product.stock or 0) < quantity:
+            raise CheckoutError(f"Producto {product_id} no disponible")
+
+    # El cupón se valida en memoria antes de tocar el stock y se canjea en la misma transacción
+    coupon = check_coupon(coupon_code, client_id) if coupon_code else None
+
+    prices = PriceBook(products)
+    order = Order(
+        client_id=client_id,
+        total=0,
+        shipping_address=shipping_address,
+        coupon_id=coupon.id if coupon else None,
+        status='pending',
+        payment_method='transferencia'
+    )
+    # El flush agrupa los detalles en un INSERT de varias filas
+    order.details = [
+        OrderDetail(product_id=product_id, quantity=quantity, unit_price=prices[product_id].current)
+        for product_id, quantity in quantities.items()
+    ]
+    if coupon:
+        redeem(coupon)
+    order.calculate_total(coupon)
+    db.session.add(order)
+    db.session.flush()  # La reserva necesita el id de la orden
+    try:
+        reserve(order.id, quantities)
+    except InventoryError:
+        raise CheckoutError("No hay stock suficiente para completar la compra", 409)
+    return order
@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import namedtuple
+from sqlalchemy import or_, update
+from models import db, Coupon
+from pricing import utc_now, as_utc, coupon_discount
+from cache import cache
+
+class CouponInfo(namedtuple("CouponInfo", "id code discount discount_type valid_from valid_to client_id")):
+    """Copia de solo lectura de un cupón, con la misma interfaz que usa Order.calculate_total"""
+
+    def is_valid(self, now=None):
+        now = now or utc_now()
+        return self.valid_from <= now < self.valid_to
+
+
+class CouponError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class ActiveCoupons:
+    """Cupones vigentes o por venir, en memoria y por código.
+
+    Se recargan todos juntos con una consulta cuando vence el TTL o cuando cambia algún
+    cupón (generación "coupons" de cache.py). Los usos no se guardan aquí: se controlan
+    con el UPDATE atómico de redeem; solo se recuerda qué códigos ya se agotaron.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._coupons = {}
+        self._exhausted = set()
+        self._loaded_at = None
+        self._generation = None
+
+    def _stale(self):
+        return (self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+                or self._generation != cache.generation("coupons"))
+
+    def _load(self):
+        generation = cache.generation("coupons")
+        rows = db.session.query(Coupon.id, Coupon.code, Coupon.discount, Coupon.discount_type,
+                                Coupon.valid_from, Coupon.valid_to, Coupon.client_id,
+                                Coupon.max_uses, Coupon.current_uses)\
+                         .filter(Coupon.valid_to > utc_now()).all()
+        coupons, exhausted = {}, set()
+        for row in rows:
+            coupons[row.code] = CouponInfo(row.id, row.code, row.discount, row.discount_type,
+                                           as_utc(row.valid_from), as_utc(row.valid_to), row.client_id)
+            if row.max_uses is not None and (row.current_uses or 0) >= row.max_uses:
+                exhausted.add(row.code)
+        self._coupons, self._exhausted = coupons, exhausted
+        self._loaded_at = time.monotonic()
+        self._generation = generation
+
+    def get(self, code):
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    self._load()
+        return self._coupons.get(code)
+
+    def is_exhausted(self, code):
+        return code in self._exhausted
+
+    def mark_exhausted(self, code):
+        self._exhausted.add(code)
+
+    def clear(self):
+        with self._lock:
+            self._loaded_at = None
+
+
+active_coupons = ActiveCoupons()
+
+
+def check_coupon(code, client_id=None, now=None):
+    """Valida el cupón contra la caché en memoria, sin tocar la BD si está cargada"""
+    coupon = active_coupons.get(code) if code else None
+    if coupon is None:
+        raise CouponError("Cupón no encontrado", 404)
+    if not coupon.is_valid(now):
+        raise CouponError("El cupón no está vigente")
+    if coupon.client_id is not None and str(coupon.client_id) != str(client_id):
+        raise CouponError("Este cupón no está disponible para tu cuenta", 403)
+    if active_coupons.is_exhausted(code):
+        raise CouponError("El cupón ya no tiene usos disponibles", 409)
+    return coupon
+
+
+def redeem(coupon):
+    """Suma un uso con un UPDATE condicional; nunca pasa de max_uses aunque haya compras en paralelo.
+
+    No hace commit: va en la transacción de la orden.
+    """
+    now = utc_now()
+    result = db.session.execute(
+        update(Coupon)
+        .where(Coupon.id == coupon.id,
+               or_(Coupon.max_uses.is_(None), Coupon.current_uses < Coupon.max_uses),
+               Coupon.valid_from <= now, Coupon.valid_to > now)
+        .values(current_uses=Coupon.current_uses + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        active_coupons.mark_exhausted(coupon.code)
+        raise CouponError("El cupón ya no tiene usos disponibles", 409)
+
+
+def estimate(coupon, subtotal):
+    return coupon_discount(coupon.discount_type, coupon.discount, subtotal)
@@ -1,16 +1,62 @@
 from functools import wraps
-from flask import jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Client
+from flask import jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity, create_access_token
+from models import db, Client
+from cache import cache, RedisCache
+
+
+def create_client_token(client):
+    """Token con el rol incluido, para no consultar la BD en cada ruta de administración"""
+    return create_access_token(
+        identity=str(client.id),
+        additional_claims={"admin": bool(client.admin), "rv": client.role_version or 0}
+    )
+
+
+def role_ttl():
+    """Segundos que se guarda la versión de rol: ROLE_CACHE_TTL en la caché compartida
+    (CACHE_URL) y ROLE_LOCAL_CACHE_TTL en la caché en memoria de cada worker"""
+    if isinstance(cache.backend, RedisCache):
+        return current_app.config.get("ROLE_CACHE_TTL", 60)
+    return current_app.config.get("ROLE_LOCAL_CACHE_TTL", 5)
+
+
+def role_version(client_id):
+    """Versión de rol vigente del cliente, sin ir a la BD mientras esté en caché.
+
+    Con la caché compartida el cambio de rol se publica a todos los workers. Con la caché
+    en memoria solo lo ve al tiro el worker que lo hizo: en los demás un admin degradado
+    sigue entrando hasta ROLE_LOCAL_CACHE_TTL segundos (0 consulta la BD en cada petición).
+    """
+    ttl = role_ttl()
+    if not ttl:
+        return db.session.query(Client.role_version).filter(Client.id == client_id).scalar()
+    key = f"role_version:{client_id}"
+    version = cache.get(key)
+    if version is None:
+        version = db.session.query(Client.role_version).filter(Client.id == client_id).scalar()
+        if version is None:
+            return None
+        cache.set(key, version, ttl)
+    return version
+
+
+def publish_role_version(client):
+    # Se escribe en la caché al tiro para que los tokens antiguos dejen de valer
+    ttl = role_ttl()
+    if ttl:
+        cache.set(f"role_version:{client.id}", client.role_version, ttl)
+
 
 def admin_required(f):
     @wraps(f)
     @jwt_required()
     def wrapper (*args, **kwargs):
-        current_user_id =get_jwt_identity()
-        user = Client.query.get(current_user_id)
+        claims = get_jwt()
+        current_user_id = get_jwt_identity()
 
-        if not user or not user.admin:
+        # Un token emitido antes de cambiar el rol tiene una versión distinta y se rechaza
+        if not claims.get("admin") or claims.get("rv") != role_version(current_user_id):
             return jsonify ({"error":"Acceso denegado, tienes que ser administrador"}), 403
         return f(*args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -0,0 +1,116 @@
+"""Vencimiento de órdenes pendientes (transferencias que nunca se pagaron).
+
+Cada pasada cancela por lotes las órdenes 'pending' más antiguas que
+ORDER_EXPIRY_HOURS y devuelve su stock reservado, un lote por transacción. Corre en
+un hilo dentro de la app cada ORDER_SWEEP_INTERVAL segundos, o en worker.py con
+ORDER_SWEEP_INTERVAL=0 en la app. Varios procesos pueden barrer a la vez: la
+cancelación es un UPDATE condicional y un lote que otro proceso ya tomó se descarta.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import update
+from models import db, Order
+from pricing import utc_now
+from inventory import release_orders
+from cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+
+class OrderSweeper:
+    def __init__(self):
+        self.app = None
+
+    def init_app(self, app, start=True):
+        self.app = app
+        app.extensions['order_sweeper'] = self
+        if start:
+            self.start()
+
+    def start(self):
+        if self.app.config.get('ORDER_SWEEP_INTERVAL', 0) > 0:
+            threading.Thread(target=self.sweep_forever, name='order-sweeper', daemon=True).start()
+
+    def cutoff(self):
+        return utc_now() - timedelta(hours=self.app.config.get('ORDER_EXPIRY_HOURS', 48))
+
+    def expire_batch(self, cutoff, batch_size):
+        """Cancela un lote y libera su stock en una transacción; devuelve cuántas canceló.
+
+        La consulta usa el índice (status, date); en PostgreSQL/MySQL SKIP LOCKED deja
+        las filas que otro barrido tiene tomadas.
+        """
+        rows = db.session.query(Order.id)\
+                         .filter(Order.status == 'pending', Order.date < cutoff)\
+                         .order_by(Order.date).limit(batch_size)\
+                         .with_for_update(skip_locked=True).all()
+        ids = [order_id for order_id, in rows]
+        if not ids:
+            return 0
+        result = db.session.execute(
+            update(Order)
+            .where(Order.id.in_(ids), Order.status == 'pending')
+            .values(status='cancelled')
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(ids):
+            # Otro proceso (o un pago) cambió alguna en medio: se vuelve a leer el lote
+            db.session.rollback()
+            return -1
+        release_orders(ids, note='orden vencida')
+        db.session.commit()
+        return len(ids)
+
+    def sweep(self, batch_size=None, max_batches=None):
+        """Cancela lotes hasta que no queden órdenes vencidas; devuelve el total"""
+        batch_size = batch_size or self.app.config.get('ORDER_SWEEP_BATCH', 200)
+        cutoff = self.cutoff()
+        total, batches = 0, 0
+        try:
+            while max_batches is None or batches < max_batches:
+                expired = self.expire_batch(cutoff, batch_size)
+                if expired == 0:
+                    break
+                total += max(expired, 0)
+                batches += 1
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            if total:
+                invalidate("products")
+        return total
+
+    def sweep_once(self):
+        with self.app.app_context():
+            try:
+                expired = self.sweep()
+            finally:
+                db.session.remove()
+        if expired:
+            logger.info("%s órdenes pendientes vencidas canceladas", expired)
+        return expired
+
+    def sweep_forever(self):
+        while True:
+            time.sleep(self.app.config['ORDER_SWEEP_INTERVAL'])
+            try:
+                self.sweep_once()
+            except Exception:
+                logger.exception("Error cancelando órdenes vencidas")
+
+
+order_sweeper = OrderSweeper()
+
+
+@click.command('orders-expire')
+@click.option('--batch-size', type=int, help='Órdenes canceladas por transacción')
+@with_appcontext
+def expire_command(batch_size):
+    """Cancela las órdenes pendientes vencidas y libera su stock"""
+    total = order_sweeper.sweep(batch_size)
+    click.echo(f"{total} órdenes vencidas canceladas")
@@ -0,0 +1,27 @@
+"""Configuración de gunicorn, ajustable por variables de entorno.
+
+Cada worker es un proceso con su propia app, caché en memoria y pool de conexiones,
+así que la BD debe aceptar WEB_WORKERS * (DB_POOL_SIZE + DB_MAX_OVERFLOW) conexiones.
+Los hilos (gthread) atienden las esperas de BD y de red; conviene que DB_POOL_SIZE
+sea al menos WEB_THREADS para que ningún hilo espere una conexión. Detrás de nginx
+o de un balanceador, PROXY_FIX_X_FOR (cantidad de proxies) hace que el límite de
+login por IP use la IP del cliente y no la del proxy.
+"""
+import multiprocessing
+import os
+
+os.environ.setdefault("APP_ENV", "production")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", 4))
+timeout = int(os.getenv("WEB_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+# Reinicia cada worker cada cierto número de peticiones para acotar el crecimiento de memoria
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", 5000))
+max_requests_jitter = 500
+accesslog = "-"
+# Sin preload: la app (y sus hilos de imágenes y conexiones) se crea en cada worker después del fork
+preload_app = False
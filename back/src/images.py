@@ -0,0 +1,80 @@
+import os
+
+# Firmas de los formatos aceptados (los primeros bytes del archivo)
+MAGIC_NUMBERS = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+)
+
+FORMATS = {
+    # formato: (nombre en Pillow, extensión, opciones de guardado)
+    "avif": ("AVIF", "avif", {"quality": 55}),
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+DEFAULT_WIDTHS = (320, 640, 1024)
+
+
+def sniff_image_type(stream):
+    """Tipo real de la imagen según sus primeros bytes, sin leer el resto del archivo"""
+    position = stream.tell()
+    header = stream.read(12)
+    stream.seek(position)
+    for signature, kind in MAGIC_NUMBERS:
+        if header.startswith(signature):
+            return kind
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def available_formats(wanted):
+    from PIL import features
+    # AVIF depende de cómo se compiló Pillow; JPEG siempre queda como respaldo
+    return [fmt for fmt in wanted if fmt == "jpeg" or features.check(fmt)]
+
+
+def _flatten(image):
+    from PIL import Image
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def build_variants(path, widths=DEFAULT_WIDTHS, formats=("avif", "webp", "jpeg")):
+    """Genera las versiones redimensionadas de la imagen junto al archivo original.
+
+    Devuelve [(formato, ancho, ruta)]. Las imágenes se guardan sin EXIF ni otros
+    metadatos y nunca se agrandan por sobre el ancho original.
+    """
+    from PIL import Image, ImageOps
+
+    base = os.path.splitext(path)[0]
+    formats = available_formats(formats)
+    variants = []
+    with Image.open(path) as original:
+        largest = max(widths)
+        # En JPEG decodifica directamente a una escala reducida, sin cargar la foto completa
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or image.mode == "P" else "RGB")
+
+        for width in sorted({min(width, image.width) for width in widths}):
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                pil_format, extension, options = FORMATS[fmt]
+                frame = _flatten(resized) if fmt == "jpeg" else resized
+                output = f"{base}-{width}.{extension}"
+                frame.save(output, pil_format, **options)
+                variants.append((fmt, width, output))
+    return variants
+
+
+def srcset(urls_by_width):
+    """{"320": url, ...} -> "url 320w, ..." """
+    return ", ".join(f"{url} {width}w" for width, url in sorted(urls_by_width.items(), key=lambda item: int(item[0])))
@@ -0,0 +1,202 @@
+"""Inventario como libro de movimientos (stock_movements) con saldos en Product.
+
+Cada cambio de stock agrega filas al libro y actualiza Product.stock (disponible) y
+Product.reserved (apartado por órdenes pendientes) con un UPDATE condicional en la
+misma transacción, así que el saldo siempre es la suma del libro. Las escrituras
+que fijan el stock directamente (carga masiva) se concilian con reconcile().
+"""
+from collections import defaultdict
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import case, func, insert, or_, select, tuple_, update
+from models import db, Product, OrderDetail, StockMovement
+from pricing import utc_now
+
+# Efecto de una orden en cada estado sobre (stock disponible, reservado) por unidad
+ORDER_EFFECT = {
+    'pending': (-1, 1),
+    'paid': (-1, 0),
+    'shipped': (-1, 0),
+    'cancelled': (0, 0),
+}
+MANUAL_KINDS = ('restock', 'adjustment')
+
+
+class InventoryError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _update_balances(quantities, stock_sign, reserved_sign):
+    qty = case(quantities, value=Product.id)
+    values = {}
+    if stock_sign:
+        values["stock"] = Product.stock + stock_sign * qty
+    if reserved_sign:
+        values["reserved"] = Product.reserved + reserved_sign * qty
+    statement = update(Product).where(Product.id.in_(quantities))
+    if stock_sign < 0:
+        statement = statement.where(Product.stock >= qty)
+    result = db.session.execute(statement.values(**values).execution_options(synchronize_session=False))
+    if result.rowcount != len(quantities):
+        raise InventoryError("No hay stock suficiente", 409)
+
+
+def _record(lines, stock_sign, reserved_sign, kind, note=None):
+    """Anota en el libro las líneas (product_id, order_id, unidades) con un INSERT de varias filas"""
+    now = utc_now()
+    db.session.execute(insert(StockMovement), [
+        {"product_id": product_id, "order_id": order_id, "kind": kind, "note": note, "created_at": now,
+         "stock_delta": stock_sign * quantity, "reserved_delta": reserved_sign * quantity}
+        for product_id, order_id, quantity in lines
+    ])
+
+
+def move_stock(quantities, stock_sign, reserved_sign, kind, order_id=None, note=None):
+    """Aplica el mismo movimiento a varios productos: {product_id: unidades}.
+
+    Un solo UPDATE para todos; si el movimiento quita stock disponible, el WHERE
+    stock >= unidades lo hace atómico. Lanza InventoryError si a algún producto no le
+    alcanzó, y la ruta debe deshacer la transacción. No hace commit.
+    """
+    if not stock_sign and not reserved_sign:
+        return
+    _update_balances(quantities, stock_sign, reserved_sign)
+    _record([(product_id, order_id, quantity) for product_id, quantity in quantities.items()],
+            stock_sign, reserved_sign, kind, note)
+
+
+def reserve(order_id, quantities):
+    move_stock(quantities, -1, 1, 'reservation', order_id)
+
+
+def order_quantities(order):
+    quantities = defaultdict(int)
+    for detail in order.details:
+        quantities[detail.product_id] += detail.quantity
+    return dict(quantities)
+
+
+def apply_status_change(order, old_status, new_status):
+    """Mueve el stock de la orden según el cambio de estado; devuelve si cambió algo.
+
+    pending -> paid registra la venta de lo reservado, cancelar devuelve las unidades
+    al disponible y reactivar una orden cancelada vuelve a reservarlas (409 si ya no
+    hay stock).
+    """
+    old = ORDER_EFFECT.get(old_status, ORDER_EFFECT['pending'])
+    new = ORDER_EFFECT[new_status]
+    stock_sign, reserved_sign = new[0] - old[0], new[1] - old[1]
+    if not stock_sign and not reserved_sign:
+        return False
+    if stock_sign < 0:
+        kind = 'reservation'
+    elif stock_sign > 0:
+        kind = 'release'
+    else:
+        kind = 'sale'
+    move_stock(order_quantities(order), stock_sign, reserved_sign, kind, order.id)
+    return True
+
+
+def release_orders(order_ids, note=None):
+    """Devuelve al disponible lo reservado por varias órdenes pendientes.
+
+    Un UPDATE con las cantidades sumadas por producto y una fila del libro por cada
+    línea de cada orden. No hace commit.
+    """
+    lines = db.session.query(OrderDetail.product_id, OrderDetail.order_id, OrderDetail.quantity)\
+                      .filter(OrderDetail.order_id.in_(order_ids)).all()
+    if not lines:
+        return
+    quantities = defaultdict(int)
+    for product_id, _, quantity in lines:
+        quantities[product_id] += quantity
+    _update_balances(dict(quantities), 1, -1)
+    _record(lines, 1, -1, 'release', note)
+
+
+def adjust(product_id, quantity, kind, note=None):
+    """Reposición (solo suma) o ajuste manual (suma o resta) del stock de un producto"""
+    if kind not in MANUAL_KINDS:
+        raise InventoryError(f"Tipo inválido, usa {' o '.join(MANUAL_KINDS)}")
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity == 0:
+        raise InventoryError("La cantidad debe ser un entero distinto de cero")
+    if kind == 'restock' and quantity < 0:
+        raise InventoryError("Una reposición no puede restar stock")
+    move_stock({product_id: abs(quantity)}, 1 if quantity > 0 else -1, 0, kind, note=note)
+
+
+def low_stock_query(default_threshold=None, after=None):
+    """Productos con disponible bajo su umbral, evaluado en una sola consulta.
+
+    Ordenados por (disponible, id), desde el cursor `after` si viene.
+    """
+    if default_threshold is None:
+        default_threshold = current_app.config.get("LOW_STOCK_THRESHOLD", 5)
+    threshold = func.coalesce(Product.low_stock_threshold, default_threshold)
+    available = func.coalesce(Product.stock, 0)
+    query = db.session.query(Product.id, Product.name, available.label("stock"), Product.reserved,
+                             threshold.label("threshold"))\
+                      .filter(available <= threshold)
+    if after:
+        query = query.filter(tuple_(available, Product.id) > (int(after[0]), int(after[1])))
+    return query.order_by(available, Product.id)
+
+
+def _drift():
+    ledger = select(StockMovement.product_id,
+                    func.sum(StockMovement.stock_delta).label("stock"),
+                    func.sum(StockMovement.reserved_delta).label("reserved"))\
+        .group_by(StockMovement.product_id).subquery()
+    stock_drift = func.coalesce(Product.stock, 0) - func.coalesce(ledger.c.stock, 0)
+    reserved_drift = Product.reserved - func.coalesce(ledger.c.reserved, 0)
+    return db.session.query(Product.id, stock_drift, reserved_drift)\
+                     .outerjoin(ledger, ledger.c.product_id == Product.id)\
+                     .filter(or_(stock_drift != 0, reserved_drift != 0))
+
+
+def reconcile(from_ledger=False):
+    """Compara el saldo de todos los productos con la suma de su libro en una consulta.
+
+    Por defecto el saldo manda: las diferencias (p. ej. de una carga masiva) se anotan
+    como ajustes. Con from_ledger=True se corrigen los saldos desde el libro. Devuelve
+    cuántos productos tenían diferencias. No hace commit.
+    """
+    drift = _drift().all()
+    if not drift:
+        return 0
+    if from_ledger:
+        def totals(column):
+            return select(func.coalesce(func.sum(column), 0))\
+                .where(StockMovement.product_id == Product.id).scalar_subquery()
+        db.session.execute(
+            update(Product).where(Product.id.in_([row[0] for row in drift]))
+            .values(stock=totals(StockMovement.stock_delta), reserved=totals(StockMovement.reserved_delta))
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        now = utc_now()
+        db.session.execute(insert(StockMovement), [
+            {"product_id": product_id, "order_id": None, "kind": "adjustment", "note": "conciliación",
+             "created_at": now, "stock_delta": stock_delta, "reserved_delta": reserved_delta}
+            for product_id, stock_delta, reserved_delta in drift
+        ])
+    return len(drift)
+
+
+@click.command('inventory-reconcile')
+@click.option('--from-ledger', is_flag=True, help='Corrige los saldos desde el libro en vez de anotar ajustes')
+@with_appcontext
+def reconcile_command(from_ledger):
+    """Concilia el stock con el libro de movimientos y lista los productos bajo su umbral"""
+    fixed = reconcile(from_ledger)
+    db.session.commit()
+    click.echo(f"{fixed} productos con diferencias corregidos")
+    low = low_stock_query().all()
+    for product_id, name, stock, reserved, threshold in low:
+        click.echo(f"  {product_id} {name}: {stock} disponibles, {reserved} reservados (umbral {threshold})")
+    click.echo(f"{len(low)} productos con stock bajo")
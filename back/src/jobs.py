@@ -0,0 +1,320 @@
+import http.client
+import ipaddress
+import logging
+import os
+import socket
+import ssl
+import threading
+import time
+import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from sqlalchemy import and_, or_, update
+from models import db, ImageJob
+from pricing import utc_now
+from config import obtener_public_id
+from uploader import create_uploader
+from images import build_variants, sniff_image_type, DEFAULT_WIDTHS
+
+logger = logging.getLogger(__name__)
+
+MAX_REDIRECTS = 3
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def public_address(host, port):
+    """Resuelve el host y devuelve una de sus IP si todas son públicas.
+
+    Las URLs de imágenes las escribe un admin (importación masiva): sin esto el worker
+    podría leer la metadata de la nube o servicios internos (SSRF).
+    """
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        raise ValueError(f"No se pudo resolver {host}")
+    for info in infos:
+        ip = ipaddress.ip_address(info[4][0].split("%")[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError("La URL apunta a una dirección interna")
+    return infos[0][4][0]
+
+
+class PinnedHTTPConnection(http.client.HTTPConnection):
+    """Se conecta a la IP ya validada, no vuelve a resolver el host (DNS rebinding)"""
+
+    def __init__(self, host, port, address, timeout):
+        super().__init__(host, port, timeout=timeout)
+        self.address = address
+
+    def connect(self):
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+
+
+class PinnedHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, host, port, address, timeout):
+        self.tls = ssl.create_default_context()
+        super().__init__(host, port, timeout=timeout, context=self.tls)
+        self.address = address
+
+    def connect(self):
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        self.sock = self.tls.wrap_socket(sock, server_hostname=self.host)
+
+
+def open_public_url(url, timeout=30):
+    """GET a una URL http(s) pública siguiendo hasta MAX_REDIRECTS redirecciones, cada una validada.
+
+    Devuelve (conexión, respuesta); quien llama cierra la conexión.
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError("Solo se descargan imágenes por http(s)")
+        https = parts.scheme == "https"
+        port = parts.port or (443 if https else 80)
+        address = public_address(parts.hostname, port)
+        connection = (PinnedHTTPSConnection if https else PinnedHTTPConnection)(parts.hostname, port, address, timeout)
+        try:
+            connection.request("GET", (parts.path or "/") + (f"?{parts.query}" if parts.query else ""),
+                               headers={"Accept": "image/*"})
+            response = connection.getresponse()
+        except Exception:
+            connection.close()
+            raise
+        if response.status in REDIRECT_STATUSES and response.getheader("Location"):
+            url = urllib.parse.urljoin(url, response.getheader("Location"))
+            connection.close()
+            continue
+        if response.status != 200:
+            connection.close()
+            raise ValueError(f"La descarga respondió {response.status}")
+        return connection, response
+    raise ValueError("Demasiadas redirecciones")
+
+
+class ImageJobRunner:
+    """Cola de trabajos de imágenes guardada en la tabla image_jobs.
+
+    Las rutas solo guardan el archivo en disco y crean el trabajo; la subida la hace un
+    pool de hilos dentro de la app (IMAGE_JOB_WORKERS) o un proceso aparte (worker.py).
+    Un trabajo se toma con un UPDATE condicional, así que varios workers o procesos
+    pueden revisar la misma tabla sin procesarlo dos veces.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.uploader = None
+        self.executor = None
+
+    def init_app(self, app, start=True):
+        self.app = app
+        self.uploader = create_uploader(app)
+        self.executor = None
+        app.extensions['image_jobs'] = self
+        if start:
+            self.start()
+
+    def start(self):
+        workers = self.app.config.get('IMAGE_JOB_WORKERS', 2)
+        if workers:
+            self.executor = ThreadPoolExecutor(workers, thread_name_prefix='image-jobs')
+            # Revisa periódicamente los reintentos pendientes y trabajos abandonados
+            threading.Thread(target=self.poll_forever, name='image-jobs-poller', daemon=True).start()
+
+    @property
+    def spool_dir(self):
+        directory = self.app.config.get('IMAGE_SPOOL_DIR') or os.path.join(self.app.instance_path, 'spool')
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def spool(self, file_storage):
+        """Guarda el archivo subido en disco para procesarlo fuera de la petición"""
+        extension = os.path.splitext(file_storage.filename)[1].lower()
+        path = os.path.join(self.spool_dir, uuid.uuid4().hex + extension)
+        file_storage.save(path)
+        return path
+
+    def queue_upload(self, product, path, folder="products"):
+        # Sin commit: el trabajo se confirma junto con el producto
+        product.img_status = 'pending'
+        job = ImageJob(action='upload', product=product, payload=path, folder=folder)
+        db.session.add(job)
+        return job
+
+    def queue_destroy(self, image_url):
+        public_id = obtener_public_id(image_url)
+        if not public_id:
+            return None
+        job = ImageJob(action='destroy', payload=public_id)
+        db.session.add(job)
+        return job
+
+    def submit(self, *jobs):
+        """Llamar después del commit"""
+        for job in jobs:
+            if job is not None and self.executor:
+                self.executor.submit(self.run, job.id)
+
+    def claim(self, job_id):
+        now = utc_now()
+        stale = now - timedelta(seconds=self.app.config.get('IMAGE_JOB_LOCK_TIMEOUT', 600))
+        result = db.session.execute(
+            update(ImageJob)
+            .where(ImageJob.id == job_id, self._due_clause(now, stale))
+            .values(status='running', locked_at=now, attempts=ImageJob.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    @staticmethod
+    def _due_clause(now, stale):
+        return or_(
+            and_(ImageJob.status == 'pending', ImageJob.next_attempt_at <= now),
+            and_(ImageJob.status == 'running', ImageJob.locked_at < stale)
+        )
+
+    def run(self, job_id):
+        with self.app.app_context():
+            try:
+                if not self.claim(job_id):
+                    return
+                job = db.session.get(ImageJob, job_id)
+                try:
+                    self.process(job)
+                    job.status = 'done'
+                    job.last_error = None
+                except Exception as e:
+                    db.session.rollback()
+                    job = db.session.get(ImageJob, job_id)
+                    self.retry_or_fail(job, e)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.exception("Error procesando el trabajo de imagen %s", job_id)
+            finally:
+                db.session.remove()
+
+    def process(self, job):
+        if job.action == 'destroy':
+            self.uploader.destroy(job.payload)
+            return
+
+        product = job.product
+        if product is None:  # El producto se borró antes de subir la imagen
+            self.discard_spool(job)
+            return
+        if job.action == 'fetch':
+            # Imagen por URL (importación masiva): se descarga al spool y se procesa igual
+            path = self.download(job.payload)
+            try:
+                self.publish(product, path, job.folder)
+            finally:
+                os.remove(path)
+            return
+        self.publish(product, job.payload, job.folder)
+        self.discard_spool(job)
+
+    def publish(self, product, source, folder):
+        variants = build_variants(source, self.app.config.get('IMAGE_WIDTHS', DEFAULT_WIDTHS),
+                                  self.app.config.get('IMAGE_FORMATS', ("avif", "webp", "jpeg")))
+        urls = {}
+        try:
+            for fmt, width, path in variants:
+                urls.setdefault(fmt, {})[str(width)] = self.uploader.upload(path, folder)
+        finally:
+            for _, _, path in variants:
+                os.remove(path)
+
+        for old_url in product.image_urls():
+            self.queue_destroy(old_url)
+        jpeg = urls["jpeg"]
+        product.img = jpeg[max(jpeg, key=int)]
+        product.img_variants = urls
+        product.img_status = 'ready'
+
+    def download(self, url):
+        """Descarga la imagen por partes, sin pasar de IMAGE_MAX_BYTES, solo desde IPs públicas"""
+        limit = self.app.config.get('IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+        connection, response = open_public_url(url)
+        path = os.path.join(self.spool_dir, uuid.uuid4().hex)
+        size = 0
+        try:
+            length = response.getheader("Content-Length")
+            if length and length.isdigit() and int(length) > limit:
+                raise ValueError("La imagen supera el tamaño máximo")
+            with open(path, 'wb') as output:
+                while chunk := response.read(64 * 1024):
+                    size += len(chunk)
+                    if size > limit:
+                        raise ValueError("La imagen supera el tamaño máximo")
+                    output.write(chunk)
+            with open(path, 'rb') as downloaded:
+                if not sniff_image_type(downloaded):
+                    raise ValueError("El archivo descargado no es una imagen válida")
+        except Exception:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        finally:
+            connection.close()
+        return path
+
+    def retry_or_fail(self, job, error):
+        job.last_error = str(error)[:500]
+        if job.attempts >= self.app.config.get('IMAGE_JOB_MAX_ATTEMPTS', 5):
+            job.status = 'failed'
+            if job.product is not None:
+                job.product.img_status = 'failed'
+            self.discard_spool(job)
+            logger.warning("Trabajo de imagen %s falló definitivamente: %s", job.id, error)
+            return
+        # Backoff exponencial: 5s, 10s, 20s...
+        delay = self.app.config.get('IMAGE_JOB_BACKOFF', 5) * 2 ** (job.attempts - 1)
+        job.status = 'pending'
+        job.next_attempt_at = utc_now() + timedelta(seconds=delay)
+
+    @staticmethod
+    def discard_spool(job):
+        if job.action == 'upload':
+            ImageJobRunner.discard_spooled(job.payload)
+
+    @staticmethod
+    def discard_spooled(path):
+        """Borra un archivo del spool que ningún trabajo confirmado va a procesar"""
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def due_jobs(self, limit=100):
+        now = utc_now()
+        stale = now - timedelta(seconds=self.app.config.get('IMAGE_JOB_LOCK_TIMEOUT', 600))
+        rows = db.session.query(ImageJob.id).filter(self._due_clause(now, stale))\
+                         .order_by(ImageJob.next_attempt_at).limit(limit).all()
+        return [job_id for job_id, in rows]
+
+    def poll_once(self):
+        with self.app.app_context():
+            try:
+                job_ids = self.due_jobs()
+            finally:
+                db.session.remove()
+        for job_id in job_ids:
+            if self.executor:
+                self.executor.submit(self.run, job_id)
+            else:
+                self.run(job_id)
+        return len(job_ids)
+
+    def poll_forever(self):
+        while True:
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("Error revisando la cola de imágenes")
+            time.sleep(self.app.config.get('IMAGE_JOB_POLL_INTERVAL', 5))
+
+
+image_jobs = ImageJobRunner()
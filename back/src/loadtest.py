@@ -0,0 +1,199 @@
+"""Prueba de carga del catálogo y la compra contra un servidor ya levantado.
+
+Uso reproducible (mismos datos, misma semilla, misma duración):
+
+    # 1. Datos: 500 productos "loadtest-N" con stock de sobra, en la misma BD del servidor
+    APP_ENV=production DATABASE_URL=... JWT_SECRET=... python loadtest.py --seed 500
+
+    # 2. Servidor: 2 workers de gunicorn, 4 hilos cada uno
+    APP_ENV=production WEB_WORKERS=2 WEB_THREADS=4 gunicorn -c gunicorn.conf.py wsgi:app
+
+    # 3. Carga: 16 clientes concurrentes durante 30 s por escenario
+    python loadtest.py --url http://127.0.0.1:8000 --server-workers 2 --concurrency 16 --duration 30
+
+Imprime por escenario las peticiones, errores, req/s totales, req/s por worker y
+latencias p50/p95/p99. Con --json escribe el mismo resultado en un archivo para
+comparar corridas. El cliente es solo librería estándar; conviene correrlo en otra
+máquina (o en otros núcleos) para que no compita por CPU con el servidor.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SEED_PREFIX = "loadtest-"
+
+
+def seed(count):
+    """Crea o repone los productos de prueba; se puede correr antes de cada medición"""
+    from app import create_app
+    from models import db
+    from bulk import upsert_products
+    from cache import invalidate
+    from inventory import reconcile
+
+    app = create_app(IMAGE_JOB_WORKERS=0)
+    with app.app_context():
+        rows = [{"name": f"{SEED_PREFIX}{i}", "description": "Producto de prueba de carga",
+                 "price": 1000 + i, "stock": 10 ** 9, "discount": 10 if i % 3 == 0 else 0}
+                for i in range(count)]
+        upsert_products(rows)
+        reconcile()  # El stock fijado por el upsert queda anotado en el libro, como en la carga masiva
+        db.session.commit()
+        invalidate("products")
+    print(f"{count} productos de prueba listos")
+
+
+class Client:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, headers=None):
+        status, payload, _ = self.open(method, path, body, headers)
+        return status, payload
+
+    def open(self, method, path, body=None, headers=None):
+        """Como request, pero devuelve también los encabezados de la respuesta"""
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json", **(headers or {})})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = response.read()
+                return response.status, payload, response.headers
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), e.headers
+
+    def product_ids(self):
+        ids, cursor = [], None
+        while True:
+            path = "/api/products?limit=100&in_stock=true" + (f"&cursor={cursor}" if cursor else "")
+            status, payload = self.request("GET", path)
+            if status != 200:
+                raise SystemExit(f"No se pudo leer el catálogo: HTTP {status}")
+            page = json.loads(payload)
+            ids += [product["id"] for product in page["products"] if product["name"].startswith(SEED_PREFIX)]
+            cursor = page.get("next_cursor")
+            if not cursor:
+                return ids
+
+
+def scenarios(ids):
+    """Cada escenario recibe un Random propio y devuelve (método, ruta, cuerpo)"""
+    sorts = ["id", "newest", "price_asc", "price_desc", "name"]
+    return {
+        "catalog_list": lambda rnd: ("GET", f"/api/products?limit=20&sort={rnd.choice(sorts)}", None),
+        "catalog_detail": lambda rnd: ("GET", f"/api/products/{rnd.choice(ids)}", None),
+        "checkout": lambda rnd: ("POST", "/api/orders", {
+            "shipping_address": "Av. Siempre Viva 742, Santiago",
+            "items": [{"product_id": product_id, "quantity": rnd.randint(1, 3)}
+                      for product_id in rnd.sample(ids, rnd.randint(1, 3))]
+        }),
+    }
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_scenario(client, make_request, concurrency, duration, seed_value, ok_statuses, on_response=None):
+    """Carga concurrente durante `duration` segundos.
+
+    make_request devuelve (método, ruta, cuerpo) o (método, ruta, cuerpo, headers);
+    on_response recibe los encabezados de cada respuesta (p. ej. Server-Timing).
+    """
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def user(index):
+        nonlocal errors
+        rnd = random.Random(seed_value * 1000 + index)
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            method, path, body, *headers = make_request(rnd)
+            started = time.perf_counter()
+            try:
+                status, _, response_headers = client.open(method, path, body, *headers)
+            except OSError:
+                status, response_headers = None, None
+            local.append(time.perf_counter() - started)
+            if on_response and response_headers is not None:
+                on_response(response_headers)
+            if status not in ok_statuses:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(user, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 2),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del catálogo y la compra")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--seed", type=int, metavar="N", help="Crea N productos de prueba y termina")
+    parser.add_argument("--server-workers", type=int, default=1, help="Workers de gunicorn (para req/s por worker)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="Segundos por escenario")
+    parser.add_argument("--warmup", type=float, default=3, help="Segundos de calentamiento por escenario")
+    parser.add_argument("--scenario", action="append", help="Solo estos escenarios (se puede repetir)")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--json", metavar="ARCHIVO", help="Guarda los resultados en JSON")
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.seed)
+        return
+
+    client = Client(args.url, args.timeout)
+    ids = sorted(client.product_ids())
+    if not ids:
+        raise SystemExit("No hay productos de prueba: corre primero con --seed N")
+    ok = {"catalog_list": {200, 304}, "catalog_detail": {200, 304}, "checkout": {201}}
+
+    results = {}
+    for name, make_request in scenarios(ids).items():
+        if args.scenario and name not in args.scenario:
+            continue
+        if args.warmup:
+            run_scenario(client, make_request, args.concurrency, args.warmup, args.random_seed + 1, ok[name])
+        result = run_scenario(client, make_request, args.concurrency, args.duration, args.random_seed, ok[name])
+        result["rps_per_worker"] = round(result["rps"] / args.server_workers, 1)
+        results[name] = result
+
+    print(f"{'escenario':<16}{'peticiones':>11}{'errores':>9}{'req/s':>9}{'req/s/worker':>14}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<16}{r['requests']:>11}{r['errors']:>9}{r['rps']:>9}{r['rps_per_worker']:>14}"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({"url": args.url, "server_workers": args.server_workers, "concurrency": args.concurrency,
+                       "duration": args.duration, "results": results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Métricas por petición en formato Prometheus y log de consultas lentas.
+
+Cada petición mide su latencia, el tamaño de la respuesta y cuántas consultas hizo a
+la BD y cuánto tardaron (eventos de cursor de SQLAlchemy). Las métricas son del
+proceso: con varios workers de gunicorn, Prometheus debe raspar cada uno o sumar
+por instancia.
+"""
+import bisect
+import hmac
+import logging
+import threading
+import time
+from collections import Counter
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for label_values, (counts, total, count) in sorted(series.items()):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{{{_labels(self.labels, label_values)}}} {value}")
+        return lines
+
+
+def _labels(names, values):
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Latencia de las peticiones",
+                            ("method", "endpoint", "status"), LATENCY_BUCKETS)
+REQUEST_QUERIES = Histogram("http_request_db_queries", "Consultas a la BD por petición",
+                            ("endpoint",), QUERY_BUCKETS)
+REQUEST_DB_TIME = Histogram("http_request_db_seconds", "Tiempo en la BD por petición",
+                            ("endpoint",), LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram("http_response_size_bytes", "Tamaño de las respuestas (sin streaming)",
+                          ("endpoint",), SIZE_BUCKETS)
+SLOW_QUERIES = CounterMetric("db_slow_queries_total", "Consultas más lentas que SLOW_QUERY_MS", ("endpoint",))
+QUERY_WARNINGS = CounterMetric("http_request_query_warnings_total",
+                               "Peticiones con demasiadas consultas o una consulta repetida (N+1)",
+                               ("endpoint", "kind"))
+METRICS = (REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, RESPONSE_SIZE, SLOW_QUERIES, QUERY_WARNINGS)
+
+
+def _endpoint():
+    return request.endpoint or "unmatched"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    in_request = has_request_context()
+    if in_request and "query_count" in g:
+        g.query_count += 1
+        g.query_time += elapsed
+        g.query_statements[statement] += 1
+    slow_ms = current_app.config.get("SLOW_QUERY_MS") if in_request else None
+    if slow_ms is not None and elapsed * 1000 >= slow_ms:
+        route = f"{request.method} {request.path}"
+        SLOW_QUERIES.inc(_endpoint())
+        logger.warning("Consulta lenta (%.1f ms) en %s [%s]: %s", elapsed * 1000, route, _endpoint(), statement)
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.query_count = 0
+    g.query_time = 0.0
+    g.query_statements = Counter()
+
+
+def _finish_request(response):
+    if "request_started" not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    endpoint = _endpoint()
+    REQUEST_LATENCY.observe(elapsed, request.method, endpoint, response.status_code)
+    REQUEST_QUERIES.observe(g.query_count, endpoint)
+    REQUEST_DB_TIME.observe(g.query_time, endpoint)
+    if not response.is_streamed and response.content_length is not None:
+        RESPONSE_SIZE.observe(response.content_length, endpoint)
+    response.headers["Server-Timing"] = (f"app;dur={elapsed * 1000:.1f}, "
+                                         f'db;dur={g.query_time * 1000:.1f};desc="{g.query_count} consultas"')
+    _check_query_pattern(endpoint)
+    return response
+
+
+def _check_query_pattern(endpoint):
+    """Avisa cuando una petición hace demasiadas consultas o repite la misma (N+1)"""
+    config = current_app.config
+    limit = config.get("QUERY_COUNT_WARN", 20)
+    if g.query_count > limit:
+        QUERY_WARNINGS.inc(endpoint, "count")
+        logger.warning("%s %s [%s] hizo %d consultas (límite %d)",
+                       request.method, request.path, endpoint, g.query_count, limit)
+    if g.query_statements:
+        statement, times = g.query_statements.most_common(1)[0]
+        repeated = config.get("REPEATED_QUERY_WARN", 5)
+        if times > repeated:
+            QUERY_WARNINGS.inc(endpoint, "repeated")
+            logger.warning("Posible N+1 en %s %s [%s]: la misma consulta se repitió %d veces: %s",
+                           request.method, request.path, endpoint, times, statement)
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view():
+    expected = f"Bearer {current_app.config['METRICS_TOKEN']}"
+    if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected.encode()):
+        return Response("No autorizado\n", status=401, mimetype="text/plain")
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+def init_metrics(app):
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    # Sobre la clase Engine: cubre todos los motores, también los que se creen después
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    # Sin token no se publica /metrics: las rutas, latencias y consultas no son para cualquiera
+    if app.config.get("METRICS_TOKEN"):
+        app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -1,13 +1,17 @@
 from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from security import hash_password, verify_password
+from pricing import utc_now, as_utc, price_for, peso_cl, coupon_discount
+from images import srcset
 
 db = SQLAlchemy()
 
 # Tabla de asociación para categorías
 product_category = db.Table('product_category',
     db.Column('product_id', db.Integer, db.ForeignKey('products.id')),
-    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'))
+    db.Column('category_id', db.Integer, db.ForeignKey('categories.id')),
+    db.Index('ix_product_category_category_product', 'category_id', 'product_id'),
+    db.Index('ix_product_category_product', 'product_id')
 )
 
 class Product(db.Model):
@@ -18,42 +22,76 @@ class Product(db.Model):
     price = db.Column(db.Float, nullable=False)
     discount = db.Column(db.Float, default=0.0)
     discount_expiration =db.Column(db.DateTime)
-    stock = db.Column(db.Integer, default=0)
+    stock = db.Column(db.Integer, default=0) # Disponible: saldo de stock_movements, mantenido por inventory.py
+    reserved = db.Column(db.Integer, default=0, nullable=False) # Unidades apartadas por órdenes pendientes
+    low_stock_threshold = db.Column(db.Integer) # Sin valor se usa LOW_STOCK_THRESHOLD
     img = db.Column(db.String(200))
+    img_status = db.Column(db.String(10), default='ready') # pending mientras la imagen se sube en segundo plano
+    img_variants = db.Column(db.JSON) # {formato: {ancho: url}} generado por images.py
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    # Resumen de reseñas, mantenido por reviews.py en la misma transacción que la reseña
+    rating_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
+    rating_avg = db.Column(db.Float, default=0, nullable=False)
+    rating_1 = db.Column(db.Integer, default=0, nullable=False)
+    rating_2 = db.Column(db.Integer, default=0, nullable=False)
+    rating_3 = db.Column(db.Integer, default=0, nullable=False)
+    rating_4 = db.Column(db.Integer, default=0, nullable=False)
+    rating_5 = db.Column(db.Integer, default=0, nullable=False)
     # Relaciones
     order_details = db.relationship('OrderDetail', backref='product', lazy=True)  
     reviews = db.relationship('Review', backref='product', lazy=True)
     categories = db.relationship('Category', secondary=product_category, backref='products')
+    # Índices para los filtros y órdenes del catálogo (keyset por (columna, id))
+    __table_args__ = (
+        db.Index('ix_products_price_id', 'price', 'id'),
+        db.Index('ix_products_created_at_id', 'created_at', 'id'),
+        db.Index('ix_products_name_id', 'name', 'id'),
+        db.Index('ix_products_discount', 'discount', 'discount_expiration'),
+        db.Index('ix_products_stock', 'stock'),
+        db.Index('ix_products_rating_avg_id', 'rating_avg', 'id'),
+        db.UniqueConstraint('name', name='uq_products_name'),
+    )
 
     @property
     def current_price(self): #Calcular el precio final considerando descuentos vigentes
-        if self.active_discount:
-            return round(self.price * (1 - self.discount/100), 2)
-        return self.price
+        return self.price_at(utc_now()).current
     @property
     def active_discount(self): # Verificar si el descuento esta activo
-        return (self.discount>0 and (not self.discount_expiration or self.discount_expiration > datetime.now(timezone.utc)))
+        return self.price_at(utc_now()).on_sale
+
+    def image_urls(self):
+        urls = {url for widths in (self.img_variants or {}).values() for url in widths.values()}
+        if self.img:
+            urls.add(self.img)
+        return sorted(urls)
+
+    def price_at(self, now):
+        return price_for(self.price, self.discount, self.discount_expiration, now)
     
-    def serialize(self):
-        def peso_cl(value):
-            if value is None:
-                return None
-            value_rounded = int(round(value, 0)) #Redondea decimales ya que en peso chileno no se usa decimales
-            return "{:,}".format(value_rounded).replace (",", ".") #Para que tenga separador cada 1.000
-        
+    def serialize(self, price=None):
+        # price viene de un PriceBook cuando se serializa una lista completa
+        if price is None:
+            price = self.price_at(utc_now())
         return {
             "id": self.id,
             "name": self.name,
             "description": self.description,
             "original_price": peso_cl(self.price),
-            "current_price": peso_cl(self.current_price),
-            "discount_percent":round(self.discount, 2) if self.active_discount else None,
+            "current_price": peso_cl(price.current),
+            "discount_percent": price.discount_percent,
             "discount_ends": self.discount_expiration.isoformat() if self.discount_expiration else None,
-            "on_sale": self.active_discount,  
+            "on_sale": price.on_sale,  
             "stock": self.stock,
             "image_url": self.img,  
+            "image_status": self.img_status,
+            "image_srcset": {fmt: srcset(urls) for fmt, urls in self.img_variants.items()} if self.img_variants else None,
             "categories": [category.serialize() for category in self.categories], #Relación
+            "rating": {
+                "average": round(self.rating_avg or 0, 2),
+                "count": self.rating_count or 0,
+                "histogram": {str(stars): getattr(self, f"rating_{stars}") or 0 for stars in range(1, 6)}
+            },
             "created_at": self.created_at.isoformat() if self.created_at else None
         }
 
@@ -77,9 +115,10 @@ class Client(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128))
+    password_hash = db.Column(db.String(256)) # scrypt ocupa más de 128 caracteres
     subscribe = db.Column(db.Boolean, default=True)
     admin = db.Column(db.Boolean, default=False)
+    role_version = db.Column(db.Integer, default=0, nullable=False) # Se incrementa al cambiar el rol e invalida los tokens
     phone = db.Column(db.String(20))
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     # Relaciones
@@ -89,10 +128,10 @@ class Client(db.Model):
     coupons = db.relationship('Coupon', backref='client', lazy=True)  
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
     def serialize(self):
         return{
             "id":self.id,
@@ -125,8 +164,13 @@ class Order(db.Model):
     payment_method= db.Column(db.String, default='transferencia')
     # Relaciones
     details = db.relationship('OrderDetail', backref='order', lazy=True) 
+    __table_args__ = (
+        db.Index('ix_orders_date_id', 'date', 'id'),
+        db.Index('ix_orders_status_date', 'status', 'date'), # Barrido de pendientes vencidas (expiry.py)
+    )
 
-    def serialize(self):
+    def serialize(self, products=False):
+        # products=True agrega nombre e imagen de cada producto (cargar con selectinload)
         return{
             "id":self.id,
             "client_id": self.client_id,
@@ -137,25 +181,29 @@ class Order(db.Model):
             "coupon_id": self.coupon_id,
             "discount_applied": self.discount_applied,
             "payment_method":self.payment_method,
-            "details": [detail.serialize() for detail in self.details]  # Es hacerle serialize a la relación
+            "details": [detail.serialize(products) for detail in self.details]  # Es hacerle serialize a la relación
         }
 
-    def calculate_total(self):
+    def calculate_total(self, coupon=None):
+        coupon = coupon or self.coupon
         total = 0
         for detail in self.details: #details relacion de order
             subtotal = detail.unit_price * detail.quantity
             total += subtotal
-    #aplicar cupón si es que existe
-        if self.coupon and self.coupon.is_valid():
-            if self.coupon.discount_type == 'percentage':
-                total *= (1 - self.coupon.discount / 100)
-            elif self.coupon.discount_type == 'fixed':
-                total -= self.coupon.discount
+    #aplicar cupón si es que existe (los usos ya se descontaron al canjearlo)
+        self.discount_applied = 0
+        if coupon and coupon.is_valid():
+            self.discount_applied = coupon_discount(coupon.discount_type, coupon.discount, total)
+            total -= self.discount_applied
         self.total = int(round(total,0))
         return self.total
     
 
 
+# Historial de cada cliente (/api/me/orders): sus órdenes de la más nueva a la más antigua
+db.Index('ix_orders_client_id_date', Order.client_id, Order.date.desc(), Order.id.desc())
+
+
 class OrderDetail(db.Model):  
     __tablename__ = 'order_details'
     id = db.Column(db.Integer, primary_key=True)
@@ -163,6 +211,21 @@ class OrderDetail(db.Model):
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False) 
     quantity = db.Column(db.Integer, nullable=False) 
     unit_price = db.Column(db.Float, nullable=False)  
+    __table_args__ = (
+        db.Index('ix_order_details_order_id', 'order_id'),
+    )
+
+    def serialize(self, product=False):
+        data = {
+            "id": self.id,
+            "product_id": self.product_id,
+            "quantity": self.quantity,
+            "unit_price": self.unit_price,
+            "subtotal": self.unit_price * self.quantity
+        }
+        if product:
+            data["product"] = {"name": self.product.name, "image_url": self.product.img} if self.product else None
+        return data
 
 class Review(db.Model):
     __tablename__ = 'reviews'
@@ -174,8 +237,19 @@ class Review(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc)) 
     __table_args__ = (
         db.UniqueConstraint('client_id', 'product_id', name='unique_review_per_product'),  
+        db.Index('ix_reviews_product_id', 'product_id', 'id'),
     )
 
+    def serialize(self):
+        return {
+            "id": self.id,
+            "client_id": self.client_id,
+            "product_id": self.product_id,
+            "rating": self.rating,
+            "comment": self.comment,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+
 class Coupon(db.Model):  
     __tablename__ = 'coupons'  
     id = db.Column(db.Integer, primary_key=True)
@@ -188,4 +262,95 @@ class Coupon(db.Model):
     current_uses = db.Column(db.Integer, default=0)  
     client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=True)
     # Relaciones
-    orders = db.relationship('Order', backref='coupon', lazy=True)  
\ No newline at end of file
+    orders = db.relationship('Order', backref='coupon', lazy=True)
+
+    def is_valid(self, now=None):
+        # Solo revisa la vigencia; los usos se controlan al canjear (coupons.redeem)
+        now = now or utc_now()
+        return as_utc(self.valid_from) <= now < as_utc(self.valid_to)
+
+    def has_uses_left(self):
+        return self.max_uses is None or (self.current_uses or 0) < self.max_uses
+
+
+class StockMovement(db.Model):
+    """Libro de movimientos de stock, solo se agregan filas (ver inventory.py)"""
+    __tablename__ = 'stock_movements'
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=True)
+    kind = db.Column(db.String(12), nullable=False) # reservation / sale / release / restock / adjustment
+    stock_delta = db.Column(db.Integer, default=0, nullable=False) # Cambio en Product.stock
+    reserved_delta = db.Column(db.Integer, default=0, nullable=False) # Cambio en Product.reserved
+    note = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=utc_now, nullable=False)
+    __table_args__ = (
+        db.Index('ix_stock_movements_product_id', 'product_id', 'id'),
+        db.Index('ix_stock_movements_order_id', 'order_id'),
+    )
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "product_id": self.product_id,
+            "order_id": self.order_id,
+            "kind": self.kind,
+            "stock_delta": self.stock_delta,
+            "reserved_delta": self.reserved_delta,
+            "note": self.note,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class ImageJob(db.Model):
+    """Subida o borrado de una imagen pendiente, procesado por jobs.py"""
+    __tablename__ = 'image_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    action = db.Column(db.String(10), nullable=False) # upload / destroy / fetch
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=True)
+    payload = db.Column(db.String(255), nullable=False) # Archivo local a subir, URL a descargar o public_id a borrar
+    folder = db.Column(db.String(50))
+    status = db.Column(db.String(10), default='pending', nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=utc_now, nullable=False)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    # Al borrar el producto el trabajo queda con product_id nulo
+    product = db.relationship('Product', backref=db.backref('image_jobs', lazy=True))
+    __table_args__ = (
+        db.Index('ix_image_jobs_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+
+# Tablas de resumen para reportes, actualizadas por analytics.py al pagar una orden
+class DailySales(db.Model):
+    __tablename__ = 'daily_sales'
+    day = db.Column(db.Date, primary_key=True)
+    orders = db.Column(db.Integer, default=0, nullable=False)
+    units = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Float, default=0, nullable=False)
+
+    def serialize(self):
+        return {"day": self.day.isoformat(), "orders": self.orders, "units": self.units, "revenue": self.revenue}
+
+class ProductSales(db.Model):
+    __tablename__ = 'product_sales'
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    units = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Float, default=0, nullable=False)
+    __table_args__ = (
+        db.Index('ix_product_sales_units', 'units'),
+    )
+
+class CategorySales(db.Model):
+    __tablename__ = 'category_sales'
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    units = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Float, default=0, nullable=False)
+
+class CouponUsage(db.Model):
+    __tablename__ = 'coupon_usage'
+    coupon_id = db.Column(db.Integer, db.ForeignKey('coupons.id', ondelete='CASCADE'), primary_key=True)
+    orders = db.Column(db.Integer, default=0, nullable=False)
+    discount_total = db.Column(db.Float, default=0, nullable=False)
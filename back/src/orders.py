@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+from sqlalchemy.orm import selectinload
+from models import Order, OrderDetail, Product
+from pricing import as_utc
+
+EXPORT_BATCH = 500
+CSV_COLUMNS = ["order_id", "date", "client_id", "status", "total", "payment_method",
+               "coupon_id", "discount_applied", "product_id", "quantity", "unit_price"]
+
+
+def filter_orders(query, args):
+    """Filtros del listado de órdenes: status, client_id y rango de fechas [date_from, date_to).
+
+    Lanza ValueError si alguna fecha o id no es válido.
+    """
+    status = args.get("status")
+    if status:
+        query = query.filter(Order.status == status)
+    client_id = args.get("client_id")
+    if client_id:
+        query = query.filter(Order.client_id == int(client_id))
+    date_from = args.get("date_from")
+    if date_from:
+        query = query.filter(Order.date >= as_utc(datetime.fromisoformat(date_from)))
+    date_to = args.get("date_to")
+    if date_to:
+        query = query.filter(Order.date < as_utc(datetime.fromisoformat(date_to)))
+    return query
+
+
+def newest_first(query, last=None):
+    """Órdenes de la más nueva a la más antigua, desde el cursor (fecha, id)"""
+    if last:
+        after = (datetime.fromisoformat(last[0]), int(last[1]))
+        query = query.filter(tuple_(Order.date, Order.id) < after)
+    return query.options(selectinload(Order.details)).order_by(Order.date.desc(), Order.id.desc())
+
+
+def client_history(client_id, last=None):
+    """Órdenes del cliente con sus detalles y productos en un número fijo de consultas.
+
+    Órdenes, detalles y productos (solo nombre e imagen) van en tres consultas por
+    página, sin importar cuántas órdenes o líneas tenga; el índice
+    (client_id, date DESC, id DESC) sirve el filtro, el orden y el cursor.
+    """
+    query = newest_first(Order.query.filter(Order.client_id == client_id), last)
+    return query.options(selectinload(Order.details).selectinload(OrderDetail.product)
+                         .load_only(Product.id, Product.name, Product.img))
+
+
+def order_cursor(order):
+    return (order.date.isoformat(), order.id)
+
+
+def export_orders(query, fmt):
+    """Genera la exportación línea a línea leyendo las órdenes por lotes.
+
+    yield_per mantiene en memoria un solo lote y selectinload trae los detalles de
+    cada lote con una consulta.
+    """
+    orders = query.yield_per(EXPORT_BATCH)
+    if fmt == "ndjson":
+        for order in orders:
+            yield json.dumps(order.serialize(), ensure_ascii=False) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+    for order in orders:
+        base = [order.id, order.date.isoformat() if order.date else "", order.client_id, order.status,
+                order.total, order.payment_method, order.coupon_id, order.discount_applied]
+        for detail in order.details:
+            writer.writerow(base + [detail.product_id, detail.quantity, detail.unit_price])
+        if not order.details:
+            writer.writerow(base + ["", "", ""])
+        yield flush()
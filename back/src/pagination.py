@@ -0,0 +1,44 @@
+import base64
+import json
+from flask import request
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(*values):
+    """Convierte los valores de la última fila en un cursor opaco"""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Devuelve la lista de valores del cursor o None si es inválido"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def page_size(args=None):
+    if args is None:
+        args = request.args
+    limit = args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def keyset_page(query, limit, cursor_values):
+    """Ejecuta la consulta pidiendo una fila extra para saber si hay otra página.
+
+    cursor_values recibe la última fila de la página y devuelve los valores del cursor.
+    """
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*cursor_values(rows[-1]))
+    return rows, next_cursor
@@ -0,0 +1,72 @@
+import math
+from collections import namedtuple
+from datetime import datetime, timezone
+
+Price = namedtuple("Price", "current on_sale discount_percent")
+
+
+def utc_now():
+    # Las columnas DateTime se guardan sin zona horaria, en UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def as_utc(value):
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def peso_cl(value):
+    if value is None:
+        return None
+    value_rounded = int(round(value, 0)) #Redondea decimales ya que en peso chileno no se usa decimales
+    return "{:,}".format(value_rounded).replace(",", ".") #Para que tenga separador cada 1.000
+
+
+def price_for(price, discount, expiration, now):
+    """Precio vigente de un producto en el instante `now`"""
+    if discount and discount > 0:
+        expiration = as_utc(expiration)
+        if expiration is None or expiration > now:
+            return Price(round(price * (1 - discount / 100), 2), True, round(discount, 2))
+    return Price(price, False, None)
+
+
+def coupon_discount(discount_type, discount, subtotal):
+    """Monto a descontar por un cupón, nunca mayor que el subtotal"""
+    if discount_type == 'percentage':
+        amount = subtotal * discount / 100
+    elif discount_type == 'fixed':
+        amount = discount
+    else:
+        amount = 0
+    return min(max(amount, 0), subtotal)
+
+
+class PriceBook:
+    """Precios de un conjunto de productos calculados con un único "ahora".
+
+    También guarda el próximo vencimiento de descuento (next_change), que es el momento
+    exacto en que una página del catálogo armada con estos precios deja de ser válida.
+    """
+
+    def __init__(self, products, now=None):
+        self.now = now or utc_now()
+        self.prices = {}
+        self.next_change = None
+        now = self.now
+        for product in products:
+            price = price_for(product.price, product.discount, product.discount_expiration, now)
+            self.prices[product.id] = price
+            if price.on_sale and product.discount_expiration is not None:
+                expiration = as_utc(product.discount_expiration)
+                if self.next_change is None or expiration < self.next_change:
+                    self.next_change = expiration
+
+    def __getitem__(self, product_id):
+        return self.prices[product_id]
+
+    def seconds_until_change(self):
+        if self.next_change is None:
+            return None
+        return max(1, math.ceil((self.next_change - self.now).total_seconds()))
@@ -0,0 +1,47 @@
+from sqlalchemy import case, update
+from models import db, Product
+
+RATINGS = range(1, 6)
+
+
+class ReviewError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def parse_rating(value):
+    try:
+        rating = int(value)
+    except (TypeError, ValueError):
+        raise ReviewError("La calificación debe ser un número entre 1 y 5")
+    if rating not in RATINGS:
+        raise ReviewError("La calificación debe ser un número entre 1 y 5")
+    return rating
+
+
+def apply_rating(product_id, old_rating=None, new_rating=None):
+    """Actualiza el resumen de calificaciones del producto sin leerlo.
+
+    old_rating=None es una reseña nueva y new_rating=None una reseña borrada. No hace
+    commit: va en la misma transacción que la reseña.
+    """
+    count = (new_rating is not None) - (old_rating is not None)
+    values = {
+        Product.rating_count: Product.rating_count + count,
+        Product.rating_sum: Product.rating_sum + (new_rating or 0) - (old_rating or 0),
+    }
+    if old_rating is not None:
+        column = getattr(Product, f"rating_{old_rating}")
+        values[column] = column - 1
+    if new_rating is not None:
+        column = getattr(Product, f"rating_{new_rating}")
+        values[column] = values.get(column, column) + 1
+
+    db.session.execute(update(Product).where(Product.id == product_id).values(values)
+                       .execution_options(synchronize_session=False))
+    # En una segunda sentencia: MySQL evalúa el SET de izquierda a derecha con los valores nuevos
+    average = case((Product.rating_count > 0, Product.rating_sum * 1.0 / Product.rating_count), else_=0)
+    db.session.execute(update(Product).where(Product.id == product_id).values(rating_avg=average)
+                       .execution_options(synchronize_session=False))
@@ -1,16 +1,34 @@
-import os
-import cloudinary.uploader
-from flask_cors import cross_origin, CORS
+"""Rutas públicas: catálogo, clientes, reseñas, compras y cupones.
+
+Las de administración están en admin_routes.py, que create_app registra solo si
+APP_BLUEPRINTS incluye "admin".
+"""
+import math
 from flask import Blueprint, request, jsonify
-from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash
-from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identity
-from models import db, product_category, Product, Category, Client, Address, Order, OrderDetail, Review, Coupon
-from decorators import admin_required
-from config import allowed_files, obtener_public_id
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, Product, Category, Client, Order, Review
+from sqlalchemy.exc import IntegrityError
+from decorators import create_client_token
+from pagination import page_size, decode_cursor, keyset_page
+from catalog import PRODUCT_SORTS, filter_products, sort_products, product_cursor, serialize_products
+from serializers import CATEGORY, REVIEW, product_rows
+from search import search_product_ids
+from cache import cached_response, invalidate
+from checkout import CheckoutError, parse_items, place_order
+from orders import order_cursor, client_history
+from reviews import ReviewError, parse_rating, apply_rating
+from coupons import CouponError, check_coupon, estimate
+from security import HashPoolBusy, login_throttle, needs_rehash
 
 api = Blueprint("api", __name__)
 
+
+def busy(error):
+    response = jsonify({"error": str(error)})
+    response.headers["Retry-After"] = str(math.ceil(error.retry_after))
+    return response, 503
+
+
  #### CLIENTE
 @api.route('/register', methods=['POST'])
 def register():
@@ -22,29 +40,32 @@ def register():
     if not all([email, password, name]):
         return jsonify({"error":"Faltan campos obligatorios"}), 400
 
-    if  Client.query.filter_by(email=email).first():
-        return jsonify({"error":"Este mail ya esta registrado"}), 409
-    
-
+    # El email único lo controla la BD (IntegrityError), sin consulta previa
     client =Client(
     email = email,
     name = name,
     subscribe = subscribe,
     admin=False
     )
-    client.set_password(password)
+    try:
+        client.set_password(password)
+    except HashPoolBusy as e:
+        return busy(e)
 
     try:
     
         db.session.add(client)
         db.session.commit()
-        access_token = create_access_token(identity=client.id)
+        access_token = create_client_token(client)
         
         return jsonify({
             "message": "Bienvenido a al club de Insomnia",
             "client": client.serialize(),
             "access_token": access_token
         }), 201
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error":"Este mail ya esta registrado"}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": "Error en el servidor"}), 500
@@ -52,270 +73,202 @@ def register():
 @api.route('/login', methods=['POST'])
 def login():
     
-    email= request.json.get('email')
-    password = request.json.get('password')
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    password = data.get('password') if isinstance(data, dict) else None
     
     if not email or not password:
         return jsonify({ "error": "Email y contraseña requeridos"}), 400
+    if not isinstance(email, str) or not isinstance(password, str):
+        return jsonify({"error": "Email y contraseña deben ser texto"}), 400
     
+    # Se rechaza antes de consultar la BD o calcular el hash
+    wait = login_throttle.check(email, request.remote_addr or "")
+    if wait:
+        response = jsonify({"error": "Demasiados intentos, espera un momento"})
+        response.headers["Retry-After"] = str(math.ceil(wait))
+        return response, 429
     
     client = Client.query.filter_by(email=email).first()
-    if not client or not client.check_password(password):
-        return jsonify({"error":"Datos incorrectos"}), 401
-    
+    try:
+        if not client or not client.check_password(password):
+            return jsonify({"error":"Datos incorrectos"}), 401
+        # Si cambiaron los parámetros del hash, se actualiza ahora que tenemos la contraseña
+        if needs_rehash(client.password_hash):
+            client.set_password(password)
+            db.session.commit()
+    except HashPoolBusy as e:
+        db.session.rollback()
+        return busy(e)
     
-    access_token = create_access_token(identity=client.id)
+    access_token = create_client_token(client)
     return jsonify({
         "access_token": access_token,
         "client": client.serialize()
     }), 200
 
-
-
 #### PRODUCTOS
-@api.route('/products', methods=['POST'])
-@admin_required
-def new_product():
-
-    if 'name' not in request.form or not request.form['name']:
-        return jsonify({"error":"El nombre es obligatorio"}), 400
-    if  'description' not in request.form or not request.form['description'] :
-        return jsonify({"error":"La descripción es obligatoria"}), 400
-    if 'price' not in request.form or not request.form['price']:
-        return jsonify({"error":"El precio es obligatorio"}), 400
-    
-    image_url=None
-    if 'photo' in request.files:
-        image=request.files['photo']
-     
-    if image.filename == "":
-        return jsonify({"error":"Nombre del archivo vacío"}), 400
-    if not allowed_files(image.filename):
-        return jsonify({"error":"Formato de archivo no permitido"}), 400
-    
-    try: #para subir la imagen a cloudinary
-        upload_result = cloudinary.uploader.upload(image, folder="products")
-        image_url=upload_result['secure_url']
-
-    except Exception as e:
-            return jsonify({"error": f"Error al subir imagen: {str(e)}"}), 500
-    try:
-        new_product = Product(
-            name=request.form['name'],
-            description=request.form['description'],
-            price=float(request.form['price']),
-            img=image_url
-        )
-        db.session.add(new_product)
-        db.session.commit()
-        return jsonify({
-            "msg":"Producto creado",
-            "product":new_product.serialize()
-            }), 201
-    except ValueError:
-        db.session.rollback()
-        return jsonify({"error":"Precio o stock inválido"}), 400
-    except Exception as e:  # Otros errores de BD
-        db.session.rollback()
-        return jsonify({"error": f"Error en la base de datos: {str(e)}"}), 500
-
-    
-
-
-
-
-@api.route('/products/<int:id>', methods= ['PUT'])
-@admin_required
-def edit_product(id):
-    product = Product.query.get(id)
-
-    if not product:
-        return jsonify({"error":"Producto no encontrado"}), 404
-    
-    data =request.get_json()
-    if not data:
-        return jsonify({"error":"Datos no proporcionados"}), 400
+@api.route('/products', methods=['GET'])
+@cached_response("products")
+def get_products():
+    limit = page_size()
+    sort = request.args.get('sort', 'id')
+    if sort not in PRODUCT_SORTS:
+        return jsonify({"error": "Orden inválido"}), 400
+    cursor = request.args.get('cursor')
+    last = decode_cursor(cursor)
+    if cursor and not last:
+        return jsonify({"error": "Cursor inválido"}), 400
+
+    # Solo las columnas que se devuelven; las categorías van en una consulta extra (IN) para toda la página
+    query = product_rows(Product.query)
     try:
-        if 'name' in data and data['name'] != product.name:
-            existing = Product.query.filter(Product.id != id,
-                                             Product.name == data['name']).first()
-            if existing:
-                return({"error":"Ya existe un producto con este nombre"}),409
-            product.name =data['name']
+        query = filter_products(query, request.args)
+        query = sort_products(query, sort, last)
+    except (ValueError, TypeError, IndexError):
+        return jsonify({"error": "Filtros inválidos"}), 400
 
-            if 'description' in data:
-                product.description = data['description']
-
-            if 'price' in data:
-                try:
-                    product.price = float(data['price'])
-                except ValueError:
-                    return jsonify({"error":"El precio debe ser un número válido"}), 400
-
-            if 'image_file' in request.files:
-                file = request.files['image_file']
-                upload_result = cloudinary.uploader.upload(file)
-                product.img = upload_result['secure_url']
-
-        db.session.commit()
-        return jsonify({
-            "message":"Se realizon los cambios",
-            "product": product.serialize()
-        }), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error":"No se pudieron realizar los cambios:"+str(e)}), 500
-
-@api.route('/products/<int:id>', methods= ['DELETE'])
-@admin_required
-def delete_product(id):
-    product = Product.query.get(id)
-
-    if not product:
-        return jsonify({"error":"No se encontro el producto"}), 404
+    products, next_cursor = keyset_page(query, limit, product_cursor(sort))
+    return jsonify({
+        "products": serialize_products(products),
+        "next_cursor": next_cursor
+    }), 200
     
-    try:
-        if product.img:
-            public_id = obtener_public_id(product.img)
-            cloudinary.uploader.destroy(public_id)
-
-        db.session.delete(product)
-        db.session.commit()
-        return jsonify({"msg":"Producto eliminado correctamente"}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error":"No se pudo eliminar producto:" + str(e)}),500
+@api.route('/products/search', methods=['GET'])
+@cached_response("products")
+def search_products():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Falta el texto a buscar"}), 400
+
+    ids = search_product_ids(query, page_size())
+    products = product_rows(Product.query).filter(Product.id.in_(ids)).all() if ids else []
+    by_id = {product.id: product for product in products}
+    return jsonify({
+        "products": serialize_products([by_id[product_id] for product_id in ids if product_id in by_id])
+    }), 200
 
-@api.route('/products', methods=['GET'])
-def get_products():
-    products = Product.query.all()
-    return jsonify([product.serialize() for product in products]), 200
-    
 @api.route('/products/<int:id>', methods=['GET'])
+@cached_response("products")
 def get_product(id):
-    product = Product.query.get(id)
+    product = product_rows(Product.query).filter(Product.id == id).first()
     if not product:
         return jsonify({"error": "Producto no encontrado"}), 404
-    return jsonify(product.serialize()), 200
-
-####CATEGORIAS
-@api.route('/categories', methods=['GET'])
-def get_categories():
-    categories = Category.query.all()
-    return jsonify([category.serialize() for category in categories]), 200
-
-@api.route('/categories', methods=['POST'])
-@admin_required
-def new_category():
-    data = request.get_json()
+    return jsonify(serialize_products([product])[0]), 200
+
+####RESEÑAS
+@api.route('/products/<int:id>/reviews', methods=['GET'])
+def get_reviews(id):
+    cursor = request.args.get('cursor')
+    last = decode_cursor(cursor)
+    if cursor and not last:
+        return jsonify({"error": "Cursor inválido"}), 400
+    query = REVIEW.select(Review.query).filter(Review.product_id == id).order_by(Review.id.desc())
+    try:
+        if last:
+            query = query.filter(Review.id < int(last[0]))
+    except (ValueError, TypeError, IndexError):
+        return jsonify({"error": "Cursor inválido"}), 400
+    reviews, next_cursor = keyset_page(query, page_size(), lambda review: (review.id,))
+    return jsonify({
+        "reviews": [REVIEW(review) for review in reviews],
+        "next_cursor": next_cursor
+    }), 200
 
-    if not data or 'name' not in data:
-        return jsonify({"error":"El nombre es obligatorio"}), 400
-    
-    if Category.query.filter_by(name=data['name']).first(): 
-        return jsonify({"error":"Esta categoria ya existe"}), 409
-    
+@api.route('/products/<int:id>/reviews', methods=['POST'])
+@jwt_required()
+def new_review(id):
+    data = request.get_json() or {}
+    if not db.session.query(Product.id).filter(Product.id == id).scalar():
+        return jsonify({"error": "Producto no encontrado"}), 404
     try:
-        category = Category(
-            name=data['name'],
-            description=data.get('description','')
+        review = Review(
+            client_id=int(get_jwt_identity()),
+            product_id=id,
+            rating=parse_rating(data.get('rating')),
+            comment=data.get('comment')
         )
-
-        db.session.add(category)
+        db.session.add(review)
+        db.session.flush()  # La restricción única rechaza una segunda reseña del mismo cliente
+        apply_rating(id, new_rating=review.rating)
         db.session.commit()
-        return jsonify({
-            "message":"Categoría creada",
-            "category":category.serialize()
-        }), 201 
-    except Exception as e:
+    except ReviewError as e:
         db.session.rollback()
-        return jsonify({"error":str(e)}), 500
-
-@api.route('/categories/<int:id>', methods=['PUT'])
-@admin_required
-def edit_category(id):
-    category = Category.query.get(id)
-
-    if not category:
-        return jsonify({"error":"Categoría no encontrada"}), 404
-    
-    data = request.get_json() #Donde guardar los datos nuevos
-    if not data:
-        return jsonify({"error":"Datos no proporcionados"}), 400
-    try:
-        if 'name' in data:
-            existing = Category.query.filter(Category.id != id,
-                                     Category.name == data['name']
-                                     ).first()
-            if existing:
-                return jsonify({"error":"Ya existe una categoria con este nombre"}), 409
-            category.name = data['name']
-
-            if 'description' in data:
-                category.description = data['description']
-
-
-        db.session.commit()
-        return jsonify({
-            "message":"Se pudo realizar los cambios exitosamente.",
-            "category":category.serialize()
-            }), 200
-    except Exception as e:
+        return jsonify({"error": e.message}), e.status
+    except IntegrityError:
         db.session.rollback()
-        return jsonify({"error":"No se pudo realizar cambios:"+str(e)}), 500
-    
-
-@api.route('/categories/<int:id>', methods=['DELETE'])
-@admin_required
-def delete_category(id):
-    category = Category.query.get(id)
-
-    if not category:
-        return jsonify({"error":"Categoría no encontrada"}), 404
-    
+        return jsonify({"error": "Ya dejaste una reseña para este producto"}), 409
+    invalidate("products")
+    return jsonify({"message": "Reseña creada", "review": review.serialize()}), 201
+
+@api.route('/products/<int:id>/reviews', methods=['PUT'])
+@jwt_required()
+def edit_review(id):
+    data = request.get_json() or {}
+    review = Review.query.filter_by(product_id=id, client_id=int(get_jwt_identity())).first()
+    if not review:
+        return jsonify({"error": "Reseña no encontrada"}), 404
     try:
-        db.session.delete(category)  
+        old_rating = review.rating
+        if 'rating' in data:
+            review.rating = parse_rating(data['rating'])
+        if 'comment' in data:
+            review.comment = data['comment']
+        if review.rating != old_rating:
+            apply_rating(id, old_rating, review.rating)
         db.session.commit()
-        return jsonify({"message": "Categoría eliminada correctamente"}), 200
-    
-    except Exception as e:
+    except ReviewError as e:
         db.session.rollback()
-        return jsonify({"error": "No se pudo eliminar: " + str(e)}), 500
-
+        return jsonify({"error": e.message}), e.status
+    invalidate("products")
+    return jsonify({"message": "Reseña actualizada", "review": review.serialize()}), 200
+
+@api.route('/products/<int:id>/reviews', methods=['DELETE'])
+@jwt_required()
+def delete_review(id):
+    review = Review.query.filter_by(product_id=id, client_id=int(get_jwt_identity())).first()
+    if not review:
+        return jsonify({"error": "Reseña no encontrada"}), 404
+    apply_rating(id, old_rating=review.rating)
+    db.session.delete(review)
+    db.session.commit()
+    invalidate("products")
+    return jsonify({"message": "Reseña eliminada"}), 200
 
+####CATEGORIAS
+@api.route('/categories', methods=['GET'])
+@cached_response("categories")
+def get_categories():
+    return jsonify([CATEGORY(row) for row in CATEGORY.select(Category.query)]), 200
 
         #####ORDERS
 @api.route('/orders', methods=['POST'])
+@jwt_required(optional=True)
 def create_order():
     data = request.get_json()
 
-    if not data or 'items' not in data or data['items']:
+    if not data or not data.get('items'):
         return jsonify({"error":"No hay productos en la compra"}), 400
-    new_order = Order(
-        client_id=data.get('client.id'),
-        total= data.get('total'),
-        shipping_address =data['shipping_address'],
-        coupon_id =data.get('coupon_id'),
-        discount_applied= data.get('discount_applied'),
-        status ='pending',
-        payment_method ='transferencia'
-    )
-    db.session.add(new_order)
-    db.session.commit
-    
-    for item in data['items']:
-        product= Product.query.get(item['product_id'])
-        if not product or product.stock < item('quantity'):
-            db.session.rollback()
-            return jsonify({"error":f"Producto {item['product_id']} no disponible"}), 400
-        OrderDetail.create(
-            order_id=new_order.id,
-            product_id= product.id,
-            quantity=item['quantity'],
-            unit_price= product.current_price,
+    if not data.get('shipping_address'):
+        return jsonify({"error":"La dirección de envío es obligatoria"}), 400
+
+    try:
+        quantities = parse_items(data['items'])
+        new_order = place_order(
+            client_id=get_jwt_identity(),
+            shipping_address=data['shipping_address'],
+            quantities=quantities,
+            coupon_code=data.get('coupon_code')
         )
-    new_order.calculate_total()
-    db.session.commit()
+        db.session.commit()
+    except (CheckoutError, CouponError) as e:
+        db.session.rollback()
+        return jsonify({"error": e.message}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "No se pudo crear el pedido: " + str(e)}), 500
+    # El stock se descontó con un UPDATE directo, que no pasa por el flush
+    invalidate("products")
 
     return jsonify({
         "message": "¡Pedido creado! Confirma el pago por transferencia y envía el comprobante.",
@@ -323,25 +276,47 @@ def create_order():
         
     }), 201   
 
-@api.route('/orders/<int:id>/status', methods=['PUT'])
-@admin_required
-def update_order_status(id):
-    order = Order.query.get(id)
-    if not order:
-        return jsonify({"error": "Orden no encontrada"}), 404
-
-    new_status = request.json.get('status')
-    if new_status not in ['pending', 'paid', 'shipped', 'cancelled']:
-        return jsonify({"error": "Estado inválido"}), 400
-
-    order.status = new_status
-    db.session.commit()
-
-    return jsonify({"message": f"Estado actualizado a '{new_status}'"}), 200
-
-@api.route('/admin/orders', methods=['GET'])
-@admin_required
-def get_all_orders():
-    orders = Order.query.all()
-    return jsonify([order.serialize() for order in orders]), 200
+@api.route('/me/orders', methods=['GET'])
+@jwt_required()
+def get_my_orders():
+    cursor = request.args.get('cursor')
+    last = decode_cursor(cursor)
+    if cursor and not last:
+        return jsonify({"error": "Cursor inválido"}), 400
+    try:
+        query = client_history(int(get_jwt_identity()), last)
+    except (ValueError, TypeError, IndexError):
+        return jsonify({"error": "Cursor inválido"}), 400
+    status = request.args.get('status')
+    if status:
+        query = query.filter(Order.status == status)
+
+    orders, next_cursor = keyset_page(query, page_size(), order_cursor)
+    return jsonify({
+        "orders": [order.serialize(products=True) for order in orders],
+        "next_cursor": next_cursor
+    }), 200
 
+####CUPONES
+@api.route('/coupons/validate', methods=['GET'])
+@jwt_required(optional=True)
+def validate_coupon():
+    code = request.args.get('code', '').strip()
+    if not code:
+        return jsonify({"error": "Falta el código del cupón"}), 400
+    subtotal = request.args.get('subtotal', type=float)
+    # float() acepta "nan" e "inf", que darían un descuento estimado sin sentido
+    if subtotal is not None and not math.isfinite(subtotal):
+        return jsonify({"error": "El subtotal debe ser un número finito"}), 400
+    try:
+        coupon = check_coupon(code, get_jwt_identity())
+    except CouponError as e:
+        return jsonify({"valid": False, "error": e.message}), e.status
+    return jsonify({
+        "valid": True,
+        "code": coupon.code,
+        "discount": coupon.discount,
+        "discount_type": coupon.discount_type,
+        "valid_to": coupon.valid_to.isoformat(),
+        "estimated_discount": estimate(coupon, subtotal) if subtotal is not None else None
+    }), 200
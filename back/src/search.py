@@ -0,0 +1,202 @@
+import math
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from flask import current_app
+from sqlalchemy import func, or_
+from models import db, Product
+from cache import cache
+
+TOKEN_RE = re.compile(r"\w+")
+NAME_WEIGHT = 3.0
+PREFIX_FACTOR = 0.6
+TYPO_FACTOR = 0.4
+MIN_TYPO_LENGTH = 4
+TRGM_THRESHOLD = 0.3
+MIN_REBUILD_SECONDS = 5  # Entre reconstrucciones por cambios de otros workers
+
+
+def tokenize(value):
+    if not value:
+        return []
+    # Sin tildes para que "cafe" encuentre "café"
+    folded = unicodedata.normalize("NFKD", value.lower())
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return TOKEN_RE.findall(folded)
+
+
+def _deletes(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+class ProductSearchIndex:
+    """Índice invertido en memoria para MySQL/SQLite.
+
+    Se construye la primera vez que se busca y luego se actualiza producto a producto
+    desde las rutas de administración. Esas actualizaciones solo llegan al worker que
+    hizo la escritura: el índice se reconstruye cuando cambia la generación "products"
+    de la caché (compartida con CACHE_URL) o cuando pasan SEARCH_INDEX_TTL segundos.
+    Las erratas se resuelven con el método de borrados simétricos (distancia de
+    edición 1) sin recorrer todo el vocabulario.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._built_at = 0.0
+        self._generation = None
+        self._postings = defaultdict(dict)   # término -> {product_id: peso}
+        self._docs = {}                      # product_id -> términos del documento
+        self._deletes = defaultdict(set)     # término con una letra menos -> términos
+        self._vocabulary = []                # ordenado, para búsquedas por prefijo
+
+    def _add_term(self, term):
+        self._vocabulary.insert(bisect_left(self._vocabulary, term), term)
+        for deleted in _deletes(term):
+            self._deletes[deleted].add(term)
+
+    def _drop_term(self, term):
+        del self._postings[term]
+        del self._vocabulary[bisect_left(self._vocabulary, term)]
+        for deleted in _deletes(term):
+            self._deletes[deleted].discard(term)
+            if not self._deletes[deleted]:
+                del self._deletes[deleted]
+
+    def _add(self, product_id, name, description):
+        weights = defaultdict(float)
+        for term in tokenize(name):
+            weights[term] += NAME_WEIGHT
+        for term in tokenize(description):
+            weights[term] += 1.0
+        for term, weight in weights.items():
+            if term not in self._postings:
+                self._add_term(term)
+            self._postings[term][product_id] = weight
+        self._docs[product_id] = set(weights)
+
+    def _remove(self, product_id):
+        for term in self._docs.pop(product_id, ()):
+            postings = self._postings[term]
+            postings.pop(product_id, None)
+            if not postings:
+                self._drop_term(term)
+
+    def build(self):
+        # La generación se lee antes que las filas: una escritura durante la carga fuerza otra reconstrucción
+        generation = cache.generation("products")
+        rows = db.session.query(Product.id, Product.name, Product.description).yield_per(1000)
+        with self._lock:
+            self.clear()
+            for product_id, name, description in rows:
+                self._add(product_id, name, description)
+            self._built = True
+            self._built_at = time.monotonic()
+            self._generation = generation
+
+    def stale(self):
+        if not self._built:
+            return True
+        age = time.monotonic() - self._built_at
+        if age >= current_app.config.get("SEARCH_INDEX_TTL", 300):
+            return True
+        return age >= MIN_REBUILD_SECONDS and cache.generation("products") != self._generation
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._docs.clear()
+            self._deletes.clear()
+            self._vocabulary = []
+            self._built = False
+
+    def update(self, product):
+        with self._lock:
+            if not self._built:
+                return
+            self._remove(product.id)
+            self._add(product.id, product.name, product.description)
+
+    def remove(self, product_id):
+        with self._lock:
+            if self._built:
+                self._remove(product_id)
+
+    def _expand(self, term):
+        """Devuelve {término del índice: factor} para la palabra buscada"""
+        matches = {}
+        if term in self._postings:
+            matches[term] = 1.0
+        start = bisect_left(self._vocabulary, term)
+        for candidate in self._vocabulary[start:]:
+            if not candidate.startswith(term):
+                break
+            matches.setdefault(candidate, PREFIX_FACTOR)
+        if len(term) >= MIN_TYPO_LENGTH:
+            candidates = set(self._deletes.get(term, ()))
+            for deleted in _deletes(term):
+                if deleted in self._postings:
+                    candidates.add(deleted)
+                candidates |= self._deletes.get(deleted, set())
+            for candidate in candidates:
+                matches.setdefault(candidate, TYPO_FACTOR)
+        return matches
+
+    def search(self, query, limit):
+        if self.stale():
+            self.build()
+        with self._lock:
+            total_docs = len(self._docs) or 1
+            scores = None  # Aún sin la primera palabra
+            for term in tokenize(query):
+                term_scores = defaultdict(float)
+                for match, factor in self._expand(term).items():
+                    postings = self._postings[match]
+                    idf = math.log(1 + total_docs / len(postings))
+                    for product_id, weight in postings.items():
+                        term_scores[product_id] = max(term_scores[product_id], weight * idf * factor)
+                if not term_scores:
+                    return []
+                # Todas las palabras deben aparecer (AND), igual que en PostgreSQL
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {pid: score + term_scores[pid] for pid, score in scores.items() if pid in term_scores}
+                if not scores:
+                    return []
+            if scores is None:
+                return []
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+            return [product_id for product_id, _ in ranked[:limit]]
+
+
+search_index = ProductSearchIndex()
+
+
+def _search_postgres(query, limit):
+    terms = tokenize(query)
+    if not terms:
+        return []
+    # Prefijo en cada palabra: "cafe:* & gran:*"
+    ts_query = func.to_tsquery("spanish", " & ".join(f"{term}:*" for term in terms))
+    # Misma expresión que el índice GIN ix_products_search para que el planner lo use;
+    # el documento va sin tildes igual que los términos (f_unaccent, ver la migración b7d2e4f9a163)
+    document = func.to_tsvector("spanish", func.f_unaccent(
+        func.coalesce(Product.name, "") + " " + func.coalesce(Product.description, "")))
+    similarity = func.similarity(Product.name, query)
+    rank = func.ts_rank_cd(document, ts_query) + similarity
+    rows = db.session.query(Product.id)\
+        .filter(or_(document.op("@@")(ts_query), similarity > TRGM_THRESHOLD))\
+        .order_by(rank.desc(), Product.id)\
+        .limit(limit)
+    return [product_id for product_id, in rows]
+
+
+def search_product_ids(query, limit):
+    """Ids de productos ordenados por relevancia"""
+    if db.engine.dialect.name == "postgresql":
+        return _search_postgres(query, limit)
+    return search_index.search(query, limit)
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_HASH_METHOD = "scrypt:32768:8:1"
+
+
+class HashPoolBusy(Exception):
+    """Todos los hilos de hashing están ocupados, la cola está llena o el hash no terminó a tiempo"""
+
+    def __init__(self, retry_after=1):
+        super().__init__("Servidor ocupado, intenta de nuevo")
+        self.retry_after = retry_after
+
+
+class HashPool:
+    """Pool acotado para calcular hashes fuera del hilo de la petición.
+
+    scrypt y pbkdf2 de hashlib liberan el GIL, así que los hilos corren en paralelo.
+    Si hay más trabajos que workers * queue_factor se rechaza al tiro (503) en vez de
+    acumular peticiones esperando. Un cupo se libera cuando el hash termina, no cuando
+    la petición deja de esperarlo, así que un hash que pasó el timeout sigue contando.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        workers = current_app.config.get("PASSWORD_HASH_WORKERS") or os.cpu_count() or 2
+        queue_factor = current_app.config.get("PASSWORD_HASH_QUEUE_FACTOR", 4)
+        self._slots = threading.BoundedSemaphore(workers * queue_factor)
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="password-hash")
+
+    def run(self, fn, *args):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._start()
+        if not self._slots.acquire(blocking=False):
+            raise HashPoolBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        timeout = current_app.config.get("PASSWORD_HASH_TIMEOUT", 10)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            raise HashPoolBusy(retry_after=timeout)
+
+
+hash_pool = HashPool()
+
+
+def hash_method():
+    return current_app.config.get("PASSWORD_HASH_METHOD", DEFAULT_HASH_METHOD)
+
+
+def hash_password(password):
+    return hash_pool.run(generate_password_hash, password, hash_method())
+
+
+def verify_password(password_hash, password):
+    if not password_hash:
+        return False
+    return hash_pool.run(check_password_hash, password_hash, password)
+
+
+@lru_cache(maxsize=8)
+def method_prefix(method):
+    """Prefijo que werkzeug escribe para el método ("scrypt" -> "scrypt:32768:8:1").
+
+    Se calcula una vez por proceso con un hash de prueba, así que también cubre los
+    parámetros por defecto de la versión instalada de werkzeug.
+    """
+    return generate_password_hash("", method).split("$", 1)[0]
+
+
+def needs_rehash(password_hash):
+    # El hash empieza con el método y sus parámetros: "scrypt:32768:8:1$sal$hash"
+    return bool(password_hash) and password_hash.split("$", 1)[0] != method_prefix(hash_method())
+
+
+class TokenBucket:
+    """Limitador por clave: `capacity` intentos seguidos y luego `rate` por segundo"""
+
+    def __init__(self, capacity, rate, max_keys=100000):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """Devuelve (permitido, segundos hasta el próximo intento)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return False, (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return True, 0
+
+    def _prune(self, now):
+        # Un balde que ya se habría llenado de nuevo es igual a no tenerlo
+        full = [key for key, (tokens, updated) in self._buckets.items()
+                if tokens + (now - updated) * self.rate >= self.capacity]
+        for key in full:
+            del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class LoginThrottle:
+    """Limita los intentos de login por email y por IP antes de calcular ningún hash"""
+
+    def __init__(self):
+        self.by_email = None
+        self.by_ip = None
+
+    def init_app(self, app):
+        self.by_email = TokenBucket(app.config.get("LOGIN_EMAIL_BURST", 5), app.config.get("LOGIN_EMAIL_RATE", 1 / 12))
+        self.by_ip = TokenBucket(app.config.get("LOGIN_IP_BURST", 20), app.config.get("LOGIN_IP_RATE", 1))
+
+    def check(self, email, ip):
+        """Devuelve 0 si se permite el intento o los segundos que hay que esperar"""
+        allowed, wait = self.by_ip.allow(ip)
+        if not allowed:
+            return wait
+        allowed, wait = self.by_email.allow(email.strip().lower())
+        return 0 if allowed else wait
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,160 @@
+"""Serialización rápida de las respuestas: JSON con orjson y filas sin objetos del ORM.
+
+Las rutas de lectura piden solo las columnas que devuelven (with_entities) y arman
+el dict recorriendo la tupla por posición, sin hidratar ni registrar cada objeto en
+la sesión. Los serialize() de models.py siguen sirviendo para las escrituras, que
+ya tienen el objeto cargado; ambos caminos deben producir el mismo JSON.
+"""
+import logging
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select
+from models import db, product_category, Product, Category, Review
+from pricing import peso_cl
+from images import srcset
+
+log = logging.getLogger(__name__)
+
+
+def isoformat(value):
+    return value.isoformat()
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify/request.json con orjson (escrito en Rust, varias veces más rápido).
+
+    Las fechas pasan por el mismo `default` que usa Flask para que el formato no
+    cambie respecto del proveedor estándar.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _encode(self, obj):
+        return self._orjson.dumps(obj, default=self.default, option=self._options)
+
+    def dumps(self, obj, **kwargs):
+        return self._encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Los bytes van directo al cuerpo, sin pasar por str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj), mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Elige el proveedor JSON según JSON_PROVIDER: orjson, default o auto (orjson si está instalado)"""
+    name = app.config.get("JSON_PROVIDER", "auto")
+    if name == "default":
+        return
+    try:
+        app.json = OrjsonProvider(app)
+    except ImportError:
+        if name == "orjson":
+            raise
+        log.info("orjson no está instalado, se usa el proveedor JSON de Flask")
+
+
+class RowSerializer:
+    """Convierte filas de with_entities en dicts sin crear objetos del ORM.
+
+    Cada campo es (nombre, columna) o (nombre, columna, conversión). Las columnas y
+    conversiones se calculan una sola vez; por fila solo se recorre la tupla.
+    """
+
+    def __init__(self, *fields):
+        self.names = tuple(field[0] for field in fields)
+        self.columns = tuple(field[1] for field in fields)
+        self.converters = tuple((index, field[2]) for index, field in enumerate(fields) if len(field) > 2)
+
+    def __call__(self, row):
+        values = list(row)
+        for index, convert in self.converters:
+            if values[index] is not None:
+                values[index] = convert(values[index])
+        return dict(zip(self.names, values))
+
+    def select(self, query):
+        return query.with_entities(*self.columns)
+
+
+CATEGORY = RowSerializer(
+    ("id", Category.id),
+    ("name", Category.name),
+    ("description", Category.description),
+)
+
+REVIEW = RowSerializer(
+    ("id", Review.id),
+    ("client_id", Review.client_id),
+    ("product_id", Review.product_id),
+    ("rating", Review.rating),
+    ("comment", Review.comment),
+    ("created_at", Review.created_at, isoformat),
+)
+
+# Orden fijo: serialize_product desempaqueta la fila en este mismo orden
+PRODUCT_COLUMNS = (
+    Product.id, Product.name, Product.description, Product.price, Product.discount,
+    Product.discount_expiration, Product.stock, Product.img, Product.img_status,
+    Product.img_variants, Product.created_at, Product.rating_count, Product.rating_avg,
+    Product.rating_1, Product.rating_2, Product.rating_3, Product.rating_4, Product.rating_5,
+)
+
+
+def product_rows(query):
+    return query.with_entities(*PRODUCT_COLUMNS)
+
+
+def categories_statement(product_ids):
+    return select(product_category.c.product_id, *CATEGORY.columns)\
+        .select_from(product_category)\
+        .join(Category, Category.id == product_category.c.category_id)\
+        .where(product_category.c.product_id.in_(product_ids))\
+        .order_by(Category.id)
+
+
+def group_categories(rows):
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row[0], []).append(CATEGORY(row[1:]))
+    return grouped
+
+
+def categories_by_product(product_ids):
+    """{product_id: [categoría serializada]} para todos los productos en una consulta"""
+    if not product_ids:
+        return {}
+    return group_categories(db.session.execute(categories_statement(product_ids)))
+
+
+def serialize_product(row, price, categories):
+    """Mismo resultado que Product.serialize a partir de una fila de PRODUCT_COLUMNS"""
+    (product_id, name, description, list_price, _, expiration, stock, img, img_status,
+     variants, created_at, rating_count, rating_avg, *histogram) = row
+    return {
+        "id": product_id,
+        "name": name,
+        "description": description,
+        "original_price": peso_cl(list_price),
+        "current_price": peso_cl(price.current),
+        "discount_percent": price.discount_percent,
+        "discount_ends": expiration.isoformat() if expiration else None,
+        "on_sale": price.on_sale,
+        "stock": stock,
+        "image_url": img,
+        "image_status": img_status,
+        "image_srcset": {fmt: srcset(urls) for fmt, urls in variants.items()} if variants else None,
+        "categories": categories,
+        "rating": {
+            "average": round(rating_avg or 0, 2),
+            "count": rating_count or 0,
+            "histogram": {str(stars): count or 0 for stars, count in enumerate(histogram, 1)}
+        },
+        "created_at": created_at.isoformat() if created_at else None
+    }
@@ -0,0 +1,113 @@
+"""Configuración de la app por entorno: APP_ENV=development|production|testing"""
+import os
+from datetime import timedelta
+from dotenv import load_dotenv
+
+# Antes de definir las clases: sus atributos se leen del entorno al importar
+load_dotenv()
+
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+class Config:
+    DEBUG = False
+    TESTING = False
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
+    JWT_SECRET_KEY = os.getenv('JWT_SECRET')
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=2)
+    CACHE_URL = os.getenv('CACHE_URL')
+    CACHE_TTL = env_int('CACHE_TTL', 300)
+    CACHE_MAX_ENTRIES = env_int('CACHE_MAX_ENTRIES', 1024)
+    # Versión de rol en caché (decorators.role_version): sin CACHE_URL cada worker la guarda
+    # ROLE_LOCAL_CACHE_TTL segundos, lo que puede tardar en rechazar a un admin degradado en otro worker
+    ROLE_CACHE_TTL = env_int('ROLE_CACHE_TTL', 60)
+    ROLE_LOCAL_CACHE_TTL = env_int('ROLE_LOCAL_CACHE_TTL', 5)
+    # Rutas registradas: public (catálogo, clientes, compras) y admin; los workers solo de catálogo usan public
+    APP_BLUEPRINTS = os.getenv('APP_BLUEPRINTS', 'public,admin')
+    # Índice de búsqueda en memoria (MySQL/SQLite): se rehace al menos cada SEARCH_INDEX_TTL segundos
+    SEARCH_INDEX_TTL = env_int('SEARCH_INDEX_TTL', 300)
+    IMAGE_UPLOADER = os.getenv('IMAGE_UPLOADER', 'cloudinary') # 'stub' para desarrollo local
+    CLOUDINARY_CLOUD_NAME = os.getenv('CLOUDINARY_CLOUD_NAME')
+    CLOUDINARY_API_KEY = os.getenv('CLOUDINARY_API_KEY')
+    CLOUDINARY_API_SECRET = os.getenv('CLOUDINARY_API_SECRET')
+    IMAGE_JOB_WORKERS = env_int('IMAGE_JOB_WORKERS', 2) # 0 si las imágenes las procesa worker.py
+    IMAGE_JOB_MAX_ATTEMPTS = env_int('IMAGE_JOB_MAX_ATTEMPTS', 5)
+    # Al cambiar el método, los hashes se actualizan en el siguiente login de cada cliente
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = env_int('PASSWORD_HASH_WORKERS', 0) or None
+    LOGIN_EMAIL_BURST = env_int('LOGIN_EMAIL_BURST', 5)
+    LOGIN_IP_BURST = env_int('LOGIN_IP_BURST', 20)
+    # Proxies de confianza delante de la app (nginx, balanceador): la IP del cliente se toma de
+    # X-Forwarded-For. Sin esto, detrás de un proxy todos los logins comparten el límite por IP
+    PROXY_FIX_X_FOR = env_int('PROXY_FIX_X_FOR', 0)
+    # Órdenes pendientes (transferencia sin pagar) se cancelan pasadas ORDER_EXPIRY_HOURS;
+    # ORDER_SWEEP_INTERVAL=0 si el barrido lo hace worker.py
+    ORDER_EXPIRY_HOURS = env_int('ORDER_EXPIRY_HOURS', 48)
+    ORDER_SWEEP_INTERVAL = env_int('ORDER_SWEEP_INTERVAL', 300)
+    ORDER_SWEEP_BATCH = env_int('ORDER_SWEEP_BATCH', 200)
+    LOW_STOCK_THRESHOLD = env_int('LOW_STOCK_THRESHOLD', 5) # Si el producto no tiene umbral propio
+    # auto: orjson si está instalado; orjson lo exige; default usa el json de la librería estándar
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'auto')
+    # Métricas por petición; /metrics solo existe si hay METRICS_TOKEN y exige "Authorization: Bearer <token>"
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    SLOW_QUERY_MS = env_int('SLOW_QUERY_MS', 200)
+    # Avisos de N+1: más de QUERY_COUNT_WARN consultas o una misma consulta más de REPEATED_QUERY_WARN veces
+    QUERY_COUNT_WARN = env_int('QUERY_COUNT_WARN', 20)
+    REPEATED_QUERY_WARN = env_int('REPEATED_QUERY_WARN', 5)
+
+    # Pool de conexiones por proceso: cada worker de gunicorn tiene el suyo, así que el
+    # total de conexiones es workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": env_int('DB_POOL_SIZE', 5),
+        "max_overflow": env_int('DB_MAX_OVERFLOW', 5),
+        "pool_timeout": env_int('DB_POOL_TIMEOUT', 10),
+        # MySQL corta las conexiones inactivas (wait_timeout); se reciclan antes
+        "pool_recycle": env_int('DB_POOL_RECYCLE', 1800),
+        # Descarta las conexiones muertas (reinicio de la BD, failover) antes de usarlas
+        "pool_pre_ping": True,
+    }
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+
+
+class ProductionConfig(Config):
+    REQUIRED = ('SQLALCHEMY_DATABASE_URI', 'JWT_SECRET_KEY')
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite://')
+    JWT_SECRET_KEY = os.getenv('JWT_SECRET', 'testing-secret-key-de-al-menos-32-bytes')
+    IMAGE_UPLOADER = 'stub'
+    IMAGE_JOB_WORKERS = 0
+    ORDER_SWEEP_INTERVAL = 0
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000' # Rápido: en pruebas no importa la seguridad
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+
+
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
+
+
+def get_config(name=None):
+    name = name or os.getenv('APP_ENV', 'development')
+    try:
+        return CONFIGS[name]
+    except KeyError:
+        raise RuntimeError(f"APP_ENV desconocido: {name} (usa {', '.join(CONFIGS)})")
+
+
+def engine_options(uri, options):
+    """SQLite en memoria no usa QueuePool y rechaza los parámetros de tamaño del pool"""
+    if uri and uri.startswith('sqlite') and (uri in ('sqlite://', 'sqlite:///:memory:') or ':memory:' in uri):
+        return {key: value for key, value in options.items() if key == 'pool_pre_ping'}
+    return options
@@ -0,0 +1,73 @@
+import os
+import shutil
+import threading
+import uuid
+
+
+class CloudinaryUploader:
+    """Sube y borra imágenes en Cloudinary.
+
+    El SDK se importa y configura en la primera subida o borrado, no al crear la app,
+    así que los procesos que nunca tocan imágenes no lo cargan.
+    """
+
+    def __init__(self, cloud_name=None, api_key=None, api_secret=None):
+        self.credentials = {"cloud_name": cloud_name, "api_key": api_key, "api_secret": api_secret}
+        self._uploader = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._uploader is None:
+            with self._lock:
+                if self._uploader is None:
+                    import cloudinary
+                    import cloudinary.uploader
+                    cloudinary.config(**self.credentials, secure=True)
+                    self._uploader = cloudinary.uploader
+        return self._uploader
+
+    def upload(self, path, folder):
+        result = self.client.upload(path, folder=folder)
+        return result['secure_url']
+
+    def destroy(self, public_id):
+        self.client.destroy(public_id)
+
+
+class StubUploader:
+    """Reemplazo local de Cloudinary para desarrollo y pruebas.
+
+    Copia los archivos a `directory` y devuelve una URL con la misma forma que las de
+    Cloudinary, para que obtener_public_id siga funcionando. `fail_times` hace fallar
+    las primeras subidas y así se pueden probar los reintentos.
+    """
+
+    def __init__(self, directory, base_url="https://stub.local/image/upload", fail_times=0):
+        self.directory = directory
+        self.base_url = base_url
+        self.fail_times = fail_times
+        self.destroyed = []
+        os.makedirs(directory, exist_ok=True)
+
+    def upload(self, path, folder):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise ConnectionError("Fallo simulado al subir la imagen")
+        name = uuid.uuid4().hex + os.path.splitext(path)[1]
+        os.makedirs(os.path.join(self.directory, folder), exist_ok=True)
+        shutil.copyfile(path, os.path.join(self.directory, folder, name))
+        return f"{self.base_url}/{folder}/{name}"
+
+    def destroy(self, public_id):
+        self.destroyed.append(public_id)
+        for name in os.listdir(os.path.join(self.directory, os.path.dirname(public_id) or ".")):
+            if os.path.splitext(name)[0] == os.path.basename(public_id):
+                os.remove(os.path.join(self.directory, os.path.dirname(public_id), name))
+
+
+def create_uploader(app):
+    if app.config.get('IMAGE_UPLOADER') == 'stub':
+        return StubUploader(app.config.get('STUB_UPLOAD_DIR') or os.path.join(app.instance_path, 'uploads'))
+    return CloudinaryUploader(app.config.get('CLOUDINARY_CLOUD_NAME'), app.config.get('CLOUDINARY_API_KEY'),
+                              app.config.get('CLOUDINARY_API_SECRET'))
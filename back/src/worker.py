@@ -0,0 +1,45 @@
+"""Procesa la cola de imágenes y el barrido de órdenes vencidas en un proceso aparte: python worker.py
+
+Con este worker corriendo, la app se levanta con IMAGE_JOB_WORKERS=0 y ORDER_SWEEP_INTERVAL=0.
+El intervalo del barrido en el worker es WORKER_SWEEP_INTERVAL (por defecto 300 s), aparte
+del de la app para que ambos puedan compartir el mismo entorno.
+"""
+import os
+import time
+import logging
+from app import create_app
+from jobs import image_jobs
+from expiry import order_sweeper
+
+# El worker procesa la cola y barre las órdenes él mismo, sin los hilos de la app
+app = create_app(IMAGE_JOB_WORKERS=0, ORDER_SWEEP_INTERVAL=0)
+
+logger = logging.getLogger("worker")
+
+
+def work(interval, sweep_interval):
+    """Un error (p. ej. la BD caída) se registra y el ciclo sigue; no termina el worker"""
+    next_sweep = time.monotonic()
+    while True:
+        if time.monotonic() >= next_sweep:
+            next_sweep = time.monotonic() + sweep_interval
+            try:
+                order_sweeper.sweep_once()
+            except Exception:
+                logger.exception("Error cancelando órdenes vencidas")
+        try:
+            pending = image_jobs.poll_once()
+        except Exception:
+            logger.exception("Error revisando la cola de imágenes")
+            pending = 0
+        if not pending:
+            time.sleep(interval)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    interval = float(os.getenv('IMAGE_JOB_POLL_INTERVAL', 2))
+    sweep_interval = float(os.getenv('WORKER_SWEEP_INTERVAL', 300))
+    if sweep_interval <= 0:
+        sweep_interval = 300
+    work(interval, sweep_interval)
@@ -0,0 +1,73 @@
+import os
+import time
+import pytest
+from app import create_app
+from models import db, Client
+from decorators import create_client_token
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App de pruebas sobre una BD en archivo (varios hilos comparten la misma BD).
+
+    TEST_DATABASE_URL permite correr las pruebas contra PostgreSQL o MySQL; se borran sus tablas.
+    """
+    uri = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{tmp_path / 'test.db'}"
+    app = create_app("testing", SQLALCHEMY_DATABASE_URI=uri, SLOW_QUERY_MS=None)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin(app):
+    """(id, headers con el token) de un administrador"""
+    with app.app_context():
+        admin = Client(email="admin@insomnia.cl", name="Admin", admin=True, role_version=0)
+        admin.set_password("secreto")
+        db.session.add(admin)
+        db.session.commit()
+        return admin.id, {"Authorization": f"Bearer {create_client_token(admin)}"}
+
+
+class FakeRedis:
+    """Lo mínimo de redis.Redis que usa RedisCache, en un dict compartido"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value = self.data.get(key)
+        if value is None or value[0] < time.monotonic():
+            return None
+        return value[1]
+
+    def setex(self, key, ttl, value):
+        self.data[key] = (time.monotonic() + ttl, value)
+
+    def incr(self, key):
+        value = int(self.get(key) or 0) + 1
+        self.data[key] = (float("inf"), value)
+        return value
+
+    def scan_iter(self, pattern):
+        prefix = pattern.rstrip("*")
+        return [key for key in list(self.data) if key.startswith(prefix)]
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
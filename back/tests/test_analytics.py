@@ -0,0 +1,104 @@
+from datetime import timedelta
+import pytest
+from models import db, Product, Category, Coupon, DailySales, ProductSales, CategorySales, CouponUsage
+from inventory import adjust
+from pricing import utc_now
+from coupons import active_coupons
+from analytics import backfill
+
+
+@pytest.fixture(autouse=True)
+def fresh_coupons():
+    active_coupons.clear()
+    yield
+    active_coupons.clear()
+
+
+@pytest.fixture
+def catalog(app):
+    """(id del café, id del té con dos categorías)"""
+    with app.app_context():
+        cafe, te = Category(name="Café"), Category(name="Té")
+        grano = Product(name="Café de grano", price=1000, stock=0, categories=[cafe])
+        mezcla = Product(name="Té con café", price=500, stock=0, categories=[cafe, te])
+        now = utc_now()
+        db.session.add_all([grano, mezcla, Coupon(code="INSOMNIA", discount=10, discount_type="percentage",
+                                                  valid_from=now - timedelta(days=1),
+                                                  valid_to=now + timedelta(days=1), max_uses=10)])
+        db.session.flush()
+        adjust(grano.id, 10, 'restock')
+        adjust(mezcla.id, 10, 'restock')
+        db.session.commit()
+        return grano.id, mezcla.id
+
+
+def place(client, items, coupon_code=None):
+    response = client.post('/api/orders', json={
+        "items": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in items],
+        "shipping_address": "Av. Siempre Viva 742",
+        "coupon_code": coupon_code
+    })
+    assert response.status_code == 201
+    return response.get_json()["order"]["id"]
+
+
+def set_status(client, headers, order_id, status):
+    response = client.put(f'/api/orders/{order_id}/status', headers=headers, json={"status": status})
+    assert response.status_code == 200
+
+
+def report(client, headers, name):
+    response = client.get(f'/api/admin/analytics/{name}', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def rollups():
+    return {
+        "daily": sorted((row.day, row.orders, row.units, row.revenue) for row in DailySales.query if row.orders),
+        "products": sorted((row.product_id, row.units, row.revenue) for row in ProductSales.query if row.units),
+        "categories": sorted((row.category_id, row.units, row.revenue) for row in CategorySales.query if row.units),
+        "coupons": sorted((row.coupon_id, row.orders, row.discount_total) for row in CouponUsage.query if row.orders),
+    }
+
+
+def test_rollups_follow_status_changes(app, client, admin, catalog):
+    _, headers = admin
+    grano, mezcla = catalog
+    with_coupon = place(client, [(grano, 2), (mezcla, 1)], "INSOMNIA")
+    cancelled = place(client, [(grano, 1)], "INSOMNIA")
+    place(client, [(mezcla, 3)])  # queda pendiente: no cuenta como venta
+
+    set_status(client, headers, with_coupon, "paid")
+    set_status(client, headers, with_coupon, "shipped")
+    set_status(client, headers, cancelled, "paid")
+    set_status(client, headers, cancelled, "cancelled")
+
+    [day] = report(client, headers, "daily")
+    assert (day["orders"], day["units"], day["revenue"]) == (1, 3, 2250)
+    products = {row["product_id"]: (row["units"], row["revenue"]) for row in report(client, headers, "products")}
+    assert products == {grano: (2, 2000), mezcla: (1, 500)}
+    categories = {row["name"]: (row["units"], row["revenue"]) for row in report(client, headers, "categories")}
+    assert categories == {"Café": (3, 2500), "Té": (1, 500)}
+    [coupon] = report(client, headers, "coupons")
+    assert (coupon["code"], coupon["orders"], coupon["discount_total"]) == ("INSOMNIA", 1, 250)
+
+
+def test_incremental_rollups_match_backfill(app, client, admin, catalog):
+    _, headers = admin
+    grano, mezcla = catalog
+    orders = [
+        place(client, [(grano, 1), (mezcla, 2)], "INSOMNIA"),
+        place(client, [(grano, 3)]),
+        place(client, [(mezcla, 1)], "INSOMNIA"),
+        place(client, [(grano, 1)]),
+    ]
+    for order_id, statuses in zip(orders, (["paid"], ["paid", "cancelled"], ["paid", "shipped"],
+                                           ["cancelled", "pending", "paid"])):
+        for status in statuses:
+            set_status(client, headers, order_id, status)
+
+    with app.app_context():
+        incremental = rollups()
+        assert backfill(batch_size=2) == 3
+        assert rollups() == incremental
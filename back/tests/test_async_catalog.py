@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from async_catalog import CatalogApp
+from models import db, Category
+
+CORS_HEADERS = ("access-control-allow-origin", "access-control-allow-headers", "access-control-allow-methods", "vary")
+ORIGIN = "https://tienda.insomnia.cl"
+
+
+def call_asgi(app, method, path, headers):
+    """Una petición HTTP a la app ASGI; devuelve (estado, encabezados)"""
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"",
+             "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await app(scope, receive, send)
+        await app.engine.dispose()
+
+    asyncio.run(run())
+    start = messages[0]
+    return start["status"], {name.decode(): value.decode() for name, value in start["headers"]}
+
+
+def cors(headers):
+    return {name.lower(): value for name, value in headers.items() if name.lower() in CORS_HEADERS}
+
+
+@pytest.fixture
+def catalog(app):
+    with app.app_context():
+        db.session.add(Category(name="Café"))
+        db.session.commit()
+    return CatalogApp("testing", SQLALCHEMY_DATABASE_URI=app.config["SQLALCHEMY_DATABASE_URI"])
+
+
+@pytest.mark.parametrize("method, headers", [
+    ("GET", {}),
+    ("GET", {"Origin": ORIGIN}),
+    ("OPTIONS", {"Origin": ORIGIN, "Access-Control-Request-Method": "GET",
+                 "Access-Control-Request-Headers": "If-None-Match, Authorization"}),
+    ("OPTIONS", {"Origin": ORIGIN, "Access-Control-Request-Method": "GET"}),
+])
+@pytest.mark.parametrize("path", ["/", "/api/categories", "/api/products"])
+def test_cors_headers_match_flask(client, catalog, method, headers, path):
+    flask_response = client.open(path, method=method, headers=headers)
+    status, asgi_headers = call_asgi(catalog, method, path, headers)
+    assert status == flask_response.status_code == 200
+    assert cors(asgi_headers) == cors(dict(flask_response.headers))
+    assert cors(asgi_headers)["access-control-allow-origin"] in ("*", ORIGIN)
+
+
+def test_cors_headers_on_not_found(client, catalog):
+    status, headers = call_asgi(catalog, "GET", "/api/products/999", {"Origin": ORIGIN})
+    assert status == 404 == client.get('/api/products/999', headers={"Origin": ORIGIN}).status_code
+    assert cors(headers) == {"access-control-allow-origin": ORIGIN, "vary": "Origin"}
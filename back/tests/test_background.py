@@ -0,0 +1,30 @@
+import threading
+import pytest
+import app as app_module
+from app import create_app
+
+
+def background_threads():
+    return {thread.name for thread in threading.enumerate()} & {"order-sweeper", "image-jobs-poller"}
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    def make(**overrides):
+        return create_app("testing", SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'background.db'}",
+                          SLOW_QUERY_MS=None, ORDER_SWEEP_INTERVAL=3600, IMAGE_JOB_WORKERS=1,
+                          IMAGE_JOB_POLL_INTERVAL=3600, **overrides)
+    return make
+
+
+def test_flask_cli_starts_no_threads_until_a_request(make_app, monkeypatch):
+    monkeypatch.setattr(app_module, "running_flask_cli", lambda: True)
+    before = threading.active_count()
+    app = make_app()
+    assert threading.active_count() == before  # flask db upgrade, flask orders-expire...
+    # flask run: arrancan con la primera petición
+    assert app.test_client().get('/').status_code == 200
+    assert background_threads() == {"order-sweeper", "image-jobs-poller"}
+    running = threading.active_count()
+    app.test_client().get('/')
+    assert threading.active_count() == running
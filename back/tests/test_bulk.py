@@ -0,0 +1,80 @@
+import io
+import json
+import pytest
+from models import db, Category, Product
+
+
+@pytest.fixture
+def categories(app):
+    with app.app_context():
+        db.session.add_all([Category(name="Té"), Category(name="Café")])
+        db.session.commit()
+
+
+@pytest.mark.parametrize("product", [
+    {"name": "Café", "price": -1},
+    {"name": "Café", "price": 10, "stock": -5},
+    {"name": "Café", "price": "gratis"},
+    {"name": "Café", "price": "nan"},
+    {"name": "Café", "price": float("inf")},
+    {"name": "Café", "price": 10, "discount": "-inf"},
+])
+def test_bulk_upsert_rejects_invalid_values(client, admin, product):
+    _, headers = admin
+    response = client.put('/api/admin/products/bulk', headers=headers, json={"products": [product]})
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Fila 0:")
+
+
+def test_import_errors_sorted_by_line(client, admin, categories):
+    _, headers = admin
+    lines = [
+        "name,price,stock,categories",
+        "Café de grano,5990,3,Café",
+        "Té verde,1990,1,Hierbas",   # categoría desconocida: se detecta al consultar la BD
+        "Té negro,-1,1,Té",          # mal formada: se detecta al leer la fila
+    ]
+    response = client.post('/api/admin/products/import?format=csv', headers=headers,
+                           data={"file": (io.BytesIO("\n".join(lines).encode()), "catalogo.csv")})
+    assert response.status_code == 200
+    assert [error["line"] for error in response.get_json()["errors"]] == [3, 4]
+
+
+def test_export_order_is_deterministic(app, client, admin, categories):
+    _, headers = admin
+    with app.app_context():
+        te, cafe = Category.query.filter_by(name="Té").one(), Category.query.filter_by(name="Café").one()
+        db.session.add_all([
+            Product(name="Té verde", price=1, stock=0, categories=[te]),
+            Product(name="Sin categoría", price=1, stock=0),
+            Product(name="Café de grano", price=1, stock=0, categories=[te, cafe]),
+            Product(name="Café molido", price=1, stock=0, categories=[cafe]),
+        ])
+        db.session.commit()
+    response = client.get('/api/admin/products/export?format=ndjson', headers=headers)
+    lines = response.get_data(as_text=True).splitlines()
+    assert [line.split('"name": "')[1].split('"')[0] for line in lines] == [
+        "Sin categoría", "Café de grano", "Café molido", "Té verde"]
+    assert '"categories": ["Café", "Té"]' in lines[1]
+
+
+def test_import_reports_malformed_rows(app, client, admin, categories):
+    _, headers = admin
+    rows = [
+        {"name": 5, "price": 1},
+        {"name": "Té verde", "price": 1, "categories": [1]},
+        {"name": "Té negro", "price": "nan"},
+        {"name": "Té rojo", "price": "inf"},
+        {"name": "Té blanco", "price": 1, "description": {"texto": "suave"}},
+        {"name": "Té azul", "price": 1, "image_url": ["https://example.com/a.png"]},
+        {"name": "Café de grano", "price": 5990, "categories": ["Café"]},
+    ]
+    data = "\n".join(json.dumps(row) for row in rows).encode()
+    response = client.post('/api/admin/products/import?format=ndjson', headers=headers,
+                           data={"file": (io.BytesIO(data), "catalogo.ndjson")})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["imported"] == 1
+    assert [error["line"] for error in result["errors"]] == [1, 2, 3, 4, 5, 6]
+    with app.app_context():
+        assert [product.name for product in Product.query] == ["Café de grano"]
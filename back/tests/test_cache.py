@@ -0,0 +1,78 @@
+import pytest
+from models import db, Product
+from cache import cache, init_cache, RedisCache
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, app, fake_redis):
+    """Las pruebas de respuestas corren con la caché en memoria y con la compartida"""
+    if request.param == "redis":
+        init_cache(app, client=fake_redis)
+    return request.param
+
+
+@pytest.fixture
+def product_id(app):
+    with app.app_context():
+        product = Product(name="Café de grano", price=5990, stock=3)
+        db.session.add(product)
+        db.session.commit()
+        return product.id
+
+
+def test_redis_cache_get_set_and_generation(fake_redis):
+    redis_cache = RedisCache(fake_redis, default_ttl=60)
+    assert redis_cache.get("products:0:/api/products") is None
+    redis_cache.set("products:0:/api/products", {"body": "[]", "etag": "abc"})
+    assert redis_cache.get("products:0:/api/products") == {"body": "[]", "etag": "abc"}
+
+    assert redis_cache.generation("products") == 0
+    redis_cache.bump("products")
+    redis_cache.bump("products")
+    assert redis_cache.generation("products") == 2
+    assert redis_cache.generation("categories") == 0
+
+    redis_cache.set("corto", 1, ttl=-1)
+    assert redis_cache.get("corto") is None
+    redis_cache.clear()
+    assert redis_cache.get("products:0:/api/products") is None
+    assert redis_cache.generation("products") == 0
+
+
+def test_matching_etag_returns_304(client, backend, product_id):
+    response = client.get(f'/api/products/{product_id}')
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get(f'/api/products/{product_id}', headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert response.headers["ETag"] == etag
+
+    response = client.get(f'/api/products/{product_id}', headers={"If-None-Match": '"otro"'})
+    assert response.status_code == 200
+
+
+def test_admin_write_bumps_generation(app, client, admin, backend, product_id):
+    _, headers = admin
+    response = client.get(f'/api/products/{product_id}')
+    etag = response.headers["ETag"]
+    with app.app_context():
+        products, categories = cache.generation("products"), cache.generation("categories")
+
+    response = client.post(f'/api/admin/products/{product_id}/stock', headers=headers, json={"quantity": 2})
+    assert response.status_code == 200
+    with app.app_context():
+        assert cache.generation("products") > products
+        assert cache.generation("categories") == categories
+
+    # La respuesta vieja ya no se sirve: cambia el cuerpo y el ETag
+    response = client.get(f'/api/products/{product_id}', headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json()["stock"] == 5
+    assert response.headers["ETag"] != etag
+
+    response = client.post('/api/categories', headers=headers, json={"name": "Té"})
+    assert response.status_code == 201
+    with app.app_context():
+        assert cache.generation("categories") > categories
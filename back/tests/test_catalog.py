@@ -0,0 +1,77 @@
+from datetime import timedelta
+import pytest
+from models import db, Product, Category
+from pricing import utc_now
+
+
+@pytest.fixture
+def catalog(app):
+    """Ids de categorías y productos por nombre"""
+    with app.app_context():
+        cafe, te = Category(name="Café"), Category(name="Té")
+        yesterday = utc_now() - timedelta(days=1)
+        db.session.add_all([
+            Product(name="Café de grano", price=5990, stock=3, discount=10, rating_avg=4.5, categories=[cafe]),
+            Product(name="Café molido", price=3990, stock=0, rating_avg=3, categories=[cafe]),
+            Product(name="Té verde", price=1990, stock=5, discount=20, discount_expiration=yesterday,
+                    rating_avg=4, categories=[te]),
+            Product(name="Té negro", price=2490, stock=2, categories=[te]),
+        ])
+        db.session.commit()
+        return {item.name: item.id for item in Category.query.all() + Product.query.all()}
+
+
+def names(client, query):
+    response = client.get(f'/api/products?{query}')
+    assert response.status_code == 200
+    return [product["name"] for product in response.get_json()["products"]]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("category={Café}", {"Café de grano", "Café molido"}),
+    ("on_sale=true", {"Café de grano"}),
+    ("on_sale=false", {"Café molido", "Té verde", "Té negro"}),
+    ("in_stock=true", {"Café de grano", "Té verde", "Té negro"}),
+    ("in_stock=FALSE", {"Café molido"}),
+    ("min_price=2000&max_price=4000", {"Café molido", "Té negro"}),
+    ("min_rating=4", {"Café de grano", "Té verde"}),
+    ("category={Café}&in_stock=true", {"Café de grano"}),
+    ("category={Té}&on_sale=false&max_price=2000", {"Té verde"}),
+])
+def test_filters(client, catalog, query, expected):
+    assert set(names(client, query.format(**catalog))) == expected
+
+
+@pytest.mark.parametrize("query", ["in_stock=yes", "on_sale=1", "in_stock=", "min_price=barato", "min_rating=alta"])
+def test_invalid_filters_return_400(client, catalog, query):
+    response = client.get(f'/api/products?{query}')
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Filtros inválidos"}
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("sort=price_asc&in_stock=true", ["Té verde", "Té negro", "Café de grano"]),
+    ("sort=price_desc&category={Té}", ["Té negro", "Té verde"]),
+    ("sort=name", ["Café de grano", "Café molido", "Té negro", "Té verde"]),
+    ("sort=rating&category={Café}", ["Café de grano", "Café molido"]),
+    ("sort=rating&on_sale=false", ["Té verde", "Café molido", "Té negro"]),
+])
+def test_sort_with_filters(client, catalog, query, expected):
+    assert names(client, query.format(**catalog)) == expected
+
+
+@pytest.mark.parametrize("sort", ["id", "newest", "price_asc", "price_desc", "name", "rating"])
+def test_sort_pages_cover_the_filtered_catalog(client, catalog, sort):
+    # Con páginas de 1 el cursor de cada orden recorre los mismos productos que una sola página
+    seen, cursor = [], None
+    while True:
+        response = client.get(f'/api/products?sort={sort}&in_stock=true&limit=1'
+                              + (f'&cursor={cursor}' if cursor else ''))
+        assert response.status_code == 200
+        page = response.get_json()
+        seen += [product["name"] for product in page["products"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == names(client, f'sort={sort}&in_stock=true')
+    assert len(seen) == 3
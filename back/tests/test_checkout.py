@@ -0,0 +1,60 @@
+import threading
+from sqlalchemy import func
+from models import db, Product, StockMovement
+from inventory import adjust
+
+STOCK = 10
+BUYERS = 30
+
+
+def test_parallel_orders_never_oversell(app):
+    with app.app_context():
+        product = Product(name="Café de grano", price=1000, stock=0)
+        db.session.add(product)
+        db.session.flush()
+        adjust(product.id, STOCK, 'restock')
+        db.session.commit()
+        product_id = product.id
+
+    barrier = threading.Barrier(BUYERS)
+    statuses = []
+    lowest = [STOCK]
+    done = threading.Event()
+
+    def buy():
+        client = app.test_client()
+        barrier.wait()
+        response = client.post('/api/orders', json={
+            "items": [{"product_id": product_id, "quantity": 1}],
+            "shipping_address": "Av. Siempre Viva 742"
+        })
+        statuses.append(response.status_code)
+
+    def watch_stock():
+        # Lee el saldo mientras compiten las órdenes: nunca debe quedar negativo
+        with app.app_context():
+            while not done.is_set():
+                stock = db.session.query(Product.stock).filter(Product.id == product_id).scalar()
+                lowest[0] = min(lowest[0], stock)
+                db.session.rollback()
+
+    watcher = threading.Thread(target=watch_stock)
+    watcher.start()
+    buyers = [threading.Thread(target=buy) for _ in range(BUYERS)]
+    for thread in buyers:
+        thread.start()
+    for thread in buyers:
+        thread.join()
+    done.set()
+    watcher.join()
+
+    assert statuses.count(201) == STOCK
+    assert set(statuses) <= {201, 400, 409}
+    assert lowest[0] >= 0
+    with app.app_context():
+        product = db.session.get(Product, product_id)
+        assert product.stock == 0
+        assert product.reserved == STOCK
+        ledger = db.session.query(func.sum(StockMovement.stock_delta))\
+                           .filter(StockMovement.product_id == product_id).scalar()
+        assert ledger == product.stock
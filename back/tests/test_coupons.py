@@ -0,0 +1,88 @@
+import threading
+from datetime import timedelta
+import pytest
+from models import db, Product, Coupon
+from inventory import adjust
+from pricing import utc_now
+from coupons import active_coupons
+
+BUYERS = 10
+
+
+@pytest.fixture(autouse=True)
+def fresh_coupons():
+    # La caché de cupones es del proceso y cada prueba crea otra BD
+    active_coupons.clear()
+    yield
+    active_coupons.clear()
+
+
+def add_coupon(app, **fields):
+    with app.app_context():
+        now = utc_now()
+        coupon = Coupon(code="INSOMNIA", discount=10, discount_type="percentage",
+                        valid_from=now - timedelta(days=1), valid_to=now + timedelta(days=1), **fields)
+        db.session.add(coupon)
+        db.session.commit()
+        return coupon.id
+
+
+def test_single_use_coupon_under_parallel_orders(app):
+    with app.app_context():
+        product = Product(name="Café de grano", price=1000, stock=0)
+        db.session.add(product)
+        db.session.flush()
+        adjust(product.id, BUYERS, 'restock')
+        db.session.commit()
+        product_id = product.id
+    coupon_id = add_coupon(app, max_uses=1, current_uses=0)
+
+    barrier = threading.Barrier(BUYERS)
+    statuses = []
+
+    def buy():
+        client = app.test_client()
+        barrier.wait()
+        response = client.post('/api/orders', json={
+            "items": [{"product_id": product_id, "quantity": 1}],
+            "shipping_address": "Av. Siempre Viva 742",
+            "coupon_code": "INSOMNIA"
+        })
+        statuses.append(response.status_code)
+
+    buyers = [threading.Thread(target=buy) for _ in range(BUYERS)]
+    for thread in buyers:
+        thread.start()
+    for thread in buyers:
+        thread.join()
+
+    assert statuses.count(201) == 1
+    assert set(statuses) <= {201, 409}
+    with app.app_context():
+        assert db.session.get(Coupon, coupon_id).current_uses == 1
+        # Las órdenes rechazadas no dejan stock reservado
+        assert db.session.get(Product, product_id).reserved == 1
+
+
+def test_coupon_cache_sees_admin_edit(app, client):
+    coupon_id = add_coupon(app)
+    response = client.get('/api/coupons/validate?code=INSOMNIA&subtotal=1000')
+    assert response.get_json()["estimated_discount"] == 100
+
+    with app.app_context():
+        db.session.get(Coupon, coupon_id).discount = 25
+        db.session.commit()
+    response = client.get('/api/coupons/validate?code=INSOMNIA&subtotal=1000')
+    assert response.get_json()["estimated_discount"] == 250
+
+    with app.app_context():
+        db.session.delete(db.session.get(Coupon, coupon_id))
+        db.session.commit()
+    assert client.get('/api/coupons/validate?code=INSOMNIA').status_code == 404
+
+
+@pytest.mark.parametrize("subtotal", ["nan", "inf", "-inf"])
+def test_validate_coupon_rejects_non_finite_subtotal(app, client, subtotal):
+    add_coupon(app)
+    response = client.get(f'/api/coupons/validate?code=INSOMNIA&subtotal={subtotal}')
+    assert response.status_code == 400
@@ -0,0 +1,52 @@
+from datetime import timedelta
+from sqlalchemy import func
+from models import db, Product, Order, StockMovement
+from inventory import adjust
+from pricing import utc_now
+
+STOCK = 10
+
+
+def test_sweep_cancels_expired_orders_in_batches(app, client):
+    with app.app_context():
+        product = Product(name="Café de grano", price=1000, stock=0)
+        db.session.add(product)
+        db.session.flush()
+        adjust(product.id, STOCK, 'restock')
+        db.session.commit()
+        product_id = product.id
+
+    order_ids = []
+    for quantity in (1, 2, 3, 1):
+        response = client.post('/api/orders', json={
+            "items": [{"product_id": product_id, "quantity": quantity}],
+            "shipping_address": "Av. Siempre Viva 742"
+        })
+        assert response.status_code == 201
+        order_ids.append(response.get_json()["order"]["id"])
+
+    with app.app_context():
+        # Las tres primeras pasan el plazo; la última sigue vigente
+        for hours, order_id in zip((72, 60, 50), order_ids):
+            db.session.get(Order, order_id).date = utc_now() - timedelta(hours=hours)
+        db.session.commit()
+        sweeper = app.extensions['order_sweeper']
+
+        assert sweeper.sweep(batch_size=2, max_batches=1) == 2
+        statuses = dict(db.session.query(Order.id, Order.status))
+        assert [statuses[order_id] for order_id in order_ids] == ['cancelled', 'cancelled', 'pending', 'pending']
+
+        assert sweeper.sweep(batch_size=2) == 1
+        assert sweeper.sweep(batch_size=2) == 0
+        statuses = dict(db.session.query(Order.id, Order.status))
+        assert [statuses[order_id] for order_id in order_ids] == ['cancelled', 'cancelled', 'cancelled', 'pending']
+
+        product = db.session.get(Product, product_id)
+        assert product.reserved == 1
+        assert product.stock == STOCK - 1
+        releases = db.session.query(func.count(StockMovement.id))\
+                             .filter(StockMovement.product_id == product_id, StockMovement.kind == 'release').scalar()
+        assert releases == 3
+        ledger = db.session.query(func.sum(StockMovement.stock_delta))\
+                           .filter(StockMovement.product_id == product_id).scalar()
+        assert ledger == product.stock
@@ -0,0 +1,76 @@
+import io
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from PIL import Image
+import jobs
+from jobs import image_jobs
+
+PUBLIC_HOST = "imagenes.example.com"
+
+
+def png():
+    data = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(data, "PNG")
+    return data.getvalue()
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metadata":
+            self.send_response(302)
+            self.send_header("Location", "http://169.254.169.254/latest/meta-data/")
+            self.end_headers()
+            return
+        body = png() if self.path == "/cafe.png" else b"\0" * 4096
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(app, tmp_path, monkeypatch):
+    """Servidor local que se hace pasar por un host público"""
+    app.config.update(IMAGE_SPOOL_DIR=str(tmp_path / "spool"), IMAGE_MAX_BYTES=1024)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    check = jobs.public_address
+    monkeypatch.setattr(jobs, "public_address", lambda host, port: "127.0.0.1" if host == PUBLIC_HOST else check(host, port))
+    yield f"http://{PUBLIC_HOST}:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/cafe.png",
+    "http://localhost/cafe.png",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://10.0.0.5/cafe.png",
+    "http://[::1]/cafe.png",
+    "http://[::ffff:127.0.0.1]/cafe.png",
+    "file:///etc/passwd",
+])
+def test_download_rejects_internal_urls(app, url):
+    with app.app_context(), pytest.raises(ValueError):
+        image_jobs.download(url)
+
+
+def test_download_from_public_host(app, server):
+    with app.app_context():
+        path = image_jobs.download(server + "/cafe.png")
+    assert os.path.getsize(path) == len(png())
+
+
+def test_download_rejects_redirect_to_internal_address(app, server):
+    with app.app_context(), pytest.raises(ValueError, match="interna"):
+        image_jobs.download(server + "/metadata")
+
+
+def test_download_rejects_oversized_image(app, server):
+    with app.app_context(), pytest.raises(ValueError, match="tamaño"):
+        image_jobs.download(server + "/grande.png")
+    assert os.listdir(app.config["IMAGE_SPOOL_DIR"]) == []
@@ -0,0 +1,47 @@
+import pytest
+from app import create_app
+from models import db, Client
+
+
+@pytest.fixture
+def customer(app):
+    with app.app_context():
+        client = Client(email="cliente@insomnia.cl", name="Cliente", admin=False)
+        client.set_password("secreto")
+        db.session.add(client)
+        db.session.commit()
+
+
+@pytest.mark.parametrize("body", [
+    {"email": 1, "password": "secreto"},
+    {"email": "cliente@insomnia.cl", "password": ["secreto"]},
+    {"email": {"$ne": ""}, "password": "x"},
+    ["cliente@insomnia.cl", "secreto"],
+    {},
+])
+def test_login_rejects_malformed_body(client, body):
+    assert client.post('/api/login', json=body).status_code == 400
+
+
+def test_login(client, customer):
+    assert client.post('/api/login', json={"email": "cliente@insomnia.cl", "password": "malo"}).status_code == 401
+    response = client.post('/api/login', json={"email": "cliente@insomnia.cl", "password": "secreto"})
+    assert response.status_code == 200
+    assert response.get_json()["access_token"]
+
+
+
+@pytest.mark.parametrize("x_for, statuses", [(0, [401, 401, 429]), (1, [401, 401, 401])])
+def test_login_throttle_ip_behind_proxy(tmp_path, x_for, statuses):
+    app = create_app("testing", SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'proxy.db'}",
+                     PROXY_FIX_X_FOR=x_for, LOGIN_IP_BURST=2)
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+
+    def attempt(ip):
+        # Todas las peticiones llegan desde el proxy (10.0.0.1), que agrega la IP real
+        return client.post('/api/login', json={"email": f"{ip}@insomnia.cl", "password": "x"},
+                           headers={"X-Forwarded-For": ip}, environ_base={"REMOTE_ADDR": "10.0.0.1"}).status_code
+
+    assert [attempt(ip) for ip in ("1.1.1.1", "2.2.2.2", "3.3.3.3")] == statuses
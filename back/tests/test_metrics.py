@@ -0,0 +1,24 @@
+import pytest
+from app import create_app
+
+
+@pytest.fixture
+def make_client(tmp_path):
+    def make(**overrides):
+        return create_app("testing", SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'metrics.db'}",
+                          SLOW_QUERY_MS=None, **overrides).test_client()
+    return make
+
+
+def test_metrics_not_published_without_token(make_client):
+    assert make_client(METRICS_TOKEN=None).get('/metrics').status_code == 404
+
+
+def test_metrics_require_token(make_client):
+    client = make_client(METRICS_TOKEN="secreto")
+    assert client.get('/').status_code == 200
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={"Authorization": "Bearer otro"}).status_code == 401
+    response = client.get('/metrics', headers={"Authorization": "Bearer secreto"})
+    assert response.status_code == 200
+    assert b"http_request_duration_seconds" in response.data
@@ -0,0 +1,9 @@
+import pytest
+from pagination import encode_cursor
+
+
+@pytest.mark.parametrize("path", ["/api/admin/orders", "/api/admin/inventory/low-stock", "/api/me/orders"])
+def test_listings_reject_wrong_typed_cursor(client, admin, path):
+    _, headers = admin
+    response = client.get(f"{path}?cursor={encode_cursor(None, None)}", headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,45 @@
+import io
+import os
+import pytest
+from PIL import Image
+from jobs import image_jobs
+from models import db, Product
+
+
+def png():
+    data = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(data, "PNG")
+    data.seek(0)
+    return data
+
+
+def create(client, headers, name):
+    return client.post('/api/products', headers=headers, content_type='multipart/form-data', data={
+        "name": name, "description": "Tostado medio", "price": "5990", "photo": (png(), "cafe.png")
+    })
+
+
+@pytest.fixture
+def spool_dir(app, tmp_path):
+    app.config['IMAGE_SPOOL_DIR'] = str(tmp_path / "spool")
+    return tmp_path / "spool"
+
+
+def test_created_product_keeps_spooled_image_for_the_job(client, admin, spool_dir):
+    _, headers = admin
+    assert create(client, headers, "Café de grano").status_code == 201
+    assert len(os.listdir(spool_dir)) == 1
+
+
+def test_failed_create_removes_spooled_image(app, client, admin, spool_dir, monkeypatch):
+    _, headers = admin
+    assert create(client, headers, "Café de grano").status_code == 201
+    # Nombre repetido (IntegrityError) y un error cualquiera antes del commit
+    assert create(client, headers, "Café de grano").status_code == 409
+    def broken(product, path, folder="products"):
+        raise RuntimeError("BD caída")
+    monkeypatch.setattr(image_jobs, "queue_upload", broken)
+    assert create(client, headers, "Café molido").status_code == 500
+    assert len(os.listdir(spool_dir)) == 1
+    with app.app_context():
+        assert db.session.query(Product).count() == 1
@@ -0,0 +1,84 @@
+import pytest
+from pagination import encode_cursor
+from models import db, Product, Client
+from decorators import create_client_token
+
+
+@pytest.fixture
+def product_id(app):
+    with app.app_context():
+        product = Product(name="Café de grano", price=5990)
+        db.session.add(product)
+        db.session.commit()
+        return product.id
+
+
+@pytest.fixture
+def shoppers(app):
+    """Encabezados con el token de tres clientes distintos"""
+    with app.app_context():
+        clients = [Client(email=f"cliente{n}@insomnia.cl", name=f"Cliente {n}", admin=False) for n in range(3)]
+        for client in clients:
+            client.set_password("secreto")
+        db.session.add_all(clients)
+        db.session.commit()
+        return [{"Authorization": f"Bearer {create_client_token(client)}"} for client in clients]
+
+
+def rating(client, product_id):
+    return client.get(f'/api/products/{product_id}').get_json()["rating"]
+
+
+@pytest.mark.parametrize("cursor", [encode_cursor("x"), encode_cursor(None), encode_cursor(), "no-es-cursor"])
+def test_reviews_reject_bad_cursor(client, product_id, cursor):
+    response = client.get(f'/api/products/{product_id}/reviews?cursor={cursor}')
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Cursor inválido"}
+
+
+def test_reviews_after_valid_cursor(client, product_id):
+    response = client.get(f'/api/products/{product_id}/reviews?cursor={encode_cursor(10)}')
+    assert response.status_code == 200
+    assert response.get_json() == {"reviews": [], "next_cursor": None}
+
+
+def test_rating_summary_follows_review_changes(client, product_id, shoppers):
+    url = f'/api/products/{product_id}/reviews'
+    for headers, stars in zip(shoppers, (5, 4, 1)):
+        assert client.post(url, headers=headers, json={"rating": stars}).status_code == 201
+    summary = rating(client, product_id)
+    assert (summary["count"], summary["average"]) == (3, 3.33)
+    assert summary["histogram"] == {"1": 1, "2": 0, "3": 0, "4": 1, "5": 1}
+
+    assert client.put(url, headers=shoppers[2], json={"rating": 3}).status_code == 200
+    assert client.put(url, headers=shoppers[0], json={"comment": "Muy rico"}).status_code == 200
+    summary = rating(client, product_id)
+    assert (summary["count"], summary["average"]) == (3, 4)
+    assert summary["histogram"] == {"1": 0, "2": 0, "3": 1, "4": 1, "5": 1}
+
+    assert client.delete(url, headers=shoppers[0]).status_code == 200
+    assert client.delete(url, headers=shoppers[1]).status_code == 200
+    summary = rating(client, product_id)
+    assert (summary["count"], summary["average"]) == (1, 3)
+
+    # Al borrar la última reseña el promedio vuelve a 0, sin dividir por cero
+    assert client.delete(url, headers=shoppers[2]).status_code == 200
+    summary = rating(client, product_id)
+    assert (summary["count"], summary["average"]) == (0, 0)
+    assert set(summary["histogram"].values()) == {0}
+
+
+def test_rating_sort_uses_summary(app, client, shoppers):
+    with app.app_context():
+        products = [Product(name=name, price=1000) for name in ("Café de grano", "Té verde", "Té negro")]
+        db.session.add_all(products)
+        db.session.commit()
+        ids = [product.id for product in products]
+    # Té verde: 5, Café de grano: (4 + 2) / 2 = 3, Té negro sin reseñas
+    for headers, (product_id, stars) in zip(shoppers, ((ids[1], 5), (ids[0], 4), (ids[0], 2))):
+        assert client.post(f'/api/products/{product_id}/reviews', headers=headers,
+                           json={"rating": stars}).status_code == 201
+
+    response = client.get('/api/products?sort=rating')
+    assert response.status_code == 200
+    assert [product["id"] for product in response.get_json()["products"]] == [ids[1], ids[0], ids[2]]
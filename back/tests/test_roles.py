@@ -0,0 +1,53 @@
+import time
+from models import db, Client
+from cache import init_cache
+from decorators import publish_role_version
+
+
+def demote_elsewhere(app, client_id, publish):
+    """Otro worker quita el rol: escribe en la BD y, si publica, en la caché compartida"""
+    with app.app_context():
+        client = db.session.get(Client, client_id)
+        client.admin = False
+        client.role_version += 1
+        db.session.commit()
+        if publish:
+            publish_role_version(client)
+
+
+def low_stock(client, headers):
+    return client.get('/api/admin/inventory/low-stock', headers=headers)
+
+
+def test_demoted_admin_rejected_after_local_cache_ttl(app, client, admin):
+    client_id, headers = admin
+    app.config["ROLE_LOCAL_CACHE_TTL"] = 0.2
+    assert low_stock(client, headers).status_code == 200
+    # La caché en memoria de este worker no se entera hasta que vence la versión guardada
+    demote_elsewhere(app, client_id, publish=False)
+    assert low_stock(client, headers).status_code == 200
+    time.sleep(0.3)
+    assert low_stock(client, headers).status_code == 403
+
+
+def test_demoted_admin_rejected_at_once_without_local_cache(app, client, admin):
+    client_id, headers = admin
+    app.config["ROLE_LOCAL_CACHE_TTL"] = 0  # La versión se lee de la BD en cada petición
+    assert low_stock(client, headers).status_code == 200
+    demote_elsewhere(app, client_id, publish=False)
+    assert low_stock(client, headers).status_code == 403
+
+
+def test_demoted_admin_rejected_at_once_in_same_worker(app, client, admin):
+    client_id, headers = admin
+    assert low_stock(client, headers).status_code == 200
+    demote_elsewhere(app, client_id, publish=True)
+    assert low_stock(client, headers).status_code == 403
+
+
+def test_demoted_admin_rejected_with_shared_cache(app, client, admin, fake_redis):
+    client_id, headers = admin
+    init_cache(app, client=fake_redis)
+    assert low_stock(client, headers).status_code == 200
+    demote_elsewhere(app, client_id, publish=True)
+    assert low_stock(client, headers).status_code == 403
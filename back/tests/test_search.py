@@ -0,0 +1,55 @@
+import pytest
+from models import db, Product
+from search import ProductSearchIndex, search_index
+
+
+@pytest.fixture
+def products(app):
+    with app.app_context():
+        rows = {
+            "cafe": Product(name="Café de grano", description="Tostado medio, notas de chocolate", price=1),
+            "verde": Product(name="Té verde", description="Hojas enteras de Japón", price=1),
+            "negro": Product(name="Té negro", description="Hojas partidas", price=1),
+            "taza": Product(name="Taza de cerámica", description="Para café o té", price=1),
+        }
+        db.session.add_all(rows.values())
+        db.session.commit()
+        return {key: product.id for key, product in rows.items()}
+
+
+def search(app, query, limit=10):
+    with app.test_request_context():
+        return ProductSearchIndex().search(query, limit)
+
+
+def test_all_terms_must_match(app, products):
+    assert set(search(app, "te hojas")) == {products["verde"], products["negro"]}
+    assert search(app, "verde hojas") == [products["verde"]]
+    # Sin intersección en la segunda palabra no se vuelve a empezar con la tercera
+    assert search(app, "cafe verde hojas") == []
+    assert search(app, "inexistente") == []
+    assert search(app, "") == []
+
+
+def test_accents_are_ignored(app, products):
+    assert search(app, "cafe")[0] == products["cafe"]
+    assert search(app, "CAFÉ")[0] == products["cafe"]
+    assert search(app, "japon") == [products["verde"]]
+
+
+def test_name_matches_rank_above_description(app, products):
+    # "café" está en el nombre del café y solo en la descripción de la taza
+    assert search(app, "cafe") == [products["cafe"], products["taza"]]
+
+
+def test_prefix_and_typo(app, products):
+    assert search(app, "ceram") == [products["taza"]]
+    assert search(app, "chocolte") == [products["cafe"]]
+
+
+def test_search_route(client, products):
+    search_index.clear()  # El índice global puede venir de otra prueba con otra BD
+    response = client.get('/api/products/search?q=te verde')
+    assert response.status_code == 200
+    assert [product["id"] for product in response.get_json()["products"]] == [products["verde"]]
+    assert client.get('/api/products/search').status_code == 400
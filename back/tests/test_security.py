@@ -0,0 +1,47 @@
+import threading
+import pytest
+import security
+from models import db, Client
+from security import HashPool, HashPoolBusy
+
+
+def test_hash_timeout_keeps_slot_until_hash_finishes(app):
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE_FACTOR=1, PASSWORD_HASH_TIMEOUT=0.05)
+    pool = HashPool()
+    release = threading.Event()
+    with app.app_context():
+        with pytest.raises(HashPoolBusy) as error:
+            pool.run(release.wait, 5)
+        assert error.value.retry_after == 0.05
+        # El hash sigue corriendo: su cupo no se libera por el timeout
+        with pytest.raises(HashPoolBusy):
+            pool.run(lambda: "ok")
+        release.set()
+        pool._executor.submit(lambda: None).result()
+        assert pool.run(lambda: "ok") == "ok"
+
+
+def test_login_hash_timeout_returns_503(app, client, monkeypatch):
+    with app.app_context():
+        customer = Client(email="cliente@insomnia.cl", name="Cliente", admin=False)
+        customer.set_password("secreto")
+        db.session.add(customer)
+        db.session.commit()
+    release = threading.Event()
+    monkeypatch.setattr(security, "check_password_hash", lambda password_hash, password: release.wait(5))
+    app.config["PASSWORD_HASH_TIMEOUT"] = 0.05
+    try:
+        response = client.post('/api/login', json={"email": "cliente@insomnia.cl", "password": "secreto"})
+    finally:
+        release.set()
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.parametrize("method", ["scrypt", "pbkdf2:sha256", "pbkdf2:sha256:1000"])
+def test_shorthand_hash_method_does_not_rehash(app, method):
+    app.config["PASSWORD_HASH_METHOD"] = method
+    with app.app_context():
+        stored = security.generate_password_hash("secreto", method)
+        assert not security.needs_rehash(stored)
+        assert security.needs_rehash(security.generate_password_hash("secreto", "pbkdf2:sha256:2000"))